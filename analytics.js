@@ -36,8 +36,12 @@ async function loadAnalytics() {
         const phaseSales = stats.phase_sales || stats.phaseSales || {};
         drawPhaseChart(phaseSales);
         
-        // رسم مخطط المبيعات الشهرية (إذا كان موجوداً)
-        const monthlySalesData = stats.monthlySalesData || [];
+        // رسم مخطط المبيعات الشهرية (من الخادم إذا لم تكن ضمن الإحصائيات)
+        let monthlySalesData = stats.monthlySalesData;
+        if (!monthlySalesData && typeof getMonthlySalesData === 'function') {
+            monthlySalesData = await getMonthlySalesData(6);
+        }
+        monthlySalesData = monthlySalesData || [];
         drawMonthlyChart(monthlySalesData);
     } catch (error) {
         console.error('Error loading analytics:', error);
@@ -35,6 +35,9 @@ document.addEventListener('DOMContentLoaded', async () => {
 
     // إعادة ضبط النماذج عند إغلاق النوافذ
     setupModalReset();
+
+    // تحديث القسم المعروض عند تغيّر بياناته من مستخدم آخر
+    setupChangeEvents();
     } catch (error) {
         console.error('Error initializing app:', error);
     }
@@ -67,12 +70,37 @@ function setupNavigation() {
     showSection('houses');
 }
 
+// الأنواع التي يعرضها كل قسم
+const SECTION_ENTITIES = {
+    houses: ['house'],
+    receipts: ['receipt', 'house'],
+    contracts: ['contract', 'house'],
+    analytics: ['contract', 'house', 'payment'],
+    resale: ['resale', 'house', 'contract'],
+    debts: ['contract', 'payment'],
+};
+
+let currentSection = null;
+let changeRefreshTimer = null;
+
+// إعادة تحميل القسم المعروض فقط إذا تغيّر نوع يعرضه (مع تجميع الإشعارات المتتالية)
+function setupChangeEvents() {
+    if (typeof subscribeChanges !== 'function') return;
+    subscribeChanges(change => {
+        const entities = SECTION_ENTITIES[currentSection] || [];
+        if (change.entity !== '*' && !entities.includes(change.entity)) return;
+        clearTimeout(changeRefreshTimer);
+        changeRefreshTimer = setTimeout(() => showSection(currentSection), 500);
+    });
+}
+
 // عرض قسم معين
 async function showSection(sectionName) {
     if (!sectionName) {
         console.error('showSection: sectionName is required');
         return;
     }
+    currentSection = sectionName;
     
     // إخفاء جميع الأقسام
     const sections = document.querySelectorAll('.content-section');
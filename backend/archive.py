@@ -0,0 +1,183 @@
+"""
+أرشفة البيانات الباردة: نقل الصفوف التي لم تعد تتغير من الجداول الرئيسية إلى جداول *_archive
+
+- العقود المسددة بالكامل (amount_paid >= total_amount) التي لم تُسجّل عليها دفعة منذ
+  ARCHIVE_AFTER_DAYS يوماً، مع دفعاتها
+- المنازل المحذوفة (status='deleted') التي لا يرتبط بها عقد في الجدول الرئيسي
+
+النقل على دفعات (ARCHIVE_BATCH_SIZE) كل منها في معاملة قصيرة، فلا يُحجز قفل الكتابة طويلاً.
+جداول الإحصائيات المجمّعة لا تتغير بالنقل، وإعادة بنائها تشمل الأرشيف.
+القوائم تقرأ الجداول الرئيسية فقط إلا مع include_archived=true، والبحث عن عقد أو منزل
+برقمه المعرّف يرجع إلى الأرشيف تلقائياً، وكذلك البحث النصي. النقل لا يُعدّ حذفاً في
+المزامنة (لا tombstones).
+الجداول الرئيسية تستخدم AUTOINCREMENT (الترحيل 6)، فلا يُعطى رقم صف مؤرشف لصف جديد
+ويبقى id فريداً بين الجدول وأرشيفه.
+
+    python archive.py --days 365
+"""
+import asyncio
+import logging
+import os
+from datetime import date, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, exists, func, insert, select, text, union_all
+from sqlalchemy.orm import Session, aliased
+from models import House, Contract, Payment, HouseArchive, ContractArchive, PaymentArchive
+import events
+import sequences
+
+logger = logging.getLogger("archive")
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "365"))
+BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# تشغيل الأرشفة دورياً داخل الخادم كل عدد من الساعات (0 = يدوياً فقط)
+INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "0"))
+
+ARCHIVES = {
+    House: HouseArchive,
+    Contract: ContractArchive,
+    Payment: PaymentArchive,
+}
+
+
+def source(model, include_archived: bool):
+    """
+    النموذج نفسه، أو مع include_archived كيان بنفس الأعمدة يجمع الجدول وأرشيفه (UNION ALL)
+    فتبقى الاستعلامات كما هي مع استبدال النموذج
+    """
+    if not include_archived:
+        return model
+    archive_model = ARCHIVES[model]
+    names = [column.name for column in model.__table__.columns]
+    combined = union_all(
+        select(*model.__table__.columns),
+        select(*[archive_model.__table__.c[name] for name in names]),
+    ).subquery(f"{model.__tablename__}_all")
+    return aliased(model, combined)
+
+
+def get(db: Session, model, id: int):
+    """صف برقمه من الجدول الرئيسي أو من الأرشيف"""
+    row = db.query(model).filter(model.id == id).first()
+    if row is None:
+        archive_model = ARCHIVES[model]
+        row = db.query(archive_model).filter(archive_model.id == id).first()
+    return row
+
+
+def _move(db: Session, model, condition) -> int:
+    """
+    نسخ الصفوف إلى الأرشيف ثم حذفها من الجدول الرئيسي، والعلامة ARCHIVING مرفوعة أثناء الحذف
+    فلا تسجّل triggers المزامنة حذفاً ولا تُحذف العقود من فهرس البحث (العلامة داخل المعاملة فقط)
+    """
+    columns = list(model.__table__.columns)
+    db.execute(insert(ARCHIVES[model]).from_select(
+        [column.name for column in columns] + ["archived_at"],
+        select(*columns, func.current_timestamp()).where(condition)
+    ))
+    flag = {"name": sequences.ARCHIVING}
+    db.execute(text("INSERT OR REPLACE INTO sequences (name, value) VALUES (:name, 1)"), flag)
+    moved = db.execute(delete(model).where(condition)).rowcount
+    db.execute(text("DELETE FROM sequences WHERE name = :name"), flag)
+    return moved
+
+
+def _settled_contracts(db: Session, cutoff: date, after_id: int, limit: int) -> List[int]:
+    last_payment = select(func.max(Payment.payment_date)).where(
+        Payment.contract_id == Contract.id
+    ).scalar_subquery()
+    return db.scalars(
+        select(Contract.id).where(
+            Contract.id > after_id,
+            Contract.amount_paid >= Contract.total_amount,
+            func.coalesce(last_payment, Contract.sale_date) < cutoff,
+        ).order_by(Contract.id).limit(limit)
+    ).all()
+
+
+def _deleted_houses(db: Session, after_id: int, limit: int) -> List[int]:
+    return db.scalars(
+        select(House.id).where(
+            House.id > after_id,
+            House.status == 'deleted',
+            ~exists().where(Contract.house_id == House.id),
+        ).order_by(House.id).limit(limit)
+    ).all()
+
+
+def run(db: Session, days: Optional[int] = None, batch_size: Optional[int] = None) -> dict:
+    """نقل العقود المسددة ودفعاتها ثم المنازل المحذوفة، مع commit بعد كل دفعة"""
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    batch_size = batch_size or BATCH_SIZE
+    cutoff = date.today() - timedelta(days=days)
+    moved = {"contracts": 0, "payments": 0, "houses": 0}
+
+    # المؤشر على id يجعل كل دفعة تكمل من حيث انتهت السابقة بدلاً من إعادة فحص الجدول
+    last_id = 0
+    while True:
+        ids = _settled_contracts(db, cutoff, last_id, batch_size)
+        if not ids:
+            break
+        last_id = ids[-1]
+        moved["payments"] += _move(db, Payment, Payment.contract_id.in_(ids))
+        moved["contracts"] += _move(db, Contract, Contract.id.in_(ids))
+        events.emit(db, "contract", None, "archive", count=len(ids))
+        db.commit()
+
+    # بعد العقود، لأن المنزل لا يُنقل ما دام له عقد في الجدول الرئيسي
+    last_id = 0
+    while True:
+        ids = _deleted_houses(db, last_id, batch_size)
+        if not ids:
+            break
+        last_id = ids[-1]
+        moved["houses"] += _move(db, House, House.id.in_(ids))
+        events.emit(db, "house", None, "archive", count=len(ids))
+        db.commit()
+
+    return {"cutoff": cutoff.isoformat(), **moved}
+
+
+def _run_all() -> dict:
+    """أرشفة القاعدة الافتراضية وجميع المشاريع"""
+    from database import get_database, list_projects
+
+    results = {}
+    for project in [None] + list_projects():
+        db = get_database(project).SessionLocal()
+        try:
+            results[project or "default"] = run(db)
+        finally:
+            db.close()
+    return results
+
+
+async def schedule():
+    """تشغيل الأرشفة كل INTERVAL_HOURS ساعة (يُبدأ عند تشغيل الخادم)"""
+    from fastapi.concurrency import run_in_threadpool
+
+    while True:
+        await asyncio.sleep(INTERVAL_HOURS * 3600)
+        try:
+            logger.info("archived %s", await run_in_threadpool(_run_all))
+        except Exception:
+            logger.exception("scheduled archive failed")
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import get_database
+
+    parser = argparse.ArgumentParser(description="نقل العقود المسددة والمنازل المحذوفة إلى جداول الأرشيف")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="عمر آخر دفعة للعقد المسدد")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--project", default=None, help="اسم المشروع (الافتراضي DATABASE_PATH)")
+    args = parser.parse_args()
+
+    database = get_database(args.project)
+    database.init()
+    db = database.SessionLocal()
+    try:
+        print(run(db, args.days, args.batch_size))
+    finally:
+        db.close()
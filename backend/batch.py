@@ -0,0 +1,162 @@
+"""
+الطلب المجمّع: عدة عمليات API في طلب HTTP واحد ومعاملة واحدة
+
+    POST /api/batch
+    {"operations": [
+        {"method": "POST", "path": "/api/receipts", "body": {...}},
+        {"method": "GET", "path": "/api/receipts?limit=50"},
+        {"method": "GET", "path": "/api/statistics"}
+    ]}
+
+كل عملية تُنفّذ عبر نفس المعالجات ونماذج التحقق في main.py (طلب داخلي بدون شبكة)
+بالترتيب، وجميعها على جلسة واحدة داخل معاملة واحدة:
+- commit داخل المعالجات يصبح SAVEPOINT، والتثبيت الفعلي (fsync) مرة واحدة في النهاية
+- القراءات ترى ما كتبته العمليات السابقة في نفس الطلب
+- عند فشل أي عملية (رمز 400 فأكثر) تُلغى المعاملة كاملة ويُعاد خطأ تلك العملية مع رقمها
+"""
+import json
+from contextlib import AsyncExitStack
+from typing import Any, List, Optional
+from urllib.parse import urlsplit
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from database import batch_session, current_database
+import events
+
+# الحد الأعلى لعدد العمليات، لأن قفل الكتابة محجوز طوال الطلب
+MAX_OPERATIONS = 50
+
+METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+
+# مسارات لا تصلح داخل الطلب المجمّع: البث المستمر (لا ينتهي وقفل الكتابة محجوز)،
+# التصدير (رد غير JSON)، والمشاريع (خارج قاعدة المشروع ومعاملته)
+EXCLUDED_PREFIXES = ("/api/batch", "/api/events", "/api/export", "/api/projects")
+
+
+class Operation(BaseModel):
+    method: str
+    path: str
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    operations: List[Operation] = Field(..., min_length=1, max_length=MAX_OPERATIONS)
+
+
+class BatchError(Exception):
+    """فشل عملية داخل الطلب المجمّع"""
+
+    def __init__(self, index: int, status: int, detail):
+        self.index = index
+        self.status = status
+        self.detail = detail
+
+
+def _begin():
+    """اتصال بمعاملة مفتوحة (BEGIN IMMEDIATE) وجلسة مرتبطة بها"""
+    database = current_database()
+    connection = database.begin_immediate()
+    db = Session(
+        bind=connection, autoflush=False, join_transaction_mode="create_savepoint",
+        info={"project": database.project}
+    )
+    return connection, db
+
+
+def _finish(connection, db: Session, commit: bool):
+    try:
+        notifications = events.take_pending(db)
+        project = db.info.get("project")
+        db.close()
+        if commit:
+            connection.commit()
+            # الجلسة مرتبطة باتصال خارجي، فتُنشر الإشعارات هنا بعد التثبيت الفعلي
+            events.broker.publish(notifications, project)
+        else:
+            connection.rollback()
+    finally:
+        connection.close()
+
+
+async def _call(app, scope: dict, index: int, operation: Operation):
+    """تنفيذ عملية واحدة عبر موجّه التطبيق وإرجاع (الرمز، المحتوى)"""
+    method = operation.method.upper()
+    if method not in METHODS:
+        raise BatchError(index, 405, "Method Not Allowed")
+    url = urlsplit(operation.path)
+    if not url.path.startswith("/api/"):
+        raise BatchError(index, 404, "Not Found")
+    if url.path.startswith(EXCLUDED_PREFIXES):
+        raise BatchError(index, 400, "هذا المسار غير متاح في الطلب المجمّع")
+
+    body = b"" if operation.body is None else json.dumps(operation.body).encode("utf-8")
+    sub_scope = {
+        key: scope[key] for key in ("type", "http_version", "scheme", "server", "client", "root_path", "app")
+        if key in scope
+    }
+    sub_scope.update({
+        "method": method,
+        "path": url.path,
+        "raw_path": url.path.encode("utf-8"),
+        "query_string": url.query.encode("utf-8"),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    status, chunks, is_json = 500, [], True
+
+    async def send(message):
+        nonlocal status, is_json
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            content_type = dict(message.get("headers", [])).get(b"content-type", b"application/json")
+            is_json = content_type.startswith(b"application/json")
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        # ما يفعله AsyncExitStackMiddleware في FastAPI: إغلاق dependencies بعد كل عملية
+        async with AsyncExitStack() as stack:
+            sub_scope["fastapi_astack"] = stack
+            await app.router(sub_scope, receive, send)
+    except HTTPException as error:
+        raise BatchError(index, error.status_code, error.detail)
+    except RequestValidationError as error:
+        raise BatchError(index, 422, error.errors())
+
+    if not is_json:
+        raise BatchError(index, 400, "هذا المسار غير متاح في الطلب المجمّع")
+    content = b"".join(chunks)
+    result = json.loads(content) if content else None
+    if status >= 400:
+        detail = result.get("detail", result) if isinstance(result, dict) else result
+        raise BatchError(index, status, detail)
+    return status, result
+
+
+async def run(app, scope: dict, request: BatchRequest):
+    """تنفيذ جميع العمليات في معاملة واحدة وإرجاع نتائجها بالترتيب"""
+    connection, db = await run_in_threadpool(_begin)
+    token = batch_session.set(db)
+    commit = False
+    try:
+        results = []
+        for index, operation in enumerate(request.operations):
+            status, body = await _call(app, scope, index, operation)
+            results.append({"status": status, "body": body})
+        commit = True
+    except BatchError as error:
+        return JSONResponse(
+            status_code=error.status,
+            content={"detail": error.detail, "index": error.index},
+        )
+    finally:
+        batch_session.reset(token)
+        await run_in_threadpool(_finish, connection, db, commit)
+    return {"results": results}
@@ -0,0 +1,6 @@
+"""
+أدوات قياس أداء الـ Backend
+
+تُشغّل من مجلد backend:
+    python -m benchmarks.async_db
+"""
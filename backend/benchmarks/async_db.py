@@ -0,0 +1,105 @@
+"""
+مقارنة إنتاجية نقاط القراءة بين الجلسة المتزامنة (threadpool) وغير المتزامنة (aiosqlite)
+
+    python -m benchmarks.async_db --clients 50 --requests 20
+
+كل وضع يعمل في عملية منفصلة لأن DB_ASYNC يُقرأ عند استيراد database.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from benchmarks.common import run_clients, print_table
+
+ENDPOINTS = [
+    "/api/houses?limit=100",
+    "/api/receipts?limit=100",
+    "/api/contracts?limit=100",
+    "/api/statistics",
+]
+
+
+def seed(houses: int):
+    """إنشاء بيانات اختبار عبر دوال الاستيراد الجماعي"""
+    import main
+    import imports
+    from database import SessionLocal, init_db
+
+    init_db()
+    db = SessionLocal()
+    try:
+        imports.import_houses(db, [
+            {"house_number": i, "block_number": i % 20 + 1, "total_area": 200, "building_area": 150,
+             "total_price": 100000 + i, "loan_amount": 20000, "phase": i % 4 + 1}
+            for i in range(1, houses + 1)
+        ], main.HouseCreate)
+        start = date.today() - timedelta(days=365)
+        imports.import_receipts(db, [
+            {"receipt_number": i, "receipt_date": start + timedelta(days=i % 365), "buyer_name": f"مشتري {i}",
+             "mobile_number": f"0770{i:07d}", "unit_number": i, "block_number": i % 20 + 1, "unit_area": 200,
+             "amount_received": 10000, "remaining_amount": 90000, "house_id": i}
+            for i in range(1, houses // 2 + 1)
+        ], main.ReceiptCreate)
+    finally:
+        db.close()
+
+
+async def worker(clients: int, requests: int) -> dict:
+    """تشغيل الحمل داخل العملية الحالية على التطبيق مباشرة"""
+    import httpx
+    import main
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def send(client_index, request_index):
+            response = await client.get(ENDPOINTS[(client_index + request_index) % len(ENDPOINTS)])
+            return response.status_code == 200
+
+        # تسخين
+        for endpoint in ENDPOINTS:
+            await client.get(endpoint)
+        result = await run_clients(clients, requests, send)
+    await main.shutdown_event()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 100])
+    parser.add_argument("--requests", type=int, default=20, help="عدد الطلبات لكل عميل")
+    parser.add_argument("--houses", type=int, default=2000)
+    parser.add_argument("--database", help="ملف قاعدة بيانات موجود (وإلا يُنشأ ملف مؤقت)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(worker(args.clients[0], args.requests))))
+        return
+
+    database = args.database
+    if not database:
+        database = os.path.join(tempfile.mkdtemp(), "bench.db")
+        os.environ["DATABASE_PATH"] = database
+        seed(args.houses)
+
+    rows = []
+    for clients in args.clients:
+        for mode in ("sync", "async"):
+            env = dict(os.environ, DATABASE_PATH=database, DB_ASYNC="1" if mode == "async" else "0")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.async_db", "--worker",
+                 "--clients", str(clients), "--requests", str(args.requests)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            rows.append({"mode": mode, "clients": clients, **json.loads(output.strip().splitlines()[-1])})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
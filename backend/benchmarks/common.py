@@ -0,0 +1,59 @@
+"""دوال مشتركة لقياس زمن الاستجابة والإنتاجية"""
+import asyncio
+import time
+from typing import Awaitable, Callable, List
+
+
+def percentile(values: List[float], p: float) -> float:
+    """النسبة المئوية p (0-100) لقائمة قيم"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float, errors: int = 0) -> dict:
+    """ملخص القياس بالميلي ثانية وعدد الطلبات في الثانية"""
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+async def run_clients(clients: int, requests_per_client: int,
+                      send: Callable[[int, int], Awaitable[bool]]) -> dict:
+    """
+    تشغيل عدد من العملاء المتزامنين، كل عميل يرسل عدداً من الطلبات بالتتابع.
+    send(client_index, request_index) تعيد True عند نجاح الطلب.
+    """
+    latencies = []
+    errors = 0
+
+    async def client(index):
+        nonlocal errors
+        for request_index in range(requests_per_client):
+            started = time.perf_counter()
+            ok = await send(index, request_index)
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+def print_table(rows: List[dict]):
+    """طباعة النتائج كجدول نصي"""
+    if not rows:
+        return
+    columns = list(rows[0])
+    widths = [max(len(str(c)), *(len(str(r[c])) for r in rows)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[c]).ljust(w) for c, w in zip(columns, widths)))
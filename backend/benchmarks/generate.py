@@ -0,0 +1,250 @@
+"""
+توليد بيانات اختبار واقعية بحجم قابل للتحديد مباشرة في ملف SQLite
+
+    python -m benchmarks.generate --database bench.db --houses 100000 --receipts 500000 --payments 1000000
+
+كل وصل مرتبط بمنزل ينشئ عقداً كما في POST /api/receipts، والمبلغ المدفوع في العقد
+يساوي المقدمة مع مجموع دفعاته. التوليد حتمي لنفس --seed.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+from sqlalchemy import bindparam, insert, select, update
+
+FIRST_NAMES = [
+    "أحمد", "محمد", "علي", "حسين", "حسن", "عمر", "مصطفى", "كرار", "يوسف", "إبراهيم",
+    "عباس", "جعفر", "سجاد", "مرتضى", "زينب", "فاطمة", "مريم", "نور", "سارة", "هدى",
+]
+FAMILY_NAMES = [
+    "الجبوري", "العبيدي", "الدليمي", "التميمي", "الخفاجي", "الربيعي", "الساعدي", "الشمري",
+    "الزبيدي", "الموسوي", "الحسيني", "العزاوي", "الكعبي", "المالكي", "البياتي",
+]
+SOURCES = ["مكتب عقاري", "إعلان", "معرفة شخصية", "وسائل التواصل", "مراجعة مباشرة"]
+MATERIALS = ["طابوق", "بلوك", "خرسانة"]
+PAYMENT_TYPES = ["نقدي", "حوالة", "صك"]
+
+BATCH_SIZE = 10000
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}"
+
+
+def _mobile(rng):
+    return f"07{rng.choice('3579')}{rng.randint(0, 99999999):08d}"
+
+
+def _chunks(rows):
+    """تقسيم مولّد صفوف إلى دفعات"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(connection, table, rows):
+    """إدراج مولّد صفوف على دفعات وإرجاع عددها"""
+    count = 0
+    for batch in _chunks(rows):
+        connection.execute(insert(table), batch)
+        count += len(batch)
+    return count
+
+
+def generate(houses: int, receipts: int, payments: int, resales: int, years: int = 3, seed: int = 1):
+    """توليد البيانات في قاعدة البيانات المحددة عبر DATABASE_PATH"""
+    from database import engine, init_db, SessionLocal
+    from models import House, Receipt, Contract, Resale, Payment
+    import rollups
+    import sequences
+
+    rng = random.Random(seed)
+    today = date.today()
+    start = today - timedelta(days=365 * years)
+    span = (today - start).days
+    init_db()
+
+    # المنازل: حوالي 60% منها مباعة (تُختار لاحقاً للوصولات)
+    prices = {}
+
+    def house_rows():
+        for number in range(1, houses + 1):
+            total_area = rng.choice([150, 200, 250, 300, 400])
+            price = round(total_area * rng.uniform(400, 900), -3)
+            prices[number] = price
+            yield {
+                "id": number,
+                "house_number": number,
+                "block_number": (number - 1) // 100 + 1,
+                "total_area": total_area,
+                "building_area": round(total_area * rng.uniform(0.5, 0.8)),
+                "total_price": price,
+                "down_payment": round(price * 0.2, -3),
+                "loan_amount": round(price * 0.3, -3) if rng.random() < 0.4 else 0,
+                "phase": rng.randint(1, 4),
+                "outlook": rng.choice([None, None, 0, 5000, 10000]),
+                "status": "available",
+                "floors": rng.choice([1, 2]),
+                "building_material": rng.choice(MATERIALS),
+                "created_at": start,
+            }
+
+    sold_count = max(1, int(houses * 0.6)) if houses else 0
+    sold = rng.sample(range(1, houses + 1), sold_count) if houses else []
+
+    # الوصولات والعقود (عقد لكل وصل مرتبط بمنزل كما في الإضافة الفردية)
+    contracts_meta = []  # (contract_id, sale_date, total_amount)
+
+    def receipt_and_contract_rows():
+        for number in range(1, receipts + 1):
+            house_id = sold[(number - 1) % len(sold)] if sold else None
+            receipt_date = start + timedelta(days=rng.randint(0, span))
+            price = prices.get(house_id, 100000)
+            received = round(price * rng.uniform(0.1, 0.3), -3)
+            buyer_name = _name(rng)
+            mobile_number = _mobile(rng)
+            block_number = ((house_id or 1) - 1) // 100 + 1
+            receipt = {
+                "receipt_number": number,
+                "receipt_date": receipt_date,
+                "buyer_name": buyer_name,
+                "mobile_number": mobile_number,
+                "unit_number": house_id or 0,
+                "block_number": block_number,
+                "unit_area": 200,
+                "amount_received": received,
+                "remaining_amount": price - received,
+                "due_date": receipt_date + timedelta(days=30),
+                "house_id": house_id,
+                "created_at": receipt_date,
+            }
+            contract = None
+            if house_id is not None:
+                contract_id = len(contracts_meta) + 1
+                contracts_meta.append((contract_id, receipt_date, price))
+                contract = {
+                    "id": contract_id,
+                    "sale_date": receipt_date,
+                    "house_number": house_id,
+                    "block_number": block_number,
+                    "area": 200,
+                    "floors": 1,
+                    "buyer_name": buyer_name,
+                    "mobile_number": mobile_number,
+                    "sale_type": "بيع أول مرة",
+                    "total_amount": price,
+                    "down_payment": received,
+                    "loan_amount": price - received,
+                    "amount_paid": received,
+                    "contract_date": receipt_date,
+                    "contract_number": contract_id,
+                    "house_id": house_id,
+                    "created_at": receipt_date,
+                }
+            yield receipt, contract
+
+    # الدفعات: شهرية بعد تاريخ البيع، موزعة عشوائياً على العقود
+    paid = {}
+    last_payment = {}
+
+    def payment_rows():
+        if not contracts_meta:
+            return
+        for _ in range(payments):
+            contract_id, sale_date, total = contracts_meta[rng.randrange(len(contracts_meta))]
+            previous = last_payment.get(contract_id, sale_date)
+            payment_date = min(today, previous + timedelta(days=rng.randint(20, 40)))
+            amount = round(total * rng.uniform(0.01, 0.05), -2)
+            paid[contract_id] = paid.get(contract_id, 0) + amount
+            last_payment[contract_id] = payment_date
+            yield {
+                "contract_id": contract_id,
+                "payment_date": payment_date,
+                "amount": amount,
+                "payment_type": rng.choice(PAYMENT_TYPES),
+                "next_payment_due_date": payment_date + timedelta(days=30),
+                "created_at": payment_date,
+            }
+
+    def resale_rows():
+        for _ in range(resales if sold else 0):
+            yield {
+                "house_id": rng.choice(sold),
+                "source": rng.choice(SOURCES),
+                "mobile_number": _mobile(rng),
+                "contact_date": start + timedelta(days=rng.randint(0, span)),
+                "remaining_amount": round(rng.uniform(10000, 80000), -3),
+                "floors": rng.choice([1, 2]),
+                "building_material": rng.choice(MATERIALS),
+                "created_at": start,
+            }
+
+    counts = {}
+    with engine.begin() as connection:
+        started = time.perf_counter()
+        counts["houses"] = _insert(connection, House, house_rows())
+        counts["receipts"] = counts["contracts"] = 0
+        for receipt_batch in _chunks(receipt_and_contract_rows()):
+            connection.execute(insert(Receipt), [receipt for receipt, _ in receipt_batch])
+            contract_batch = [contract for _, contract in receipt_batch if contract]
+            if contract_batch:
+                connection.execute(insert(Contract), contract_batch)
+            counts["receipts"] += len(receipt_batch)
+            counts["contracts"] += len(contract_batch)
+        counts["payments"] = _insert(connection, Payment, payment_rows())
+        counts["resale"] = _insert(connection, Resale, resale_rows())
+
+        # تحديث المبلغ المدفوع وتاريخ الاستحقاق التالي وحالة المنازل المباعة
+        updates = [
+            {"cid": contract_id, "paid": amount, "due": last_payment[contract_id] + timedelta(days=30)}
+            for contract_id, amount in paid.items()
+        ]
+        for offset in range(0, len(updates), BATCH_SIZE):
+            connection.execute(
+                update(Contract).where(Contract.id == bindparam("cid")).values(
+                    amount_paid=Contract.amount_paid + bindparam("paid"),
+                    next_payment_due_date=bindparam("due"),
+                ),
+                updates[offset:offset + BATCH_SIZE]
+            )
+        connection.execute(update(House).where(House.id.in_(select(Contract.house_id))).values(status="sold"))
+        counts["seconds"] = round(time.perf_counter() - started, 1)
+
+    db = SessionLocal()
+    try:
+        rollups.rebuild(db)
+        sequences.ensure_at_least(db, "receipts", receipts)
+        sequences.ensure_at_least(db, "contracts", len(contracts_meta))
+        db.commit()
+    finally:
+        db.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="ملف قاعدة البيانات (يجب ألا يكون موجوداً)")
+    parser.add_argument("--houses", type=int, default=100000)
+    parser.add_argument("--receipts", type=int, default=500000)
+    parser.add_argument("--payments", type=int, default=1000000)
+    parser.add_argument("--resales", type=int, default=20000)
+    parser.add_argument("--years", type=int, default=3, help="مدى تواريخ البيع بالسنوات")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if os.path.exists(args.database):
+        parser.error(f"{args.database} موجود مسبقاً")
+    # يجب ضبط المسار قبل استيراد database.py
+    os.environ["DATABASE_PATH"] = args.database
+    counts = generate(args.houses, args.receipts, args.payments, args.resales, args.years, args.seed)
+    print(", ".join(f"{name}: {value}" for name, value in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
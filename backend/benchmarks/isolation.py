@@ -0,0 +1,118 @@
+"""
+زمن إضافة الوصولات وحدها ثم أثناء تشغيل التقارير الثقيلة بالتوازي،
+مع مسار القراءة المعزول (DB_READ_ENGINE=1) وبدونه (0)
+
+    python -m benchmarks.generate --database bench.db --houses 10000 --receipts 50000 --payments 100000
+    python -m benchmarks.isolation --database bench.db --writes 200 --readers 8
+
+كل وضع يعمل في عملية منفصلة على نسخة مؤقتة من قاعدة البيانات.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks.common import summarize, print_table
+
+# نقاط القراءة الثقيلة التي تعمل أثناء الكتابة
+REPORTS = [
+    "/api/statistics/monthly?months=24",
+    "/api/resale?limit=500",
+    "/api/contracts/sold-houses",
+    "/api/reports/aging",
+    "/api/export/receipts?format=csv",
+    "/api/search?q=محمد&limit=100",
+]
+
+
+async def worker(writes: int, readers: int) -> list:
+    import httpx
+    import main
+
+    await main.startup_event()
+    transport = httpx.ASGITransport(app=main.app)
+    rows = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def write_loop():
+            latencies, errors = [], 0
+            started = time.perf_counter()
+            for _ in range(writes):
+                request_started = time.perf_counter()
+                response = await client.post("/api/receipts", json={
+                    "receipt_date": date.today().isoformat(),
+                    "buyer_name": "مشتري اختبار",
+                    "mobile_number": "07700000000",
+                    "unit_number": 1,
+                    "block_number": 1,
+                    "unit_area": 200,
+                    "amount_received": 10000,
+                    "remaining_amount": 90000,
+                })
+                latencies.append(time.perf_counter() - request_started)
+                errors += response.status_code != 200
+            return summarize(latencies, time.perf_counter() - started, errors)
+
+        # تسخين
+        for path in REPORTS:
+            await client.get(path)
+
+        rows.append({"load": "writes only", **await write_loop()})
+
+        stop = asyncio.Event()
+        report_count = 0
+
+        async def report_loop(index):
+            nonlocal report_count
+            while not stop.is_set():
+                await client.get(REPORTS[(index + report_count) % len(REPORTS)])
+                report_count += 1
+
+        tasks = [asyncio.create_task(report_loop(index)) for index in range(readers)]
+        await asyncio.sleep(0.2)
+        result = await write_loop()
+        stop.set()
+        await asyncio.gather(*tasks)
+        rows.append({"load": f"writes + {readers} report clients", **result, "reports": report_count})
+    await main.shutdown_event()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="قاعدة بيانات مولّدة عبر benchmarks.generate")
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--readers", type=int, default=8, help="عدد عملاء التقارير المتزامنين")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(worker(args.writes, args.readers))))
+        return
+
+    rows = []
+    for mode in ("1", "0"):
+        workdir = tempfile.mkdtemp()
+        database = os.path.join(workdir, "isolation.db")
+        shutil.copyfile(args.database, database)
+        try:
+            env = dict(os.environ, DATABASE_PATH=database, DB_READ_ENGINE=mode)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.isolation", "--worker", "--database", database,
+                 "--writes", str(args.writes), "--readers", str(args.readers)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        for row in json.loads(output.strip().splitlines()[-1]):
+            rows.append({"read_engine": "isolated" if mode == "1" else "shared", **row})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+قياس الحمل لجميع نقاط API داخل العملية (بدون خادم)
+
+    python -m benchmarks.generate --database bench.db --houses 10000 --receipts 50000 --payments 100000
+    python -m benchmarks.load --database bench.db --clients 20 --requests 25 --output results.json
+    python -m benchmarks.load --database bench.db --baseline results.json
+
+تعمل نقاط الكتابة على نسخة مؤقتة من قاعدة البيانات فتبقى البيانات المولّدة كما هي.
+مع --baseline تُقارن p95 بالنتائج السابقة ويُعاد رمز خروج 1 عند تجاوز --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+
+from benchmarks.common import run_clients, print_table
+
+
+def _scenarios(bounds: dict):
+    """النقاط المقاسة: الاسم -> دالة تبني (method, path, body) من مولّد أرقام عشوائي"""
+    houses = max(bounds["houses"], 1)
+    contracts = max(bounds["contracts"], 1)
+    quarter_start = (date.today() - timedelta(days=365)).isoformat()
+    quarter_end = (date.today() - timedelta(days=275)).isoformat()
+
+    def new_receipt(rng):
+        house_id = rng.randint(1, houses)
+        return ("POST", "/api/receipts", {
+            "receipt_date": date.today().isoformat(),
+            "buyer_name": "مشتري اختبار",
+            "mobile_number": "07700000000",
+            "unit_number": house_id,
+            "block_number": 1,
+            "unit_area": 200,
+            "amount_received": 10000,
+            "remaining_amount": 90000,
+            "house_id": house_id,
+        })
+
+    return {
+        "statistics": lambda rng: ("GET", "/api/statistics", None),
+        "statistics_monthly": lambda rng: ("GET", f"/api/statistics/monthly?months=12&phase={rng.randint(1, 4)}", None),
+        "houses": lambda rng: ("GET", "/api/houses?limit=100", None),
+        "houses_phase": lambda rng: ("GET", f"/api/houses?limit=100&phase={rng.randint(1, 4)}", None),
+        "house": lambda rng: ("GET", f"/api/houses/{rng.randint(1, houses)}", None),
+        "receipts": lambda rng: ("GET", "/api/receipts?limit=100", None),
+        "receipts_range": lambda rng: ("GET", f"/api/receipts?limit=100&date_from={quarter_start}&date_to={quarter_end}", None),
+        "contracts": lambda rng: ("GET", "/api/contracts?limit=100", None),
+        "contract": lambda rng: ("GET", f"/api/contracts/{rng.randint(1, contracts)}", None),
+        "contract_remaining": lambda rng: ("GET", f"/api/contracts/{rng.randint(1, contracts)}/remaining", None),
+        "payments": lambda rng: ("GET", f"/api/payments/contract/{rng.randint(1, contracts)}?limit=100", None),
+        "resale": lambda rng: ("GET", "/api/resale?limit=100", None),
+        "create_receipt": new_receipt,
+    }
+
+
+ENDPOINTS = list(_scenarios({"houses": 1, "receipts": 1, "contracts": 1}))
+
+
+def _bounds(database: str) -> dict:
+    connection = sqlite3.connect(database)
+    try:
+        return {
+            table: connection.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            for table in ("houses", "receipts", "contracts")
+        }
+    finally:
+        connection.close()
+
+
+async def worker(names, clients: int, requests: int, seed: int) -> list:
+    """تشغيل كل نقطة بالتتابع، وداخل كل نقطة عدد من العملاء المتزامنين"""
+    import httpx
+    import main
+
+    scenarios = _scenarios(_bounds(os.environ["DATABASE_PATH"]))
+    await main.startup_event()
+    rows = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in names:
+            build = scenarios[name]
+            rng = random.Random(seed)
+
+            async def send(client_index, request_index):
+                method, path, body = build(rng)
+                response = await client.request(method, path, json=body)
+                return response.status_code == 200
+
+            # تسخين
+            await send(0, 0)
+            rows.append({"endpoint": name, **await run_clients(clients, requests, send)})
+    await main.shutdown_event()
+    return rows
+
+
+def _compare(rows, baseline_path: str, tolerance: float) -> list:
+    """إضافة عمود المقارنة مع النتائج السابقة وإرجاع النقاط المتراجعة"""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {row["endpoint"]: row for row in json.load(file)}
+    regressions = []
+    for row in rows:
+        previous = baseline.get(row["endpoint"])
+        if not previous or not previous["p95_ms"]:
+            row["p95_change"] = "-"
+            continue
+        change = (row["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+        row["p95_change"] = f"{change:+.0f}%"
+        if change > tolerance:
+            regressions.append(row["endpoint"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="قاعدة بيانات مولّدة عبر benchmarks.generate")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, help="النقاط المطلوبة (الافتراضي: الكل)")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=25, help="عدد الطلبات لكل عميل")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="حفظ النتائج بصيغة JSON")
+    parser.add_argument("--baseline", help="ملف نتائج سابق للمقارنة")
+    parser.add_argument("--tolerance", type=float, default=20, help="نسبة زيادة p95 المسموحة")
+    args = parser.parse_args()
+
+    names = args.endpoints or ENDPOINTS
+
+    # نسخة مؤقتة لأن create_receipt يعدّل البيانات، ويجب ضبط المسار قبل استيراد database.py
+    workdir = tempfile.mkdtemp()
+    database = os.path.join(workdir, "load.db")
+    shutil.copyfile(args.database, database)
+    os.environ["DATABASE_PATH"] = database
+    try:
+        rows = asyncio.run(worker(names, args.clients, args.requests, args.seed))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(rows, file, ensure_ascii=False, indent=2)
+
+    regressions = _compare(rows, args.baseline, args.tolerance) if args.baseline else []
+    print_table(rows)
+    if regressions:
+        print(f"تراجع في p95 أكبر من {args.tolerance:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
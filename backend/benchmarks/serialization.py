@@ -0,0 +1,79 @@
+"""
+تكلفة ترميز استجابة قائمة كبيرة لكل صف: كائنات ORM مع Pydantic مقابل الصفوف المختارة مع orjson
+
+    python -m benchmarks.serialization --rows 50000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+
+def _best(fn, repeat: int) -> float:
+    """أفضل زمن من عدة تكرارات (بالثواني)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "serialization.db")
+    from fastapi import Response
+    from pydantic import TypeAdapter
+    from benchmarks.common import print_table
+    from benchmarks.generate import generate
+    from database import SessionLocal
+    from models import Receipt, Contract
+    import main as app_main
+    import serialization
+
+    generate(houses=max(args.rows // 5, 1), receipts=args.rows, payments=0, resales=0)
+
+    rows = []
+    db = SessionLocal()
+    try:
+        for name, model, schema, order_by in (
+            ("receipts", Receipt, app_main.ReceiptResponse, Receipt.receipt_number),
+            ("contracts", Contract, app_main.ContractResponse, Contract.id),
+        ):
+            adapter = TypeAdapter(List[schema])
+
+            def orm_pydantic():
+                # ما يفعله FastAPI مع response_model و from_attributes
+                objects = db.query(model).order_by(order_by).all()
+                content = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+                body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                db.expunge_all()
+                return body
+
+            def rows_fast():
+                result = db.query(*serialization.columns(model, schema)).order_by(order_by).all()
+                return serialization.rows_response(result, Response()).body
+
+            assert json.loads(orm_pydantic()) == json.loads(rows_fast())
+            for mode, fn in (("orm+pydantic", orm_pydantic), ("rows+" + ("orjson" if serialization.orjson else "json"), rows_fast)):
+                seconds = _best(fn, args.repeat)
+                rows.append({
+                    "table": name,
+                    "mode": mode,
+                    "rows": args.rows,
+                    "total_ms": round(seconds * 1000, 1),
+                    "us_per_row": round(seconds / args.rows * 1e6, 2),
+                })
+    finally:
+        db.close()
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
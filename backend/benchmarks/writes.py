@@ -0,0 +1,105 @@
+"""
+عدد عمليات الكتابة في الثانية (وصولات ودفعات) مع عدد متزايد من العملاء المتزامنين،
+مع الكاتب الموحّد (DB_WRITER=1) وبدونه (0)
+
+    python -m benchmarks.generate --database bench.db --houses 10000 --receipts 50000 --payments 100000
+    python -m benchmarks.writes --database bench.db --clients 20 50 100 --requests 20
+
+كل وضع يعمل في عملية منفصلة على نسخة مؤقتة من قاعدة البيانات.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+from benchmarks.common import run_clients, print_table
+
+# الطلب الأبطأ من هذه المدة (ثوانٍ) يُحسب خطأً
+REQUEST_TIMEOUT = 60
+
+
+async def worker(clients_list: list, requests: int, contracts: int) -> list:
+    import httpx
+    import main
+
+    await main.startup_event()
+    # أخطاء الخادم (مثل database is locked) تُحسب أخطاءً بدلاً من إيقاف القياس
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    rows = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def post(client_index, request_index):
+            # وصول ودفعة بالتناوب، كما في ضغط نهاية الشهر
+            if request_index % 2:
+                return await client.post("/api/payments", json={
+                    "contract_id": (client_index * requests + request_index) % contracts + 1,
+                    "payment_date": date.today().isoformat(),
+                    "amount": 100,
+                })
+            return await client.post("/api/receipts", json={
+                "receipt_date": date.today().isoformat(),
+                "buyer_name": "مشتري اختبار",
+                "mobile_number": "07700000000",
+                "unit_number": 1,
+                "block_number": 1,
+                "unit_area": 200,
+                "amount_received": 10000,
+                "remaining_amount": 90000,
+            })
+
+        async def send(client_index, request_index):
+            # بدون الكاتب الموحّد قد تعلق الطلبات بانتظار القفل أو اتصال من المجمع
+            try:
+                response = await asyncio.wait_for(post(client_index, request_index), REQUEST_TIMEOUT)
+            except asyncio.TimeoutError:
+                return False
+            return response.status_code == 200
+
+        await send(0, 0)  # تسخين
+        for clients in clients_list:
+            rows.append({"clients": clients, **await run_clients(clients, requests, send)})
+    await main.shutdown_event()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="قاعدة بيانات مولّدة عبر benchmarks.generate")
+    parser.add_argument("--clients", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--requests", type=int, default=20, help="عدد الطلبات لكل عميل")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        connection = sqlite3.connect(os.environ["DATABASE_PATH"])
+        contracts = connection.execute("SELECT COUNT(*) FROM contracts").fetchone()[0] or 1
+        connection.close()
+        print(json.dumps(asyncio.run(worker(args.clients, args.requests, contracts))))
+        return
+
+    rows = []
+    for mode in ("1", "0"):
+        workdir = tempfile.mkdtemp()
+        database = os.path.join(workdir, "writes.db")
+        shutil.copyfile(args.database, database)
+        try:
+            env = dict(os.environ, DATABASE_PATH=database, DB_WRITER=mode)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.writes", "--worker", "--database", database,
+                 "--clients", *map(str, args.clients), "--requests", str(args.requests)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        for row in json.loads(output.strip().splitlines()[-1]):
+            rows.append({"writer": "group commit" if mode == "1" else "per request", **row})
+    print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,395 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import re
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from fastapi.concurrency import run_in_threadpool
 from models import Base
+import events
+import migrations
+import rollups
+import search
+import sequences
+import versions
 import os
 
-# مسار قاعدة البيانات
-DATABASE_URL = "sqlite:///./real_estate.db"
+# مسار قاعدة البيانات (يمكن تغييره عبر متغيرات البيئة)
+DATABASE_PATH = os.getenv("DATABASE_PATH", "./real_estate.db")
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATABASE_PATH}")
 
-# إنشاء محرك قاعدة البيانات
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # مطلوب لـ SQLite
-)
+# إعدادات SQLite التي تُطبق على كل اتصال جديد
+# performance: WAL + synchronous=NORMAL (لا يحجب القراء أثناء الكتابة)
+# durable: WAL + synchronous=FULL (fsync مع كل commit)
+# default: إعدادات SQLite الافتراضية
+SQLITE_PROFILES = {
+    "performance": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-65536",      # 64MB
+        "mmap_size": "268435456",    # 256MB
+        "temp_store": "MEMORY",
+        "busy_timeout": "5000",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": "-65536",
+        "temp_store": "MEMORY",
+        "busy_timeout": "5000",
+    },
+    "default": {
+        "busy_timeout": "5000",
+    },
+}
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "performance")
+
+
+def sqlite_pragmas():
+    """إعدادات الملف المختار مع إمكانية تجاوز أي إعداد عبر SQLITE_<PRAGMA>"""
+    pragmas = dict(SQLITE_PROFILES.get(SQLITE_PROFILE, SQLITE_PROFILES["default"]))
+    for name in ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout"):
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+def _pool_options(url: str) -> dict:
+    """حجم مجمع الاتصالات (قاعدة البيانات في الذاكرة تستخدم اتصالاً واحداً)"""
+    if ":memory:" in url or url == "sqlite://":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    }
+
+
+POOL_OPTIONS = _pool_options(DATABASE_URL)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """تطبيق إعدادات SQLite وتسجيل دوال البحث على كل اتصال"""
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+    search.register_functions(dbapi_connection)
+
+
+# مسار القراءة المعزول: اتصالات للقراءة فقط (mode=ro) بمجمع منفصل للتقارير والقوائم،
+# فلا تنتظر عمليات الكتابة اتصالاً من المجمع الرئيسي أثناء تقرير طويل.
+# مع WAL لا يحجب القارئ الكاتب. يُعطّل عبر DB_READ_ENGINE=0 ولا يُستخدم مع قاعدة في الذاكرة.
+DB_READ_ENGINE = os.getenv("DB_READ_ENGINE", "1") == "1"
+
+
+def _read_only_url(url: str) -> str:
+    """رابط SQLite بصيغة URI للقراءة فقط"""
+    path = os.path.abspath(url[len("sqlite:///"):])
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+
+def _read_pool_options(pool_options: dict) -> dict:
+    """حجم مجمع القراءة يحدّ عدد التقارير المتزامنة (والباقي ينتظر اتصالاً)، فيبقى للكتابة نصيب من المعالج"""
+    if not pool_options:
+        return {}
+    return dict(
+        pool_options,
+        pool_size=int(os.getenv("DB_READ_POOL_SIZE", str(max(2, os.cpu_count() or 1)))),
+        max_overflow=int(os.getenv("DB_READ_MAX_OVERFLOW", "0")),
+    )
+
+
+def _apply_read_pragmas(dbapi_connection, connection_record):
+    """إعدادات الاتصال للقراءة (journal_mode يخص الكاتب ولا يُضبط من اتصال للقراءة فقط)"""
+    cursor = dbapi_connection.cursor()
+    for name, value in sqlite_pragmas().items():
+        if name not in ("journal_mode", "synchronous"):
+            cursor.execute(f"PRAGMA {name}={value}")
+    cursor.execute("PRAGMA query_only=1")
+    cursor.close()
+    search.register_functions(dbapi_connection)
+
+
+# مسار القراءة غير المتزامن (SQLAlchemy asyncio + aiosqlite)
+# يُفعّل عبر DB_ASYNC=1 ويتطلب تثبيت aiosqlite
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+
+class Database:
+    """محركات وجلسات قاعدة بيانات واحدة (المشروع الافتراضي أو ملف مشروع)"""
+
+    def __init__(self, url: str, project: Optional[str] = None):
+        self.url = url
+        self.project = project
+        pool_options = _pool_options(url)
+
+        self.engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},  # مطلوب لـ SQLite
+            **pool_options
+        )
+        event.listen(self.engine, "connect", _apply_sqlite_pragmas)
+
+        self.read_isolated = DB_READ_ENGINE and bool(pool_options) and url.startswith("sqlite:///")
+        read_url = _read_only_url(url) if self.read_isolated else url
+        read_pool_options = _read_pool_options(pool_options)
+        if self.read_isolated:
+            self.read_engine = create_engine(
+                read_url,
+                connect_args={"check_same_thread": False},
+                **read_pool_options
+            )
+            event.listen(self.read_engine, "connect", _apply_read_pragmas)
+        else:
+            self.read_engine = self.engine
+
+        # التصدير المتدفق يحجز اتصاله طوال التنزيل، فيفتح اتصالاً خاصاً به (NullPool) خارج
+        # مجمع القراءة، حتى لا يستنفد عملاء بطيئون اتصالات التقارير والقوائم
+        if pool_options:
+            self.export_engine = create_engine(
+                read_url,
+                connect_args={"check_same_thread": False},
+                poolclass=NullPool
+            )
+            event.listen(self.export_engine, "connect",
+                         _apply_read_pragmas if self.read_isolated else _apply_sqlite_pragmas)
+        else:
+            self.export_engine = self.read_engine
+
+        # اسم المشروع في info لكل جلسة، لتصل إشعارات التغيير لمشتركي نفس المشروع
+        info = {"project": project}
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine, info=info)
+        # جلسات مسار القراءة (التقارير والقوائم والتصدير)
+        self.ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.read_engine, info=info)
+        # جلسات التصدير (exports.py)
+        self.ExportSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.export_engine, info=info)
+        # نشر إشعارات التغيير (/api/events) بعد كل commit
+        events.track(self.SessionLocal)
+
+        # طابور الكاتب الموحّد لهذه القاعدة (writer.py، يُنشأ عند أول طلب كتابة)
+        self.writer = None
+
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        if DB_ASYNC:
+            # aiosqlite يستخدم NullPool افتراضياً (خيط جديد لكل اتصال)، لذا نحدد المجمع صراحة
+            self.async_engine = create_async_engine(
+                read_url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+                **(dict(read_pool_options, poolclass=AsyncAdaptedQueuePool) if read_pool_options else {})
+            )
+            event.listen(self.async_engine.sync_engine, "connect",
+                         _apply_read_pragmas if self.read_isolated else _apply_sqlite_pragmas)
+            self.AsyncSessionLocal = async_sessionmaker(
+                self.async_engine, autoflush=False, expire_on_commit=False, info=info
+            )
+
+    def init(self):
+        """إنشاء جميع الجداول وتطبيق الترحيلات"""
+        Base.metadata.create_all(bind=self.engine)
+        with self.engine.begin() as connection:
+            migrations.migrate(connection)
+            versions.install_triggers(connection)
+            sequences.install(connection)
+
+    def begin_immediate(self):
+        """
+        اتصال بمعاملة مفتوحة وقفل الكتابة محجوز (للطلب المجمّع والكاتب الموحّد)
+        BEGIN IMMEDIATE صريح لأن pysqlite لا يبدأ المعاملة قبل SAVEPOINT، فيصبح
+        RELEASE الأول تثبيتاً نهائياً
+        """
+        connection = self.engine.connect()
+        try:
+            connection.begin()
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        except Exception:
+            connection.close()
+            raise
+        return connection
+
+    def dispose(self):
+        """إغلاق الاتصالات غير المستخدمة (الاتصالات المحجوزة تُغلق عند إرجاعها)"""
+        if self.writer is not None:
+            self.writer.close()
+        self.engine.dispose()
+        if self.read_engine is not self.engine:
+            self.read_engine.dispose()
+        if self.export_engine is not self.read_engine:
+            self.export_engine.dispose()
+        if self.async_engine is not None:
+            # اتصالات aiosqlite تُغلق من حلقتها، فيُكتفى هنا بفصل المجمع
+            self.async_engine.sync_engine.dispose(close=False)
+
+
+# قاعدة البيانات الافتراضية (DATABASE_URL): الطلبات بدون مشروع
+default_database = Database(DATABASE_URL)
 
-# إنشاء SessionLocal
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# أسماء للتوافق مع الوحدات والسكربتات التي تستخدم القاعدة الافتراضية مباشرة
+engine = default_database.engine
+read_engine = default_database.read_engine
+SessionLocal = default_database.SessionLocal
+ReadSessionLocal = default_database.ReadSessionLocal
+async_engine = default_database.async_engine
+AsyncSessionLocal = default_database.AsyncSessionLocal
 
 
 def init_db():
-    """إنشاء جميع الجداول"""
-    Base.metadata.create_all(bind=engine)
+    """إنشاء جداول القاعدة الافتراضية وتطبيق الترحيلات"""
+    default_database.init()
+
+
+# ==================== المشاريع ====================
+# لكل مشروع (تطوير سكني) ملف SQLite مستقل في PROJECTS_DIR باسم <project>.db،
+# ويُختار المشروع لكل طلب (انظر projects.py). المحركات تُنشأ عند أول طلب
+# وتُحفظ في ذاكرة LRU بحد DB_PROJECT_CACHE، ويُغلق الأقدم عند تجاوزه.
+PROJECTS_DIR = os.getenv(
+    "PROJECTS_DIR", os.path.join(os.path.dirname(os.path.abspath(DATABASE_PATH)), "projects")
+)
+PROJECT_CACHE_SIZE = max(1, int(os.getenv("DB_PROJECT_CACHE", "8")))
+PROJECT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+# المشروع الحالي (None = القاعدة الافتراضية)، ويُعيّن لكل طلب في projects.py
+current_project: ContextVar[Optional[str]] = ContextVar("current_project", default=None)
+
+_projects: "OrderedDict[str, Database]" = OrderedDict()
+_projects_lock = threading.Lock()
+
+
+class ProjectNotFound(LookupError):
+    """لا يوجد ملف قاعدة بيانات للمشروع"""
+
+
+def project_path(project: str) -> str:
+    return os.path.join(PROJECTS_DIR, f"{project}.db")
+
+
+def list_projects() -> List[str]:
+    """أسماء المشاريع الموجودة (ملفات .db في PROJECTS_DIR)"""
+    if not os.path.isdir(PROJECTS_DIR):
+        return []
+    return sorted(
+        name[:-3] for name in os.listdir(PROJECTS_DIR)
+        if name.endswith(".db") and PROJECT_NAME.match(name[:-3])
+    )
+
+
+def get_database(project: Optional[str] = None, create: bool = False) -> Database:
+    """
+    قاعدة بيانات المشروع (تُفتح وتُهيّأ عند أول استخدام)
+    create=True ينشئ ملف المشروع إذا لم يوجد، وإلا ProjectNotFound
+    """
+    if project is None:
+        return default_database
+    with _projects_lock:
+        database = _projects.get(project)
+        if database is not None:
+            _projects.move_to_end(project)
+            return database
+        path = project_path(project)
+        if not os.path.exists(path):
+            if not create:
+                raise ProjectNotFound(project)
+            os.makedirs(PROJECTS_DIR, exist_ok=True)
+        # التهيئة داخل القفل حتى لا يُنشأ محركان لنفس الملف
+        database = Database(f"sqlite:///{path}", project)
+        database.init()
+        db = database.SessionLocal()
+        try:
+            rollups.ensure_rollups(db)
+        finally:
+            db.close()
+        _projects[project] = database
+        while len(_projects) > PROJECT_CACHE_SIZE:
+            _, evicted = _projects.popitem(last=False)
+            evicted.dispose()
+        return database
+
+
+def current_database() -> Database:
+    """قاعدة بيانات مشروع الطلب الحالي"""
+    return get_database(current_project.get())
+
+
+def dispose_projects():
+    """إغلاق محركات المشاريع المفتوحة (عند إيقاف التطبيق)"""
+    with _projects_lock:
+        while _projects:
+            _, database = _projects.popitem()
+            database.dispose()
+
+
+# جلسة الطلب المجمّع (/api/batch): عند تعيينها تستخدم جميع العمليات نفس الجلسة والمعاملة
+batch_session: ContextVar[Optional[Session]] = ContextVar("batch_session", default=None)
+
+
+# طلب الكتابة الحالي في الكاتب الموحّد (writer.py): له connection بمعاملة المجموعة
+# المفتوحة و notifications لإشعاراته التي تُنشر بعد تثبيت المجموعة
+write_slot: ContextVar = ContextVar("write_slot", default=None)
 
 
 def get_db():
     """الحصول على جلسة قاعدة البيانات"""
-    db = SessionLocal()
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
+    slot = write_slot.get()
+    if slot is not None:
+        # commit داخل المعالج يصبح SAVEPOINT، والتثبيت الفعلي مرة واحدة للمجموعة
+        db = Session(
+            bind=slot.connection, autoflush=False, join_transaction_mode="create_savepoint",
+            info={"project": current_project.get()}
+        )
+        try:
+            yield db
+        finally:
+            slot.notifications.extend(events.take_pending(db))
+            db.close()
+        return
+    db = current_database().SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_readonly_db():
+    """جلسة للقراءة فقط من مسار القراءة المعزول (أو جلسة الطلب المجمّع لترى ما كتبه)"""
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
+    db = current_database().ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+async def get_async_db():
+    """الحصول على جلسة غير متزامنة (أو جلسة الطلب المجمّع، و run_query يتعامل مع الاثنين)"""
+    shared = batch_session.get()
+    if shared is not None:
+        yield shared
+        return
+    async with current_database().AsyncSessionLocal() as db:
+        yield db
+
+
+# جلسة نقاط القراءة: غير متزامنة إذا كان DB_ASYNC مفعلاً، وإلا جلسة القراءة فقط
+get_read_db = get_async_db if DB_ASYNC else get_readonly_db
+
+
+async def run_query(db, fn, *args, **kwargs):
+    """
+    تنفيذ دالة استعلام متزامنة تستقبل Session كأول معامل،
+    عبر run_sync للجلسة غير المتزامنة أو في threadpool للجلسة العادية
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
@@ -0,0 +1,118 @@
+"""
+بث التغييرات للمتصفحات (Server-Sent Events على GET /api/events)
+
+معالجات الكتابة تسجّل إشعاراً مختصراً بـ emit() داخل الجلسة، ويُنشر بعد نجاح
+commit فقط (ويُلغى مع rollback). في الطلب المجمّع تُنشر الإشعارات بعد تثبيت المعاملة كاملة.
+الموزّع داخل العملية (asyncio): لكل مشترك طابور محدود، والمشترك البطيء الذي
+يمتلئ طابوره يُبلّغ بحدث resync بدلاً من حجز الذاكرة أو إبطاء الباقين.
+كل مشترك يتلقى إشعارات مشروعه فقط (project في info الجلسة، انظر database.Database).
+"""
+import asyncio
+import logging
+import os
+from typing import List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import serialization
+
+logger = logging.getLogger("events")
+
+# حجم طابور كل مشترك (يكفي طلباً مجمّعاً كاملاً)، والمدة بين رسائل الإبقاء على الاتصال (ثوانٍ)
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+_PENDING = "pending_events"
+
+
+def emit(db: Session, entity: str, id: int, operation: str, **fields):
+    """تسجيل إشعار تغيير يُنشر بعد commit (الحقول ذات القيمة None تُحذف)"""
+    notification = {"entity": entity, "id": id, "op": operation}
+    notification.update({key: value for key, value in fields.items() if value is not None})
+    db.info.setdefault(_PENDING, []).append(notification)
+
+
+def take_pending(db: Session) -> List[dict]:
+    """إخراج الإشعارات المعلّقة من الجلسة"""
+    return db.info.pop(_PENDING, [])
+
+
+class Subscriber:
+    def __init__(self, project: Optional[str] = None):
+        self.project = project
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Broker:
+    """توزيع الإشعارات على جميع المشتركين"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, project: Optional[str] = None) -> Subscriber:
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(project)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, notifications: List[dict], project: Optional[str] = None):
+        """النشر من أي خيط (المعالجات المتزامنة تعمل في threadpool)"""
+        if not notifications or not self.subscribers or self.loop is None or self.loop.is_closed():
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._fanout, notifications, project)
+        except RuntimeError:  # الحلقة أُغلقت أثناء الإيقاف
+            pass
+
+    def _fanout(self, notifications: List[dict], project: Optional[str]):
+        for subscriber in list(self.subscribers):
+            if subscriber.overflowed or subscriber.project != project:
+                continue
+            for notification in notifications:
+                try:
+                    subscriber.queue.put_nowait(notification)
+                except asyncio.QueueFull:
+                    subscriber.overflowed = True
+                    logger.warning("events subscriber queue full, asking it to resync")
+                    break
+
+    async def stream(self, is_disconnected, project: Optional[str] = None):
+        """مولّد نص SSE لمشترك واحد"""
+        subscriber = self.subscribe(project)
+        try:
+            yield "retry: 3000\n\n"
+            while not await is_disconnected():
+                if subscriber.overflowed:
+                    # الطابور امتلأ: الإشعارات الحالية ناقصة، فيعيد العميل تحميل ما يعرضه
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.overflowed = False
+                    yield "event: resync\ndata: {}\n\n"
+                    continue
+                try:
+                    notification = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield "event: change\ndata: " + serialization.dumps(notification).decode("utf-8") + "\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+
+broker = Broker()
+
+
+def track(session_factory):
+    """نشر إشعارات جلسات session_factory بعد commit وإلغاؤها مع rollback"""
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(db: Session):
+        broker.publish(take_pending(db), db.info.get("project"))
+
+    @event.listens_for(session_factory, "after_soft_rollback")
+    def _after_rollback(db: Session, previous_transaction):
+        take_pending(db)
@@ -0,0 +1,73 @@
+"""
+تصدير الجداول بشكل متدفق (CSV أو NDJSON)
+
+تُقرأ الصفوف على دفعات من مؤشر قاعدة البيانات وتُرسل مباشرة للعميل،
+فيبقى استهلاك الذاكرة ثابتاً مهما كان عدد الصفوف.
+"""
+import csv
+import io
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import select
+from database import current_database
+from models import House, Receipt, Contract, Resale, Payment
+from serialization import dumps
+
+EXPORT_BATCH_SIZE = 1000
+
+# الجدول -> (النموذج، عمود التاريخ للتصفية، أعمدة الترتيب)
+EXPORT_TABLES = {
+    "houses": (House, House.created_at, [House.house_number]),
+    "receipts": (Receipt, Receipt.receipt_date, [Receipt.receipt_date, Receipt.receipt_number]),
+    "contracts": (Contract, Contract.sale_date, [Contract.sale_date, Contract.id]),
+    "payments": (Payment, Payment.payment_date, [Payment.payment_date, Payment.id]),
+    "resale": (Resale, Resale.contact_date, [Resale.contact_date, Resale.id]),
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _build_query(table: str, date_from: Optional[date], date_to: Optional[date]):
+    model, date_column, order_by = EXPORT_TABLES[table]
+    columns = list(model.__table__.columns)
+    query = select(*columns).order_by(*order_by)
+
+    # أعمدة DateTime تُقارن ببداية اليوم
+    is_datetime = date_column.type.python_type is datetime
+    if date_from:
+        query = query.where(date_column >= (datetime.combine(date_from, time.min) if is_datetime else date_from))
+    if date_to:
+        if is_datetime:
+            query = query.where(date_column < datetime.combine(date_to + timedelta(days=1), time.min))
+        else:
+            query = query.where(date_column <= date_to)
+    return [column.name for column in columns], query
+
+
+def stream_export(table: str, fmt: str, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """مولّد يُخرج محتوى التصدير على دفعات"""
+    names, query = _build_query(table, date_from, date_to)
+    # يبدأ المولّد داخل سياق الطلب، فيُقرأ من قاعدة بيانات مشروعه (باتصال خارج مجمع القراءة)
+    db = current_database().ExportSessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # BOM ليتعرف Excel على الترميز العربي
+            buffer.write("\ufeff")
+            writer.writerow(names)
+            for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for partition in result.partitions():
+                yield b"".join(dumps(dict(zip(names, row))) + b"\n" for row in partition)
+    finally:
+        db.close()
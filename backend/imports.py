@@ -0,0 +1,189 @@
+"""
+الاستيراد الجماعي للمنازل والوصولات
+
+يتم التحقق من جميع الصفوف أولاً، ثم فحص تكرار الأرقام باستعلام واحد لكل دفعة،
+ثم الإدراج على دفعات (executemany) مع تقرير أخطاء لكل صف.
+"""
+import csv
+import io
+from typing import List, Type
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import House, Receipt, Contract, HouseArchive
+import events
+import rollups
+import sequences
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def parse_csv(content: bytes) -> List[dict]:
+    """قراءة ملف CSV (مع أو بدون BOM) إلى قائمة قواميس"""
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    return [dict(row) for row in reader]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _validate(rows: List[dict], schema, key: str, errors: list):
+    """التحقق من الصفوف وإرجاع الصالحة منها مع رقم الصف"""
+    valid = []
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": index, "errors": ["الصف يجب أن يكون كائناً"]})
+            continue
+        # الحقول الفارغة في CSV تعني عدم وجود قيمة
+        row = {k: (None if v == "" else v) for k, v in row.items() if k}
+        try:
+            item = schema(**row)
+        except ValidationError as exc:
+            errors.append({
+                "row": index,
+                "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()]
+            })
+            continue
+        valid.append((index, item))
+    return valid
+
+
+def _drop_duplicates(valid, key: str, errors: list):
+    """استبعاد الصفوف المكررة الرقم داخل الملف (يُبقى أولها)"""
+    result = []
+    seen = set()
+    for index, item in valid:
+        value = getattr(item, key)
+        if value is not None and value in seen:
+            errors.append({"row": index, "errors": [f"{key}: مكرر داخل الملف"]})
+            continue
+        seen.add(value)
+        result.append((index, item))
+    return result
+
+
+def _duplicates(valid, key: str) -> List:
+    """الأرقام المكررة داخل الملف"""
+    seen = set()
+    duplicates = set()
+    for _, item in valid:
+        value = getattr(item, key)
+        if value is not None:
+            (duplicates if value in seen else seen).add(value)
+    return sorted(duplicates)
+
+
+def _drop_existing(db: Session, valid, columns, key: str, errors: list):
+    """استبعاد الصفوف التي توجد أرقامها مسبقاً في قاعدة البيانات (في أي من الأعمدة، مثل الجدول وأرشيفه)"""
+    values = [getattr(item, key) for _, item in valid if getattr(item, key) is not None]
+    existing = set()
+    for chunk in _chunks(values, IMPORT_BATCH_SIZE):
+        for column in columns:
+            existing.update(value for (value,) in db.query(column).filter(column.in_(chunk)))
+    result = []
+    for index, item in valid:
+        if getattr(item, key) in existing:
+            errors.append({"row": index, "errors": [f"{key}: موجود مسبقاً"]})
+        else:
+            result.append((index, item))
+    return result
+
+
+def _report(rows, inserted, errors):
+    errors.sort(key=lambda e: e["row"])
+    return {"total": len(rows), "inserted": inserted, "errors": errors}
+
+
+def import_houses(db: Session, rows: List[dict], schema: Type[BaseModel]):
+    """استيراد المنازل على دفعات"""
+    errors = []
+    valid = _validate(rows, schema, "house_number", errors)
+    valid = _drop_duplicates(valid, "house_number", errors)
+    # أرقام المنازل المؤرشفة محجوزة أيضاً، كما في POST /api/houses
+    valid = _drop_existing(db, valid, (House.house_number, HouseArchive.house_number), "house_number", errors)
+
+    for batch in _chunks(valid, IMPORT_BATCH_SIZE):
+        db.execute(insert(House), [dict(item.dict(), status='available') for _, item in batch])
+        events.emit(db, "house", None, "import", count=len(batch))
+        db.commit()
+
+    return _report(rows, len(valid), errors)
+
+
+def import_receipts(db: Session, rows: List[dict], schema: Type[BaseModel]):
+    """استيراد الوصولات على دفعات مع إنشاء العقود وتحديث حالة المنازل كما في الإضافة الفردية"""
+    errors = []
+    valid = _validate(rows, schema, "receipt_number", errors)
+    # رقم الوصل يُطبع على الورق، فتكراره داخل الملف خطأ في الملف كله وليس في صف
+    duplicates = _duplicates(valid, "receipt_number")
+    if duplicates:
+        raise HTTPException(
+            status_code=400,
+            detail=f"أرقام وصولات مكررة داخل الملف: {', '.join(str(number) for number in duplicates)}"
+        )
+    valid = _drop_existing(db, valid, (Receipt.receipt_number,), "receipt_number", errors)
+
+    # رفع العدّاد فوق جميع الأرقام اليدوية في الملف قبل حجز أي رقم، حتى لا يُحجز رقم يدوي في دفعة لاحقة
+    explicit = [item.receipt_number for _, item in valid if item.receipt_number is not None]
+    if explicit:
+        sequences.ensure_at_least(db, "receipts", max(explicit))
+
+    for batch in _chunks(valid, IMPORT_BATCH_SIZE):
+        receipts = [item for _, item in batch]
+
+        # حجز أرقام للوصولات التي لا تحمل رقماً
+        missing = [item for item in receipts if item.receipt_number is None]
+        if missing:
+            first = sequences.allocate(db, "receipts", len(missing))
+            for offset, item in enumerate(missing):
+                item.receipt_number = first + offset
+        db.execute(insert(Receipt), [item.dict() for item in receipts])
+
+        house_ids = {item.house_id for item in receipts if item.house_id}
+        houses = {}
+        if house_ids:
+            houses = {
+                house_id: (total_price, loan_amount)
+                for house_id, total_price, loan_amount in db.query(
+                    House.id, House.total_price, House.loan_amount
+                ).filter(House.id.in_(house_ids))
+            }
+
+        # إنشاء عقد تلقائياً لكل وصل مرتبط بمنزل موجود
+        linked = [receipt for receipt in receipts if receipt.house_id in houses]
+        contract_number = sequences.allocate(db, "contracts", len(linked)) if linked else 0
+        contracts = []
+        for offset, receipt in enumerate(linked):
+            total_price, loan_amount = houses[receipt.house_id]
+            contracts.append({
+                "sale_date": receipt.receipt_date,
+                "house_number": receipt.unit_number,
+                "block_number": receipt.block_number,
+                "area": receipt.unit_area,
+                "floors": 1,
+                "buyer_name": receipt.buyer_name,
+                "mobile_number": receipt.mobile_number,
+                "sale_type": 'بيع أول مرة',
+                "total_amount": total_price or (receipt.amount_received + receipt.remaining_amount),
+                "down_payment": receipt.amount_received,
+                "loan_amount": loan_amount or receipt.remaining_amount,
+                "amount_paid": receipt.amount_received,
+                "contract_date": receipt.receipt_date,
+                "contract_number": contract_number + offset,
+                "house_id": receipt.house_id,
+            })
+
+        if contracts:
+            contract_ids = db.scalars(insert(Contract).returning(Contract.id), contracts).all()
+            db.query(House).filter(House.id.in_(list(houses))).update(
+                {House.status: 'sold'}, synchronize_session=False
+            )
+            rollups.record(db, contract_ids)
+            events.emit(db, "contract", None, "import", count=len(contract_ids))
+        events.emit(db, "receipt", None, "import", count=len(receipts))
+        db.commit()
+
+    return _report(rows, len(valid), errors)
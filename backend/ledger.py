@@ -0,0 +1,111 @@
+"""
+المبلغ المدفوع في العقود (amount_paid) ومطابقته مع جدول الدفعات
+
+amount_paid = initial_paid (المدفوع عند التعاقد) + مجموع الدفعات.
+الإضافة والحذف تتم بزيادة أو إنقاص داخل قاعدة البيانات بعبارة UPDATE واحدة،
+فلا تضيع دفعة عند وصول دفعتين لنفس العقد في نفس الوقت.
+
+المطابقة (عرض العقود المختلفة فقط):
+    python ledger.py
+التصحيح:
+    python ledger.py --fix
+"""
+from typing import Optional
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import Session
+from models import Contract, Payment
+import events
+import rollups
+
+# فرق التقريب المسموح في المبالغ
+TOLERANCE = 0.005
+
+
+def apply_payment(db: Session, contract_id: int, amount: float) -> Optional[float]:
+    """
+    إضافة مبلغ (أو إنقاصه بقيمة سالبة) إلى amount_paid مع تحديث الإحصائيات،
+    وإرجاع القيمة الجديدة (retract يحجز قفل الكتابة قبل قراءة الإحصائيات).
+    """
+    rollups.retract(db, [contract_id])
+    amount_paid = db.execute(
+        update(Contract).where(Contract.id == contract_id).values(
+            amount_paid=func.coalesce(Contract.amount_paid, 0) + amount
+        ).returning(Contract.amount_paid).execution_options(synchronize_session=False)
+    ).scalar()
+    rollups.record(db, [contract_id])
+    # RETURNING يُرجع القيمة قبل تطبيق نوع العمود (150 بدلاً من 150.0)
+    return None if amount_paid is None else float(amount_paid)
+
+
+def reset_initial_paid(db: Session, contract_id: int):
+    """عند تعديل amount_paid يدوياً يُحسب المدفوع عند التعاقد من جديد"""
+    db.execute(
+        update(Contract).where(Contract.id == contract_id).values(
+            initial_paid=Contract.amount_paid - _payments_total(Contract.id)
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def _payments_total(contract_id):
+    return select(func.coalesce(func.sum(Payment.amount), 0)).where(
+        Payment.contract_id == contract_id
+    ).scalar_subquery()
+
+
+# المبلغ المتوقع لكل عقد من جدول الدفعات (تجميع واحد بدلاً من استعلام فرعي لكل عقد)
+_EXPECTED = """
+    SELECT contracts.id AS id,
+           contracts.contract_number AS contract_number,
+           contracts.amount_paid AS amount_paid,
+           COALESCE(contracts.initial_paid, contracts.down_payment, 0) + COALESCE(totals.total, 0) AS expected
+    FROM contracts
+    LEFT JOIN (SELECT contract_id, SUM(amount) AS total FROM payments GROUP BY contract_id) AS totals
+        ON totals.contract_id = contracts.id
+"""
+
+
+def reconcile(db: Session, fix: bool = False, sample: Optional[int] = 100):
+    """
+    مقارنة amount_paid بمجموع الدفعات لجميع العقود، وتصحيح المختلفة بعبارة UPDATE واحدة
+    عند fix=True (ثم إعادة بناء جداول الإحصائيات)
+    """
+    drift = f"SELECT * FROM ({_EXPECTED}) WHERE ABS(COALESCE(amount_paid, 0) - expected) > :tolerance"
+    drifted = [row._asdict() for row in db.execute(
+        text(f"{drift} ORDER BY id" + (" LIMIT :sample" if sample else "")),
+        {"tolerance": TOLERANCE, "sample": sample}
+    )]
+    drifted_count = db.execute(text(f"SELECT COUNT(*) FROM ({drift})"), {"tolerance": TOLERANCE}).scalar()
+    checked = db.query(func.count(Contract.id)).scalar()
+
+    fixed = 0
+    if fix and drifted_count:
+        fixed = db.execute(text(f"""
+            UPDATE contracts SET amount_paid = expected.expected
+            FROM ({_EXPECTED}) AS expected
+            WHERE contracts.id = expected.id
+              AND ABS(COALESCE(contracts.amount_paid, 0) - expected.expected) > :tolerance
+        """), {"tolerance": TOLERANCE}).rowcount
+        rollups.rebuild(db)
+        events.emit(db, "contract", None, "reconcile", count=fixed)
+        db.commit()
+
+    return {"checked": checked, "drifted_count": drifted_count, "fixed": fixed, "drifted": drifted}
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="مطابقة amount_paid مع جدول الدفعات")
+    parser.add_argument("--fix", action="store_true", help="تصحيح العقود المختلفة")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        report = reconcile(db, fix=args.fix, sample=None)
+        for row in report["drifted"]:
+            print(f"DRIFT contract {row['contract_number']}: {row['amount_paid']} (expected {row['expected']})")
+        print(f"checked: {report['checked']}, drifted: {report['drifted_count']}, fixed: {report['fixed']}")
+    finally:
+        db.close()
@@ -1,14 +1,46 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import csv
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
 from datetime import date, datetime
-from database import get_db, init_db
-from models import House, Receipt, Contract, Resale, Payment
+from database import (
+    get_db, get_read_db, get_readonly_db, run_query, init_db, SessionLocal, async_engine,
+    current_project, dispose_projects
+)
+from models import House, Receipt, Contract, Resale, Payment, HouseArchive, ContractArchive
+from pagination import PageParams, paginate
+import archive
+import batch
+import events
+import exports
+import imports
+import ledger
+import metrics
+import projects
+import reports
+import rollups
+import search
+import sequences
+import serialization
+import sync
+import versions
+import writer
 from pydantic import BaseModel
 
 app = FastAPI(title="Real Estate Management API", version="1.0.0")
 
+# تجميع طلبات الكتابة المتزامنة في معاملة واحدة (DB_WRITER=1)، داخل اختيار المشروع
+app.add_middleware(writer.WriterMiddleware)
+
+# اختيار قاعدة بيانات المشروع لكل طلب (X-Project أو /projects/<name>/api/...)
+# يُضاف أولاً ليكون داخل CORS فتحمل أخطاؤه ترويسات CORS أيضاً
+app.add_middleware(projects.ProjectMiddleware)
+
 # إعداد CORS للسماح بالاتصال من المتصفح
 app.add_middleware(
     CORSMiddleware,
@@ -16,12 +48,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag", "Last-Modified"],
 )
 
+# قياس زمن كل طلب وعدد استعلاماته (يُعرض على /metrics)
+app.add_middleware(metrics.MetricsMiddleware)
+
 # تهيئة قاعدة البيانات عند بدء التطبيق
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    db = SessionLocal()
+    try:
+        rollups.ensure_rollups(db)
+    finally:
+        db.close()
+    app.state.archive_task = asyncio.create_task(archive.schedule()) if archive.INTERVAL_HOURS > 0 else None
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if getattr(app.state, "archive_task", None) is not None:
+        app.state.archive_task.cancel()
+    if async_engine is not None:
+        await async_engine.dispose()
+    await run_in_threadpool(dispose_projects)
 
 
 # ==================== Pydantic Models ====================
@@ -66,7 +116,8 @@ class ReceiptBase(BaseModel):
     house_id: Optional[int] = None
 
 class ReceiptCreate(ReceiptBase):
-    pass
+    # بدون رقم يُحجز الرقم التالي تلقائياً
+    receipt_number: Optional[int] = None
 
 class ReceiptResponse(ReceiptBase):
     id: int
@@ -97,7 +148,8 @@ class ContractBase(BaseModel):
     house_id: Optional[int] = None
 
 class ContractCreate(ContractBase):
-    pass
+    # بدون رقم يُحجز الرقم التالي تلقائياً
+    contract_number: Optional[int] = None
 
 class ContractResponse(ContractBase):
     id: int
@@ -155,20 +207,46 @@ class PaymentResponse(PaymentBase):
 
 # ==================== Houses Endpoints ====================
 
-@app.get("/api/houses", response_model=List[HouseResponse])
-def get_houses(phase: Optional[int] = None, include_sold: bool = True, db: Session = Depends(get_db)):
-    """الحصول على جميع المنازل"""
-    query = db.query(House)
+def _query_houses(db: Session, response: Response, phase, include_sold, block, status, include_archived,
+                  page: PageParams):
+    """استعلام المنازل (مشترك بين الجلسة المتزامنة وغير المتزامنة)"""
+    houses = archive.source(House, include_archived)
+    query = db.query(*serialization.columns(houses, HouseResponse))
     if not include_sold:
-        query = query.filter(House.status == 'available')
+        query = query.filter(houses.status == 'available')
     if phase:
-        query = query.filter(House.phase == phase)
-    return query.order_by(House.house_number).all()
+        query = query.filter(houses.phase == phase)
+    if block:
+        query = query.filter(houses.block_number == block)
+    if status:
+        query = query.filter(houses.status == status)
+    return serialization.rows_response(paginate(query, [houses.house_number], page, response), response)
+
+@app.get("/api/houses", response_model=List[HouseResponse])
+async def get_houses(
+    request: Request,
+    response: Response,
+    phase: Optional[int] = None,
+    include_sold: bool = True,
+    block: Optional[int] = None,
+    status: Optional[str] = None,
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
+):
+    """الحصول على جميع المنازل (مع المنازل المحذوفة المؤرشفة عند include_archived)"""
+    not_modified = await run_query(db, versions.not_modified, request, response, ["houses"])
+    if not_modified:
+        return not_modified
+    return await run_query(db, _query_houses, response, phase, include_sold, block, status, include_archived, page)
 
 @app.get("/api/houses/{house_id}", response_model=HouseResponse)
-def get_house(house_id: int, db: Session = Depends(get_db)):
+def get_house(house_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """الحصول على منزل محدد"""
-    house = db.query(House).filter(House.id == house_id).first()
+    not_modified = versions.not_modified(db, request, response, ["houses"])
+    if not_modified:
+        return not_modified
+    house = archive.get(db, House, house_id)
     if not house:
         raise HTTPException(status_code=404, detail="المنزل غير موجود")
     return house
@@ -177,12 +255,16 @@ def get_house(house_id: int, db: Session = Depends(get_db)):
 def create_house(house: HouseCreate, db: Session = Depends(get_db)):
     """إضافة منزل جديد"""
     # التحقق من عدم وجود منزل بنفس الرقم
-    existing = db.query(House).filter(House.house_number == house.house_number).first()
+    existing = db.query(House.id).filter(House.house_number == house.house_number).first() or db.query(
+        HouseArchive.id
+    ).filter(HouseArchive.house_number == house.house_number).first()
     if existing:
         raise HTTPException(status_code=400, detail="يوجد منزل بنفس الرقم")
     
     db_house = House(**house.dict(), status='available')
     db.add(db_house)
+    db.flush()
+    events.emit(db, "house", db_house.id, "create", status=db_house.status)
     db.commit()
     db.refresh(db_house)
     return db_house
@@ -194,8 +276,13 @@ def update_house(house_id: int, house: HouseCreate, db: Session = Depends(get_db
     if not db_house:
         raise HTTPException(status_code=404, detail="المنزل غير موجود")
     
+    # المرحلة والتطلوعة تدخلان في إحصائيات عقود هذا المنزل
+    rollups.retract(db, house_id=house_id)
     for key, value in house.dict().items():
         setattr(db_house, key, value)
+    db.flush()
+    rollups.record(db, house_id=house_id)
+    events.emit(db, "house", house_id, "update", status=db_house.status)
     
     db.commit()
     db.refresh(db_house)
@@ -209,6 +296,7 @@ def update_house_status(house_id: int, status: str, db: Session = Depends(get_db
         raise HTTPException(status_code=404, detail="المنزل غير موجود")
     
     db_house.status = status
+    events.emit(db, "house", house_id, "update", status=status)
     db.commit()
     return {"success": True}
 
@@ -220,20 +308,56 @@ def delete_house(house_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="المنزل غير موجود")
     
     db_house.status = 'deleted'
+    events.emit(db, "house", house_id, "delete", status='deleted')
     db.commit()
     return {"success": True}
 
 
 # ==================== Receipts Endpoints ====================
 
+def _query_receipts(db: Session, response: Response, date_from, date_to, block, house_id, buyer, page: PageParams):
+    """استعلام الوصولات (مشترك بين الجلسة المتزامنة وغير المتزامنة)"""
+    query = db.query(*serialization.columns(Receipt, ReceiptResponse))
+    if date_from:
+        query = query.filter(Receipt.receipt_date >= date_from)
+    if date_to:
+        query = query.filter(Receipt.receipt_date <= date_to)
+    if block:
+        query = query.filter(Receipt.block_number == block)
+    if house_id:
+        query = query.filter(Receipt.house_id == house_id)
+    if buyer:
+        query = query.filter(or_(
+            Receipt.buyer_name.contains(buyer, autoescape=True),
+            Receipt.mobile_number.contains(buyer, autoescape=True)
+        ))
+    rows = paginate(query, [Receipt.receipt_date, Receipt.receipt_number], page, response, descending=True)
+    return serialization.rows_response(rows, response)
+
 @app.get("/api/receipts", response_model=List[ReceiptResponse])
-def get_receipts(db: Session = Depends(get_db)):
+async def get_receipts(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    block: Optional[int] = None,
+    house_id: Optional[int] = None,
+    buyer: Optional[str] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
+):
     """الحصول على جميع الوصولات"""
-    return db.query(Receipt).order_by(Receipt.receipt_date.desc(), Receipt.receipt_number.desc()).all()
+    not_modified = await run_query(db, versions.not_modified, request, response, ["receipts"])
+    if not_modified:
+        return not_modified
+    return await run_query(db, _query_receipts, response, date_from, date_to, block, house_id, buyer, page)
 
 @app.get("/api/receipts/{receipt_id}", response_model=ReceiptResponse)
-def get_receipt(receipt_id: int, db: Session = Depends(get_db)):
+def get_receipt(receipt_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """الحصول على وصل محدد"""
+    not_modified = versions.not_modified(db, request, response, ["receipts"])
+    if not_modified:
+        return not_modified
     receipt = db.query(Receipt).filter(Receipt.id == receipt_id).first()
     if not receipt:
         raise HTTPException(status_code=404, detail="الوصول غير موجود")
@@ -242,10 +366,15 @@ def get_receipt(receipt_id: int, db: Session = Depends(get_db)):
 @app.post("/api/receipts", response_model=ReceiptResponse)
 def create_receipt(receipt: ReceiptCreate, db: Session = Depends(get_db)):
     """إضافة وصل جديد"""
-    # التحقق من عدم وجود وصل بنفس الرقم
-    existing = db.query(Receipt).filter(Receipt.receipt_number == receipt.receipt_number).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="يوجد وصل بنفس الرقم")
+    if receipt.receipt_number is None:
+        receipt.receipt_number = sequences.allocate(db, "receipts")
+    else:
+        # رفع العدّاد أولاً يحجز قفل الكتابة، فلا يسبقنا طلب آخر بين الفحص والإدراج
+        sequences.ensure_at_least(db, "receipts", receipt.receipt_number)
+        # التحقق من عدم وجود وصل بنفس الرقم
+        existing = db.query(Receipt).filter(Receipt.receipt_number == receipt.receipt_number).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="يوجد وصل بنفس الرقم")
     
     db_receipt = Receipt(**receipt.dict())
     db.add(db_receipt)
@@ -255,9 +384,10 @@ def create_receipt(receipt: ReceiptCreate, db: Session = Depends(get_db)):
         house = db.query(House).filter(House.id == receipt.house_id).first()
         if house:
             house.status = 'sold'
+            events.emit(db, "house", house.id, "update", status='sold')
             
             # إنشاء عقد تلقائياً
-            contract_number = db.query(Contract).count() + 1
+            contract_number = sequences.allocate(db, "contracts")
             contract = Contract(
                 sale_date=receipt.receipt_date,
                 house_number=receipt.unit_number,
@@ -276,7 +406,15 @@ def create_receipt(receipt: ReceiptCreate, db: Session = Depends(get_db)):
                 house_id=receipt.house_id
             )
             db.add(contract)
+            db.flush()
+            rollups.record(db, [contract.id])
+            events.emit(
+                db, "contract", contract.id, "create",
+                total_amount=contract.total_amount, amount_paid=contract.amount_paid
+            )
     
+    db.flush()
+    events.emit(db, "receipt", db_receipt.id, "create", amount_received=db_receipt.amount_received)
     db.commit()
     db.refresh(db_receipt)
     return db_receipt
@@ -299,65 +437,126 @@ def delete_receipt(receipt_id: int, db: Session = Depends(get_db)):
         ).first()
         
         if contract:
+            rollups.retract(db, [contract.id])
             # حذف المدفوعات المرتبطة
             db.query(Payment).filter(Payment.contract_id == contract.id).delete()
             # حذف العقد
             db.delete(contract)
+            events.emit(db, "contract", contract.id, "delete")
     
     # حذف الوصل
     db.delete(receipt)
+    events.emit(db, "receipt", receipt_id, "delete")
     
-    # تحديث حالة المنزل إذا لم تكن هناك عقود أخرى
+    # تحديث حالة المنزل إذا لم تكن هناك عقود أخرى (ولا عقود مسددة مؤرشفة)
     if house_id:
-        other_contracts = db.query(Contract).filter(Contract.house_id == house_id).count()
+        contracts = archive.source(Contract, True)
+        other_contracts = db.query(func.count(contracts.id)).filter(contracts.house_id == house_id).scalar()
         if other_contracts == 0:
             house = db.query(House).filter(House.id == house_id).first()
             if house:
                 house.status = 'available'
+                events.emit(db, "house", house_id, "update", status='available')
     
     db.commit()
     return {"success": True}
 
 
+@app.get("/api/sequences/{name}/next")
+def get_next_number(name: str, db: Session = Depends(get_db)):
+    """الرقم التالي المقترح (contracts أو receipts) دون حجزه"""
+    if name not in sequences.SEQUENCES:
+        raise HTTPException(status_code=404, detail="العدّاد غير موجود")
+    return {"next_number": sequences.peek_next(db, name)}
+
+
 # ==================== Contracts Endpoints ====================
 
+def _query_contracts(db: Session, response: Response, date_from, date_to, phase, block, buyer, include_archived,
+                     page: PageParams):
+    """استعلام العقود (مشترك بين الجلسة المتزامنة وغير المتزامنة)"""
+    contracts = archive.source(Contract, include_archived)
+    query = db.query(*serialization.columns(contracts, ContractResponse))
+    if date_from:
+        query = query.filter(contracts.sale_date >= date_from)
+    if date_to:
+        query = query.filter(contracts.sale_date <= date_to)
+    if phase:
+        houses = archive.source(House, include_archived)
+        query = query.join(houses, houses.id == contracts.house_id).filter(houses.phase == phase)
+    if block:
+        query = query.filter(contracts.block_number == block)
+    if buyer:
+        query = query.filter(or_(
+            contracts.buyer_name.contains(buyer, autoescape=True),
+            contracts.mobile_number.contains(buyer, autoescape=True)
+        ))
+    rows = paginate(query, [contracts.sale_date, contracts.id], page, response, descending=True)
+    return serialization.rows_response(rows, response)
+
 @app.get("/api/contracts", response_model=List[ContractResponse])
-def get_contracts(db: Session = Depends(get_db)):
-    """الحصول على جميع العقود"""
-    return db.query(Contract).order_by(Contract.sale_date.desc()).all()
+async def get_contracts(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    phase: Optional[int] = None,
+    block: Optional[int] = None,
+    buyer: Optional[str] = None,
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db)
+):
+    """الحصول على جميع العقود (مع العقود المسددة المؤرشفة عند include_archived)"""
+    not_modified = await run_query(db, versions.not_modified, request, response, ["contracts"])
+    if not_modified:
+        return not_modified
+    return await run_query(
+        db, _query_contracts, response, date_from, date_to, phase, block, buyer, include_archived, page
+    )
 
 @app.get("/api/contracts/sold-houses")
-def get_sold_houses(db: Session = Depends(get_db)):
-    """الحصول على المنازل المباعة"""
-    contracts = db.query(Contract).filter(Contract.house_id.isnot(None)).all()
-    house_ids = set()
-    sold_houses = []
-    
-    for contract in contracts:
-        if contract.house_id and contract.house_id not in house_ids:
-            house_ids.add(contract.house_id)
-            house = db.query(House).filter(House.id == contract.house_id).first()
-            if house:
-                house_dict = {
-                    "id": house.id,
-                    "house_number": house.house_number,
-                    "block_number": house.block_number,
-                    "phase": house.phase,
-                    "building_area": house.building_area,
-                    "total_price": house.total_price,
-                    "loan_amount": house.loan_amount,
-                    "buyer_name": contract.buyer_name,
-                    "contract_date": contract.contract_date,
-                    "contract_number": contract.contract_number
-                }
-                sold_houses.append(house_dict)
-    
-    return sold_houses
+def get_sold_houses(
+    request: Request,
+    response: Response,
+    include_archived: bool = False,
+    db: Session = Depends(get_readonly_db)
+):
+    """الحصول على المنازل المباعة (مع المنازل التي أُرشفت عقودها المسددة عند include_archived)"""
+    not_modified = versions.not_modified(db, request, response, ["contracts", "houses"])
+    if not_modified:
+        return not_modified
+    contracts = archive.source(Contract, include_archived)
+    houses = archive.source(House, include_archived)
+    # أول عقد لكل منزل
+    first_contracts = db.query(func.min(contracts.id).label("id")).filter(
+        contracts.house_id.isnot(None)
+    ).group_by(contracts.house_id).subquery()
+    
+    rows = db.query(
+        houses.id,
+        houses.house_number,
+        houses.block_number,
+        houses.phase,
+        houses.building_area,
+        houses.total_price,
+        houses.loan_amount,
+        contracts.buyer_name,
+        contracts.contract_date,
+        contracts.contract_number
+    ).select_from(contracts).join(
+        first_contracts, first_contracts.c.id == contracts.id
+    ).join(houses, houses.id == contracts.house_id).order_by(contracts.id).all()
+    
+    return serialization.rows_response(rows, response)
 
 @app.get("/api/contracts/{contract_id}", response_model=ContractResponse)
-def get_contract(contract_id: int, db: Session = Depends(get_db)):
+def get_contract(contract_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """الحصول على عقد محدد"""
-    contract = db.query(Contract).filter(Contract.id == contract_id).first()
+    not_modified = versions.not_modified(db, request, response, ["contracts"])
+    if not_modified:
+        return not_modified
+    contract = archive.get(db, Contract, contract_id)
     if not contract:
         raise HTTPException(status_code=404, detail="العقد غير موجود")
     return contract
@@ -365,10 +564,19 @@ def get_contract(contract_id: int, db: Session = Depends(get_db)):
 @app.post("/api/contracts", response_model=ContractResponse)
 def create_contract(contract: ContractCreate, db: Session = Depends(get_db)):
     """إضافة عقد جديد"""
-    # التحقق من عدم وجود عقد بنفس الرقم
-    existing = db.query(Contract).filter(Contract.contract_number == contract.contract_number).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="يوجد عقد بنفس الرقم")
+    if contract.contract_number is None:
+        contract.contract_number = sequences.allocate(db, "contracts")
+    else:
+        # رفع العدّاد أولاً يحجز قفل الكتابة، فلا يسبقنا طلب آخر بين الفحص والإدراج
+        sequences.ensure_at_least(db, "contracts", contract.contract_number)
+        # التحقق من عدم وجود عقد بنفس الرقم
+        existing = db.query(Contract.id).filter(
+            Contract.contract_number == contract.contract_number
+        ).first() or db.query(ContractArchive.id).filter(
+            ContractArchive.contract_number == contract.contract_number
+        ).first()
+        if existing:
+            raise HTTPException(status_code=400, detail="يوجد عقد بنفس الرقم")
     
     # البحث عن house_id من house_number
     house_id = None
@@ -377,9 +585,16 @@ def create_contract(contract: ContractCreate, db: Session = Depends(get_db)):
         if house:
             house_id = house.id
             house.status = 'sold'
+            events.emit(db, "house", house_id, "update", status='sold')
     
-    db_contract = Contract(**contract.dict(), house_id=house_id)
+    db_contract = Contract(**contract.dict(exclude={"house_id"}), house_id=house_id)
     db.add(db_contract)
+    db.flush()
+    rollups.record(db, [db_contract.id])
+    events.emit(
+        db, "contract", db_contract.id, "create",
+        total_amount=db_contract.total_amount, amount_paid=db_contract.amount_paid
+    )
     db.commit()
     db.refresh(db_contract)
     return db_contract
@@ -392,6 +607,7 @@ def update_contract(contract_id: int, contract: ContractCreate, db: Session = De
         raise HTTPException(status_code=404, detail="العقد غير موجود")
     
     old_house_id = db_contract.house_id
+    rollups.retract(db, [contract_id])
     
     # البحث عن house_id الجديد
     house_id = None
@@ -404,24 +620,38 @@ def update_contract(contract_id: int, contract: ContractCreate, db: Session = De
     if old_house_id and old_house_id != house_id:
         old_house = db.query(House).filter(House.id == old_house_id).first()
         if old_house:
-            # التحقق من وجود عقود أخرى
-            other_contracts = db.query(Contract).filter(
-                Contract.house_id == old_house_id,
-                Contract.id != contract_id
-            ).count()
+            # التحقق من وجود عقود أخرى (مع المؤرشفة)
+            contracts = archive.source(Contract, True)
+            other_contracts = db.query(func.count(contracts.id)).filter(
+                contracts.house_id == old_house_id,
+                contracts.id != contract_id
+            ).scalar()
             if other_contracts == 0:
                 old_house.status = 'available'
+                events.emit(db, "house", old_house_id, "update", status='available')
     
     # تحديث حالة المنزل الجديد
     if house_id:
         house = db.query(House).filter(House.id == house_id).first()
         if house:
             house.status = 'sold'
+            events.emit(db, "house", house_id, "update", status='sold')
     
-    # تحديث بيانات العقد
+    # تحديث بيانات العقد (مع الإبقاء على الرقم الحالي إذا لم يُرسل رقم)
+    if contract.contract_number is not None:
+        sequences.ensure_at_least(db, "contracts", contract.contract_number)
     for key, value in contract.dict().items():
+        if key == "contract_number" and value is None:
+            continue
         setattr(db_contract, key, value)
     db_contract.house_id = house_id
+    db.flush()
+    ledger.reset_initial_paid(db, contract_id)
+    rollups.record(db, [contract_id])
+    events.emit(
+        db, "contract", contract_id, "update",
+        total_amount=db_contract.total_amount, amount_paid=db_contract.amount_paid
+    )
     
     db.commit()
     db.refresh(db_contract)
@@ -430,62 +660,63 @@ def update_contract(contract_id: int, contract: ContractCreate, db: Session = De
 # ==================== Resale Endpoints ====================
 
 @app.get("/api/resale")
-def get_resales(db: Session = Depends(get_db)):
+def get_resales(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    phase: Optional[int] = None,
+    block: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_readonly_db)
+):
     """الحصول على جميع إعادة البيع"""
-    resales = db.query(Resale).order_by(Resale.contact_date.desc()).all()
-    result = []
-    for resale in resales:
-        # جلب المنزل حتى لو كان محذوفاً (status='deleted')
-        house = db.query(House).filter(House.id == resale.house_id).first()
-        
-        # إنشاء القاموس الأساسي
-        resale_dict = {
-            "id": resale.id,
-            "house_id": resale.house_id,
-            "source": resale.source,
-            "mobile_number": resale.mobile_number,
-            "contact_date": resale.contact_date,
-            "remaining_amount": resale.remaining_amount,
-            "floors": resale.floors,
-            "building_material": resale.building_material,
-            "additional_specs": resale.additional_specs,
-            "created_at": resale.created_at
-        }
-        
-        # إضافة معلومات المنزل إذا كان موجوداً
-        if house:
-            resale_dict["house_number"] = house.house_number
-            resale_dict["block_number"] = house.block_number
-            resale_dict["phase"] = house.phase
-            resale_dict["total_area"] = house.total_area
-            resale_dict["building_area"] = house.building_area
-            resale_dict["total_price"] = house.total_price
-            resale_dict["loan_amount"] = house.loan_amount
-            resale_dict["outlook"] = house.outlook
-        else:
-            # إذا لم يكن المنزل موجوداً، جرب جلب المعلومات من العقد
-            contract = db.query(Contract).filter(Contract.house_id == resale.house_id).first()
-            if contract:
-                resale_dict["house_number"] = contract.house_number
-                resale_dict["block_number"] = contract.block_number
-                resale_dict["phase"] = None  # لا يوجد phase في العقد
-                resale_dict["building_area"] = contract.area
-                resale_dict["total_price"] = contract.total_amount
-                resale_dict["loan_amount"] = contract.loan_amount
-                resale_dict["outlook"] = None
-            else:
-                # إذا لم يكن هناك منزل ولا عقد، ضع قيم None
-                resale_dict["house_number"] = None
-                resale_dict["block_number"] = None
-                resale_dict["phase"] = None
-                resale_dict["total_area"] = None
-                resale_dict["building_area"] = None
-                resale_dict["total_price"] = None
-                resale_dict["loan_amount"] = None
-                resale_dict["outlook"] = None
-        
-        result.append(resale_dict)
-    return result
+    not_modified = versions.not_modified(db, request, response, ["resale", "houses", "contracts"])
+    if not_modified:
+        return not_modified
+    # جلب المنزل حتى لو كان محذوفاً (status='deleted') أو مؤرشفاً، وإذا لم يكن موجوداً
+    # تؤخذ المعلومات من أول عقد مرتبط به
+    fallback = aliased(Contract)
+    archived = aliased(HouseArchive)
+    first_contract = db.query(func.min(Contract.id)).filter(
+        Contract.house_id == Resale.house_id
+    ).correlate(Resale).scalar_subquery()
+    
+    query = db.query(
+        Resale.id,
+        Resale.house_id,
+        Resale.source,
+        Resale.mobile_number,
+        Resale.contact_date,
+        Resale.remaining_amount,
+        Resale.floors,
+        Resale.building_material,
+        Resale.additional_specs,
+        Resale.created_at,
+        func.coalesce(House.house_number, archived.house_number, fallback.house_number).label("house_number"),
+        func.coalesce(House.block_number, archived.block_number, fallback.block_number).label("block_number"),
+        func.coalesce(House.phase, archived.phase).label("phase"),
+        func.coalesce(House.total_area, archived.total_area).label("total_area"),
+        func.coalesce(House.building_area, archived.building_area, fallback.area).label("building_area"),
+        func.coalesce(House.total_price, archived.total_price, fallback.total_amount).label("total_price"),
+        func.coalesce(House.loan_amount, archived.loan_amount, fallback.loan_amount).label("loan_amount"),
+        func.coalesce(House.outlook, archived.outlook).label("outlook")
+    ).outerjoin(House, House.id == Resale.house_id).outerjoin(
+        archived, and_(House.id.is_(None), archived.id == Resale.house_id)
+    ).outerjoin(
+        fallback, and_(House.id.is_(None), archived.id.is_(None), fallback.id == first_contract)
+    )
+    if date_from:
+        query = query.filter(Resale.contact_date >= date_from)
+    if date_to:
+        query = query.filter(Resale.contact_date <= date_to)
+    if phase:
+        query = query.filter(func.coalesce(House.phase, archived.phase) == phase)
+    if block:
+        query = query.filter(func.coalesce(House.block_number, archived.block_number) == block)
+    
+    rows = paginate(query, [Resale.contact_date, Resale.id], page, response, descending=True)
+    return serialization.rows_response(rows, response)
 
 @app.post("/api/resale")
 def create_resale(resale: ResaleCreate, db: Session = Depends(get_db)):
@@ -497,6 +728,8 @@ def create_resale(resale: ResaleCreate, db: Session = Depends(get_db)):
     
     db_resale = Resale(**resale.dict())
     db.add(db_resale)
+    db.flush()
+    events.emit(db, "resale", db_resale.id, "create", house_id=db_resale.house_id)
     db.commit()
     db.refresh(db_resale)
     
@@ -530,6 +763,7 @@ def delete_resale(resale_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="السجل غير موجود")
     
     db.delete(resale)
+    events.emit(db, "resale", resale_id, "delete", house_id=resale.house_id)
     db.commit()
     return {"success": True}
 
@@ -537,11 +771,30 @@ def delete_resale(resale_id: int, db: Session = Depends(get_db)):
 # ==================== Payments Endpoints ====================
 
 @app.get("/api/payments/contract/{contract_id}", response_model=List[PaymentResponse])
-def get_payments_by_contract(contract_id: int, db: Session = Depends(get_db)):
-    """الحصول على المدفوعات لعقد محدد"""
-    return db.query(Payment).filter(Payment.contract_id == contract_id).order_by(
-        Payment.payment_date.desc(), Payment.created_at.desc()
-    ).all()
+def get_payments_by_contract(
+    contract_id: int,
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    include_archived: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_readonly_db)
+):
+    """الحصول على المدفوعات لعقد محدد (دفعات العقد المؤرشف مع include_archived)"""
+    not_modified = versions.not_modified(db, request, response, ["payments"])
+    if not_modified:
+        return not_modified
+    payments = archive.source(Payment, include_archived)
+    query = db.query(*serialization.columns(payments, PaymentResponse)).filter(payments.contract_id == contract_id)
+    if date_from:
+        query = query.filter(payments.payment_date >= date_from)
+    if date_to:
+        query = query.filter(payments.payment_date <= date_to)
+    rows = paginate(
+        query, [payments.payment_date, payments.created_at, payments.id], page, response, descending=True
+    )
+    return serialization.rows_response(rows, response)
 
 @app.post("/api/payments", response_model=PaymentResponse)
 def create_payment(payment: PaymentCreate, db: Session = Depends(get_db)):
@@ -552,9 +805,12 @@ def create_payment(payment: PaymentCreate, db: Session = Depends(get_db)):
     
     db_payment = Payment(**payment.dict())
     db.add(db_payment)
+    db.flush()
     
-    # تحديث المبلغ المدفوع في العقد
-    contract.amount_paid = (contract.amount_paid or 0) + payment.amount
+    # تحديث المبلغ المدفوع في العقد (زيادة داخل قاعدة البيانات)
+    amount_paid = ledger.apply_payment(db, contract.id, payment.amount)
+    events.emit(db, "payment", db_payment.id, "create", contract_id=contract.id, amount=payment.amount)
+    events.emit(db, "contract", contract.id, "update", amount_paid=amount_paid)
     
     db.commit()
     db.refresh(db_payment)
@@ -567,18 +823,30 @@ def delete_payment(payment_id: int, db: Session = Depends(get_db)):
     if not payment:
         raise HTTPException(status_code=404, detail="الدفعة غير موجودة")
     
-    contract = db.query(Contract).filter(Contract.id == payment.contract_id).first()
-    if contract:
-        contract.amount_paid = max(0, (contract.amount_paid or 0) - payment.amount)
-    
+    contract_id, amount = payment.contract_id, payment.amount
     db.delete(payment)
+    db.flush()
+    
+    # إنقاص المبلغ المدفوع داخل قاعدة البيانات
+    amount_paid = ledger.apply_payment(db, contract_id, -amount)
+    events.emit(db, "payment", payment_id, "delete", contract_id=contract_id, amount=amount)
+    events.emit(db, "contract", contract_id, "update", amount_paid=amount_paid)
+    
     db.commit()
     return {"success": True}
 
+@app.post("/api/payments/reconcile")
+def reconcile_payments(fix: bool = False, db: Session = Depends(get_db)):
+    """مطابقة amount_paid مع مجموع الدفعات لكل العقود (والتصحيح عند fix=true)"""
+    return ledger.reconcile(db, fix=fix)
+
 @app.get("/api/contracts/{contract_id}/remaining")
-def get_remaining_amount(contract_id: int, db: Session = Depends(get_db)):
+def get_remaining_amount(contract_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """حساب المبلغ المتبقي لعقد"""
-    contract = db.query(Contract).filter(Contract.id == contract_id).first()
+    not_modified = versions.not_modified(db, request, response, ["contracts"])
+    if not_modified:
+        return not_modified
+    contract = archive.get(db, Contract, contract_id)
     if not contract:
         raise HTTPException(status_code=404, detail="العقد غير موجود")
     
@@ -591,76 +859,209 @@ def get_remaining_amount(contract_id: int, db: Session = Depends(get_db)):
 
 # ==================== Statistics Endpoints ====================
 
+def _month_version(today: date) -> dict:
+    """
+    الإحصائيات تتغير مع بداية الشهر حتى بدون كتابة (أرقام "هذا الشهر" ونافذة الأشهر)،
+    فيدخل الشهر الحالي في ETag وتكون بدايته حداً أدنى لـ Last-Modified
+    """
+    month_start = reports.month_bounds(today)[0]
+    return {"extra": month_start.strftime("%Y-%m"), "extra_since": datetime.combine(month_start, datetime.min.time())}
+
 @app.get("/api/statistics")
-def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(request: Request, response: Response, db: Session = Depends(get_read_db)):
     """الحصول على الإحصائيات"""
-    from datetime import datetime
-    
-    # إجمالي المنازل المباعة
-    total_sold = db.query(Contract).count()
+    today = date.today()
+    not_modified = await run_query(
+        db, versions.not_modified, request, response, ["contracts", "houses"], **_month_version(today)
+    )
+    if not_modified:
+        return not_modified
+    return await run_query(db, rollups.read_statistics, today)
+
+@app.get("/api/statistics/monthly")
+def get_monthly_statistics(
+    request: Request,
+    response: Response,
+    months: int = Query(6, ge=1, le=120),
+    phase: Optional[int] = None,
+    db: Session = Depends(get_readonly_db)
+):
+    """المبيعات الشهرية (العدد والإيرادات) لآخر عدد من الأشهر"""
+    today = date.today()
+    not_modified = versions.not_modified(db, request, response, ["contracts", "houses"], **_month_version(today))
+    if not_modified:
+        return not_modified
+    return reports.monthly_sales(db, months=months, phase=phase, current_date=today)
+
+
+@app.get("/api/reports/aging")
+def get_aging_report(
+    phase: Optional[int] = None,
+    block: Optional[int] = None,
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_readonly_db)
+):
+    """أعمار الديون: المبالغ المتبقية حسب أيام التأخر (current, 1_30, 31_60, 61_90, over_90)"""
+    return reports.aging_report(db, phase=phase, block=block, as_of=as_of)
+
+@app.get("/api/reports/aging/contracts")
+def get_aging_contracts(
+    response: Response,
+    bucket: str = Query(..., pattern="^(current|1_30|31_60|61_90|over_90)$"),
+    phase: Optional[int] = None,
+    block: Optional[int] = None,
+    as_of: Optional[date] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_readonly_db)
+):
+    """عقود فئة معينة من تقرير أعمار الديون (الأقدم استحقاقاً أولاً)"""
+    query = reports.aging_contracts_query(db, bucket, phase=phase, block=block, as_of=as_of)
+    # العقود بدون تاريخ استحقاق في النهاية، ليبقى المؤشر صالحاً
+    due = func.coalesce(Contract.next_payment_due_date, date.max)
+    rows = paginate(query, [due, Contract.id], page, response,
+                    key=lambda row: [row.next_payment_due_date or date.max, row.id])
+    return serialization.rows_response(rows, response)
+
+
+# ==================== Search Endpoints ====================
+
+@app.get("/api/search")
+def search_records(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    entity: Optional[str] = Query(None, pattern="^(receipt|contract|resale)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_readonly_db)
+):
+    """البحث في أسماء المشترين وأرقام الهواتف والملاحظات (الوصولات والعقود وإعادة البيع)"""
+    not_modified = versions.not_modified(db, request, response, ["receipts", "contracts", "resale"])
+    if not_modified:
+        return not_modified
+    return search.search(db, q, limit, entity)
+
+
+# ==================== Import Endpoints ====================
+
+IMPORTERS = {
+    "houses": (imports.import_houses, HouseCreate),
+    "receipts": (imports.import_receipts, ReceiptCreate),
+}
+
+@app.post("/api/import/{table}")
+async def import_table(table: str, request: Request, db: Session = Depends(get_db)):
+    """استيراد جماعي من مصفوفة JSON أو ملف CSV (الحقل file)"""
+    if table not in IMPORTERS:
+        raise HTTPException(status_code=404, detail="الجدول غير موجود")
     
-    # المنازل المباعة هذا الشهر
-    from datetime import date as date_type
-    current_date = date_type.today()
-    current_month_start = date_type(current_date.year, current_date.month, 1)
-    if current_date.month == 12:
-        next_month_start = date_type(current_date.year + 1, 1, 1)
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="يرجى إرفاق ملف CSV في الحقل file")
+        try:
+            rows = imports.parse_csv(await upload.read())
+        except (UnicodeDecodeError, csv.Error):
+            raise HTTPException(status_code=400, detail="ملف CSV غير صالح (يجب أن يكون بترميز UTF-8)")
     else:
-        next_month_start = date_type(current_date.year, current_date.month + 1, 1)
-    
-    monthly_sold = db.query(Contract).filter(
-        Contract.sale_date >= current_month_start,
-        Contract.sale_date < next_month_start
-    ).count()
-    
-    # إجمالي الإيرادات
-    contracts = db.query(Contract).all()
-    total_revenue = 0
-    monthly_revenue = 0
-    
-    for contract in contracts:
-        house = None
-        if contract.house_id:
-            house = db.query(House).filter(House.id == contract.house_id).first()
-        
-        down_payment = contract.down_payment or 0
-        total_revenue += down_payment
-        
-        if house and house.outlook:
-            total_revenue += house.outlook
-        
-        sale_month = contract.sale_date.strftime("%Y-%m") if isinstance(contract.sale_date, date_type) else str(contract.sale_date)[:7]
-        current_month_str = current_date.strftime("%Y-%m")
-        if sale_month == current_month_str:
-            monthly_revenue += down_payment
-            if house and house.outlook:
-                monthly_revenue += house.outlook
-    
-    # المبيعات حسب المرحلة
-    phase_sales = {}
-    for contract in contracts:
-        if contract.house_id:
-            house = db.query(House).filter(House.id == contract.house_id).first()
-            if house:
-                phase = house.phase
-                phase_sales[phase] = phase_sales.get(phase, 0) + 1
-    
-    # مجموع الديون
-    total_debts = 0
-    for contract in contracts:
-        total = contract.total_amount or 0
-        paid = contract.amount_paid or 0
-        remaining = max(0, total - paid)
-        total_debts += remaining
-    
-    return {
-        "total_sold_houses": total_sold,
-        "monthly_sold_houses": monthly_sold,
-        "total_revenue": total_revenue,
-        "monthly_revenue": monthly_revenue,
-        "total_debts": total_debts,
-        "phase_sales": phase_sales
-    }
+        try:
+            rows = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="محتوى JSON غير صالح")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="يجب إرسال مصفوفة من الصفوف")
+    
+    importer, schema = IMPORTERS[table]
+    return await run_in_threadpool(importer, db, rows, schema)
+
+
+# ==================== Export Endpoints ====================
+
+@app.get("/api/export/{table}")
+def export_table(
+    table: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """تصدير جدول كاملاً بشكل متدفق (CSV أو NDJSON)"""
+    if table not in exports.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail="الجدول غير موجود")
+    
+    return StreamingResponse(
+        exports.stream_export(table, format, date_from, date_to),
+        media_type=exports.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    )
+
+
+# ==================== Archive Endpoint ====================
+
+@app.post("/api/archive")
+def run_archive(
+    days: int = Query(archive.ARCHIVE_AFTER_DAYS, ge=0),
+    batch_size: int = Query(archive.BATCH_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """نقل العقود المسددة ودفعاتها والمنازل المحذوفة إلى جداول الأرشيف"""
+    return archive.run(db, days, batch_size)
+
+
+# ==================== Projects Endpoints ====================
+
+class ProjectCreate(BaseModel):
+    name: str
+
+@app.get("/api/projects")
+def get_projects():
+    """المشاريع الموجودة (ملف قاعدة بيانات لكل مشروع)"""
+    return {"default": projects.DEFAULT_PROJECT, "projects": projects.list_projects()}
+
+@app.post("/api/projects")
+def create_project(project: ProjectCreate):
+    """إنشاء مشروع جديد بقاعدة بيانات فارغة"""
+    try:
+        return projects.create_project(project.name)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+@app.get("/api/projects/statistics")
+async def get_projects_statistics(include_default: bool = True):
+    """إحصائيات كل المشاريع مع مجموعها (تُحسب بالتوازي)"""
+    return await projects.aggregate_statistics(include_default)
+
+
+# ==================== Events Endpoint ====================
+
+@app.get("/api/events")
+async def stream_events(request: Request):
+    """بث إشعارات التغيير (Server-Sent Events)"""
+    return StreamingResponse(
+        events.broker.stream(request.is_disconnected, current_project.get()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ==================== Sync Endpoint ====================
+
+@app.get("/api/sync")
+async def sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(sync.DEFAULT_LIMIT, ge=1, le=sync.MAX_LIMIT),
+    db: Session = Depends(get_read_db)
+):
+    """الصفوف المضافة أو المعدّلة أو المحذوفة منذ cursor سابق"""
+    result = await run_query(db, sync.changes, since, limit)
+    return Response(serialization.dumps(result), media_type="application/json")
+
+
+# ==================== Batch Endpoint ====================
+
+@app.post("/api/batch")
+async def run_batch(operations: batch.BatchRequest, request: Request):
+    """تنفيذ عدة عمليات بالترتيب في معاملة واحدة (الكل أو لا شيء)"""
+    return await batch.run(app, request.scope, operations)
 
 
 # ==================== Health Check ====================
@@ -673,3 +1074,8 @@ def root():
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """قياسات الأداء بصيغة Prometheus"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
@@ -0,0 +1,217 @@
+"""
+قياس أداء الطلبات وعرضه بصيغة Prometheus على /metrics
+
+لكل مسار (route) يُسجّل: زمن الاستجابة (histogram)، عدد عبارات SQL وزمنها
+لكل طلب (عبر أحداث محرك SQLAlchemy)، وحجم الاستجابة. العبارات التي تتجاوز
+SLOW_QUERY_MS تُكتب في سجل "metrics" مع المسار الذي نفذها.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("metrics")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class RequestStats:
+    """عدادات SQL للطلب الحالي"""
+    __slots__ = ("scope", "statements", "sql_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # الموجّه يضيف endpoint إلى نفس scope، فيكون المسار معروفاً أثناء تنفيذ الطلب
+        return _route_path(self.scope)
+
+
+# الطلب الحالي (ينتقل تلقائياً إلى threadpool وجلسات run_sync)
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class Registry:
+    """تخزين القياسات في الذاكرة (لكل عملية)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}          # (method, route, status) -> count
+        self.latency = {}           # (method, route) -> Histogram
+        self.statements = {}        # (method, route) -> Histogram
+        self.sql_seconds = {}       # (method, route) -> float
+        self.response_bytes = {}    # (method, route) -> int
+        self.slow_queries = {}      # route -> count
+
+    def record_request(self, method, route, status, seconds, stats: RequestStats, size):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self.sql_seconds[key] = self.sql_seconds.get(key, 0.0) + stats.sql_seconds
+            self.response_bytes[key] = self.response_bytes.get(key, 0) + size
+
+    def record_slow_query(self, route):
+        with self._lock:
+            self.slow_queries[route] = self.slow_queries.get(route, 0) + 1
+
+    def render(self) -> str:
+        """النص بصيغة Prometheus exposition"""
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Total HTTP requests.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), value in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {value}")
+
+            _render_histogram(lines, "http_request_duration_seconds",
+                              "Request latency in seconds.", self.latency)
+            _render_histogram(lines, "http_request_sql_statements",
+                              "SQL statements executed per request.", self.statements)
+
+            lines += [
+                "# HELP http_request_sql_seconds_total Total time spent in SQL per route.",
+                "# TYPE http_request_sql_seconds_total counter",
+            ]
+            for (method, route), value in sorted(self.sql_seconds.items()):
+                lines.append(f"http_request_sql_seconds_total{_labels(method=method, route=route)} {value:.6f}")
+
+            lines += [
+                "# HELP http_response_bytes_total Total response body bytes per route.",
+                "# TYPE http_response_bytes_total counter",
+            ]
+            for (method, route), value in sorted(self.response_bytes.items()):
+                lines.append(f"http_response_bytes_total{_labels(method=method, route=route)} {value}")
+
+            lines += [
+                f"# HELP sql_slow_queries_total SQL statements slower than {SLOW_QUERY_MS:g}ms.",
+                "# TYPE sql_slow_queries_total counter",
+            ]
+            for route, value in sorted(self.slow_queries.items()):
+                lines.append(f"sql_slow_queries_total{_labels(route=route)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels) -> str:
+    escaped = (
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _render_histogram(lines, name, help_text, histograms):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=f'{bound:g}')} {count}")
+        lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+
+
+registry = Registry()
+
+
+# ==================== أحداث SQLAlchemy ====================
+# تُسجّل على فئة Engine فتشمل المحرك المتزامن والمحرك غير المتزامن معاً.
+# وقت البدء يُحفظ في سياق التنفيذ (وليس في conn.info) لأن after_cursor_execute
+# لا يُستدعى عند فشل العبارة، فيبقى وقتها عالقاً في الاتصال المُعاد إلى المجمع.
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_metrics_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        route = stats.route if stats is not None else "-"
+        registry.record_slow_query(route)
+        logger.warning("slow query (%.1fms) on %s: %s", elapsed * 1000, route, " ".join(statement.split()))
+
+
+# ==================== Middleware ====================
+
+def _route_path(scope) -> str:
+    """قالب المسار (مثل /api/houses/{house_id}) بدلاً من المسار الفعلي لتحديد عدد التسميات"""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    paths = getattr(app.state, "metrics_route_paths", None)
+    if paths is None:
+        paths = {getattr(route, "endpoint", None): route.path for route in app.routes}
+        app.state.metrics_route_paths = paths
+    return paths.get(endpoint, "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI middleware يقيس كل طلب HTTP حتى إرسال آخر جزء من الاستجابة"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            registry.record_request(
+                scope["method"], stats.route, status, time.perf_counter() - start, stats, size
+            )
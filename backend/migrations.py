@@ -0,0 +1,202 @@
+"""
+ترحيلات مخطط قاعدة البيانات
+
+create_all ينشئ الجداول الجديدة فقط ولا يضيف فهارس أو أعمدة لجداول موجودة،
+لذا تُسجّل التعديلات هنا كترحيلات مرقّمة تُطبّق مرة واحدة عند بدء التشغيل
+ويُحفظ رقمها في جدول schema_version. إذا كانت القاعدة محدّثة يكفي استعلام واحد.
+
+عرض خطط الاستعلامات الأساسية (EXPLAIN QUERY PLAN):
+    python migrations.py --explain
+"""
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+from models import Base
+import search
+import sync
+
+
+def _create_indexes(connection, names):
+    """إنشاء فهارس معرّفة في models.py إذا لم تكن موجودة"""
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+
+def _hot_path_indexes(connection):
+    _create_indexes(connection, [
+        "ix_houses_phase_house_number",
+        "ix_houses_status_house_number",
+        "ix_receipts_date_number",
+        "ix_receipts_house_id",
+        "ix_contracts_sale_date_id",
+        "ix_contracts_house_id",
+        "ix_resale_contact_date_id",
+        "ix_resale_house_id",
+        "ix_payments_contract_date",
+    ])
+    connection.execute(text("ANALYZE"))
+
+
+def _search_index(connection):
+    search.install(connection)
+    search.rebuild(connection)
+
+
+def _aging_index(connection):
+    _create_indexes(connection, ["ix_contracts_next_due"])
+
+
+def _initial_paid(connection):
+    columns = [row[1] for row in connection.execute(text("PRAGMA table_info(contracts)"))]
+    if "initial_paid" not in columns:
+        connection.execute(text("ALTER TABLE contracts ADD COLUMN initial_paid FLOAT"))
+    # المدفوع عند التعاقد = المدفوع الحالي - مجموع الدفعات المسجلة
+    connection.execute(text(
+        "UPDATE contracts SET initial_paid = amount_paid - COALESCE("
+        "(SELECT SUM(amount) FROM payments WHERE payments.contract_id = contracts.id), 0)"
+    ))
+
+
+def _change_tracking(connection):
+    for table in sync.SYNC_MODELS:
+        columns = [row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))]
+        if "updated_at" not in columns:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME"))
+        if "change_seq" not in columns:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER"))
+    sync.install(connection)
+    sync.backfill(connection)
+    _create_indexes(connection, [f"ix_{table}_change_seq" for table in sync.SYNC_MODELS])
+
+
+def _autoincrement_ids(connection):
+    """
+    إعادة بناء houses و contracts و payments بـ AUTOINCREMENT: بدونه يعطي SQLite رقم الصف
+    الأعلى المنقول إلى الأرشيف لأول صف جديد، فيتكرر الرقم بين الجدول وأرشيفه.
+    العدّاد (sqlite_sequence) يبدأ من أكبر رقم في الجدول وأرشيفه معاً
+    """
+    for name in ("houses", "contracts", "payments"):
+        table = Base.metadata.tables[name]
+        current_sql = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+        ).scalar()
+        if "AUTOINCREMENT" not in current_sql.upper():
+            # الطريقة الموصى بها لتعديل الجدول في SQLite: جدول جديد ثم نسخ ثم حذف القديم وإعادة التسمية
+            # (حذف الجدول لا يشغّل triggers الحذف، فلا تُسجّل tombstones)
+            rebuilt = f"{name}_rebuild"
+            ddl = str(CreateTable(table).compile(connection)).replace(
+                f"CREATE TABLE {name} ", f"CREATE TABLE {rebuilt} ", 1
+            )
+            columns = ", ".join(column.name for column in table.columns)
+            connection.execute(text(ddl))
+            connection.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+            connection.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {name}"))
+            for index in table.indexes:
+                index.create(connection, checkfirst=True)
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": name})
+        connection.execute(text(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT :name, MAX("
+            f"(SELECT COALESCE(MAX(id), 0) FROM {name}), (SELECT COALESCE(MAX(id), 0) FROM {name}_archive))"
+        ), {"name": name})
+    # triggers الجداول القديمة حُذفت معها (triggers الإصدارات تُنشأ بعد الترحيلات في database.py)
+    search.install(connection)
+    sync.install(connection)
+
+
+def _payments_export_index(connection):
+    _create_indexes(connection, ["ix_payments_date_id"])
+
+
+def _archive_delete_triggers(connection):
+    """إعادة إنشاء triggers الحذف بشرط NOT_ARCHIVING، وإعادة العقود المؤرشفة إلى فهرس البحث"""
+    for table in sync.SYNC_MODELS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_sync_delete"))
+    for _, table, *_ in search.ENTITIES.values():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {table}_search_delete"))
+    sync.install(connection)
+    search.install(connection)
+    search.rebuild(connection)
+
+
+# (الرقم، الوصف، الدالة) - تُضاف الترحيلات الجديدة في النهاية ولا يُعدّل القديم منها
+MIGRATIONS = [
+    (1, "فهارس المسارات الساخنة", _hot_path_indexes),
+    (2, "فهرس البحث النصي (FTS5)", _search_index),
+    (3, "فهرس تاريخ الاستحقاق لتقرير أعمار الديون", _aging_index),
+    (4, "عمود initial_paid لمطابقة المدفوعات", _initial_paid),
+    (5, "تتبع التغييرات وسجلات الحذف للمزامنة", _change_tracking),
+    (6, "AUTOINCREMENT لأرقام المنازل والعقود والدفعات", _autoincrement_ids),
+    (7, "فهرس ترتيب تصدير الدفعات", _payments_export_index),
+    (8, "الأرشفة لا تسجّل حذفاً في المزامنة ولا تحذف من فهرس البحث", _archive_delete_triggers),
+]
+
+
+def migrate(connection):
+    """تطبيق الترحيلات التي لم تُطبق بعد وإرجاع أرقامها"""
+    current = connection.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        apply(connection)
+        connection.execute(
+            text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+            {"v": version, "d": description, "t": datetime.utcnow()}
+        )
+        applied.append(version)
+    return applied
+
+
+# استعلامات تطابق ما تنفذه نقاط main.py (للتحقق من استخدام الفهارس)
+EXPLAIN_QUERIES = {
+    "houses by phase": "SELECT * FROM houses WHERE phase = 1 ORDER BY house_number LIMIT 100",
+    "available houses": "SELECT * FROM houses WHERE status = 'available' ORDER BY house_number LIMIT 100",
+    "receipts page": "SELECT * FROM receipts WHERE receipt_date >= '2024-01-01' "
+                     "ORDER BY receipt_date DESC, receipt_number DESC LIMIT 100",
+    "receipts of house": "SELECT count(*) FROM receipts WHERE house_id = 1",
+    "contracts page": "SELECT * FROM contracts WHERE sale_date >= '2024-01-01' "
+                      "ORDER BY sale_date DESC, id DESC LIMIT 100",
+    "contracts of house": "SELECT count(*) FROM contracts WHERE house_id = 1",
+    "first contract per house": "SELECT min(id) FROM contracts WHERE house_id IS NOT NULL GROUP BY house_id",
+    "resale page": "SELECT * FROM resale ORDER BY contact_date DESC, id DESC LIMIT 100",
+    "resale of house": "SELECT * FROM resale WHERE house_id = 1",
+    "aging over 90 days": "SELECT count(*), sum(total_amount - amount_paid) FROM contracts "
+                          "WHERE next_payment_due_date < '2024-01-01' AND total_amount - amount_paid > 0",
+    "sync changes": "SELECT change_seq, id FROM receipts WHERE change_seq > 1000 ORDER BY change_seq LIMIT 1000",
+    "payments export": "SELECT * FROM payments ORDER BY payment_date, id",
+    "payments of contract": "SELECT * FROM payments WHERE contract_id = 1 "
+                            "ORDER BY payment_date DESC, created_at DESC, id DESC",
+}
+
+
+def explain(connection):
+    """خطة تنفيذ كل استعلام: (الاسم، الخطة، هل يستخدم فهرساً)"""
+    results = []
+    for name, sql in EXPLAIN_QUERIES.items():
+        details = [row[3] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        uses_index = all(
+            "USING" in detail for detail in details if detail.startswith(("SCAN", "SEARCH"))
+        ) and not any(detail.startswith("USE TEMP B-TREE") for detail in details)
+        results.append((name, details, uses_index))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import engine, init_db
+
+    parser = argparse.ArgumentParser(description="تطبيق ترحيلات قاعدة البيانات")
+    parser.add_argument("--explain", action="store_true", help="عرض خطط الاستعلامات الأساسية")
+    args = parser.parse_args()
+
+    init_db()
+    with engine.connect() as connection:
+        version = connection.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+        print(f"إصدار المخطط: {version}")
+        if args.explain:
+            for name, details, uses_index in explain(connection):
+                print(f"{'OK' if uses_index else 'SCAN'} {name}")
+                for detail in details:
+                    print(f"    {detail}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, ForeignKey, Text, Index, Table
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -8,6 +8,13 @@ Base = declarative_base()
 
 class House(Base):
     __tablename__ = "houses"
+    __table_args__ = (
+        Index("ix_houses_phase_house_number", "phase", "house_number"),
+        Index("ix_houses_status_house_number", "status", "house_number"),
+        Index("ix_houses_change_seq", "change_seq"),
+        # الأرقام لا تُعاد بعد نقل الصف الأعلى إلى الأرشيف (انظر archive.py)
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     house_number = Column(Integer, unique=True, nullable=False, index=True)
@@ -24,6 +31,9 @@ class House(Base):
     floors = Column(Integer, nullable=True)
     building_material = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # تُحدّثهما triggers المزامنة في sync.py
+    updated_at = Column(DateTime, nullable=True)
+    change_seq = Column(Integer, nullable=True)
     
     # Relationships
     receipts = relationship("Receipt", back_populates="house")
@@ -33,6 +43,11 @@ class House(Base):
 
 class Receipt(Base):
     __tablename__ = "receipts"
+    __table_args__ = (
+        Index("ix_receipts_date_number", "receipt_date", "receipt_number"),
+        Index("ix_receipts_house_id", "house_id"),
+        Index("ix_receipts_change_seq", "change_seq"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     receipt_number = Column(Integer, unique=True, nullable=False, index=True)
@@ -48,6 +63,9 @@ class Receipt(Base):
     notes = Column(Text, nullable=True)
     house_id = Column(Integer, ForeignKey("houses.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # تُحدّثهما triggers المزامنة في sync.py
+    updated_at = Column(DateTime, nullable=True)
+    change_seq = Column(Integer, nullable=True)
     
     # Relationships
     house = relationship("House", back_populates="receipts")
@@ -55,6 +73,13 @@ class Receipt(Base):
 
 class Contract(Base):
     __tablename__ = "contracts"
+    __table_args__ = (
+        Index("ix_contracts_sale_date_id", "sale_date", "id"),
+        Index("ix_contracts_house_id", "house_id", "id"),
+        Index("ix_contracts_next_due", "next_payment_due_date", "total_amount", "amount_paid"),
+        Index("ix_contracts_change_seq", "change_seq"),
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     sale_date = Column(Date, nullable=False)
@@ -69,6 +94,8 @@ class Contract(Base):
     down_payment = Column(Float, nullable=False)
     loan_amount = Column(Float, nullable=False)
     amount_paid = Column(Float, nullable=False)
+    # المدفوع عند التعاقد (amount_paid = initial_paid + مجموع الدفعات)، افتراضياً amount_paid عند الإدراج
+    initial_paid = Column(Float, nullable=True, default=lambda context: context.get_current_parameters()["amount_paid"])
     contract_date = Column(Date, nullable=False)
     contract_number = Column(Integer, unique=True, nullable=False, index=True)
     buyer_signature = Column(String, default='بالانتظار')
@@ -77,6 +104,9 @@ class Contract(Base):
     next_payment_due_date = Column(Date, nullable=True)
     house_id = Column(Integer, ForeignKey("houses.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # تُحدّثهما triggers المزامنة في sync.py
+    updated_at = Column(DateTime, nullable=True)
+    change_seq = Column(Integer, nullable=True)
     
     # Relationships
     house = relationship("House", back_populates="contracts")
@@ -85,6 +115,11 @@ class Contract(Base):
 
 class Resale(Base):
     __tablename__ = "resale"
+    __table_args__ = (
+        Index("ix_resale_contact_date_id", "contact_date", "id"),
+        Index("ix_resale_house_id", "house_id"),
+        Index("ix_resale_change_seq", "change_seq"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     house_id = Column(Integer, ForeignKey("houses.id"), nullable=False)
@@ -96,6 +131,9 @@ class Resale(Base):
     building_material = Column(String, nullable=True)
     additional_specs = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # تُحدّثهما triggers المزامنة في sync.py
+    updated_at = Column(DateTime, nullable=True)
+    change_seq = Column(Integer, nullable=True)
     
     # Relationships
     house = relationship("House", back_populates="resales")
@@ -103,6 +141,13 @@ class Resale(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        Index("ix_payments_contract_date", "contract_id", "payment_date", "created_at", "id"),
+        Index("ix_payments_change_seq", "change_seq"),
+        # ترتيب التصدير (exports.py) بالفهرس بدلاً من ترتيب الجدول كله قبل أول صف
+        Index("ix_payments_date_id", "payment_date", "id"),
+        {"sqlite_autoincrement": True},
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     contract_id = Column(Integer, ForeignKey("contracts.id"), nullable=False)
@@ -112,7 +157,101 @@ class Payment(Base):
     notes = Column(Text, nullable=True)
     next_payment_due_date = Column(Date, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # تُحدّثهما triggers المزامنة في sync.py
+    updated_at = Column(DateTime, nullable=True)
+    change_seq = Column(Integer, nullable=True)
     
     # Relationships
     contract = relationship("Contract", back_populates="payments")
 
+
+def _archive_table(model, *indexes):
+    """جدول أرشيف بنفس أعمدة جدول النموذج (بدون القيود والقيم الافتراضية) مع وقت النقل"""
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False)
+        for column in model.__table__.columns
+    ]
+    return Table(
+        f"{model.__tablename__}_archive", Base.metadata,
+        *columns,
+        Column("archived_at", DateTime, nullable=False, default=datetime.utcnow),
+        *indexes
+    )
+
+
+class HouseArchive(Base):
+    """المنازل المحذوفة المنقولة من houses (انظر archive.py)"""
+    __table__ = _archive_table(House, Index("ix_houses_archive_house_number", "house_number"))
+
+
+class ContractArchive(Base):
+    """العقود المسددة بالكامل المنقولة من contracts"""
+    __table__ = _archive_table(
+        Contract,
+        Index("ix_contracts_archive_sale_date_id", "sale_date", "id"),
+        Index("ix_contracts_archive_house_id", "house_id", "id"),
+        Index("ix_contracts_archive_contract_number", "contract_number"),
+    )
+
+
+class PaymentArchive(Base):
+    """دفعات العقود المؤرشفة"""
+    __table__ = _archive_table(
+        Payment, Index("ix_payments_archive_contract_date", "contract_id", "payment_date", "created_at", "id")
+    )
+
+
+class MonthlyStatistic(Base):
+    """تجميع الإحصائيات لكل شهر (يُحدّث مع كل عملية كتابة)"""
+    __tablename__ = "statistics_monthly"
+    
+    month = Column(String, primary_key=True)  # YYYY-MM
+    sold_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    debt = Column(Float, nullable=False, default=0)
+
+
+class PhaseStatistic(Base):
+    """تجميع الإحصائيات لكل مرحلة (المرحلة 0 = عقود بدون منزل)"""
+    __tablename__ = "statistics_phase"
+    
+    phase = Column(Integer, primary_key=True)
+    sold_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    debt = Column(Float, nullable=False, default=0)
+
+
+class TableVersion(Base):
+    """رقم إصدار لكل جدول يزداد مع أي تعديل (تحدّثه triggers)"""
+    __tablename__ = "table_versions"
+    
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class Sequence(Base):
+    """عدّاد لتوليد الأرقام المتسلسلة (أرقام العقود والوصولات)"""
+    __tablename__ = "sequences"
+    
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class Tombstone(Base):
+    """سجل حذف لكل صف محذوف (للمزامنة التزايدية)"""
+    __tablename__ = "tombstones"
+    
+    change_seq = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+class SchemaVersion(Base):
+    """الترحيلات المطبقة على قاعدة البيانات"""
+    __tablename__ = "schema_version"
+    
+    version = Column(Integer, primary_key=True)
+    description = Column(String, nullable=False)
+    applied_at = Column(DateTime, nullable=False, default=datetime.utcnow)
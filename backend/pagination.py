@@ -0,0 +1,86 @@
+"""
+ترقيم الصفحات بالمؤشر (keyset pagination)
+
+المؤشر يحمل قيم أعمدة الترتيب لآخر صف في الصفحة، فتبدأ الصفحة التالية
+مباشرة بعده باستخدام الفهرس بدلاً من OFFSET.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import tuple_, literal
+
+# بدون limit تُرجع الصفحة الأولى فقط (DEFAULT_PAGE_SIZE صف) مع X-Next-Cursor
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PageParams:
+    """معاملات الصفحة المشتركة بين نقاط القوائم"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        include_total: bool = False
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.include_total = include_total
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported cursor value: {value!r}")
+
+
+def encode_cursor(values) -> str:
+    """ترميز قيم الترتيب إلى مؤشر نصي"""
+    raw = json.dumps(list(values), default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    """فك ترميز المؤشر وتحويل القيم إلى أنواع الأعمدة"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        result = []
+        for column, value in zip(columns, values):
+            python_type = column.type.python_type
+            if value is not None and python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif value is not None and python_type is date:
+                value = date.fromisoformat(value)
+            result.append(value)
+        return result
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
+
+def paginate(query, order_by, page: PageParams, response: Response, descending: bool = False,
+             key=None):
+    """
+    ترتيب الاستعلام وتطبيق المؤشر والحد.
+    يجب أن تنتهي أعمدة الترتيب بعمود فريد حتى يكون المؤشر حاسماً.
+    """
+    if page.include_total:
+        response.headers["X-Total-Count"] = str(query.order_by(None).count())
+
+    if page.cursor:
+        values = decode_cursor(page.cursor, order_by)
+        bound = tuple_(*[literal(value, column.type) for column, value in zip(order_by, values)])
+        current = tuple_(*order_by)
+        query = query.filter(current < bound if descending else current > bound)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in order_by])
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        key = key or (lambda row: [getattr(row, column.key) for column in order_by])
+        response.headers["X-Next-Cursor"] = encode_cursor(key(rows[-1]))
+    return rows
@@ -0,0 +1,111 @@
+"""
+توجيه الطلبات إلى قاعدة بيانات المشروع (ملف SQLite لكل تطوير سكني)
+
+يُحدّد المشروع لكل طلب بإحدى طريقتين:
+- الترويسة X-Project: <project>
+- بادئة المسار: /projects/<project>/api/... (تصلح لـ EventSource الذي لا يرسل ترويسات)
+
+بدونهما (أو مع default) يُستخدم DATABASE_URL كما كان. المشروع غير الموجود يعيد 404،
+ويُنشأ عبر POST /api/projects. نقاط /api/projects نفسها لا تتبع مشروعاً.
+"""
+import asyncio
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from database import (
+    PROJECT_NAME, ProjectNotFound, current_project, get_database, list_projects
+)
+import rollups
+
+HEADER = b"x-project"
+PREFIX = "/projects/"
+
+# اسم القاعدة الافتراضية في الإحصائيات المجمّعة
+DEFAULT_PROJECT = "default"
+
+# الإحصائيات الرقمية التي تُجمع عبر المشاريع
+TOTALS = ("total_sold_houses", "monthly_sold_houses", "total_revenue", "monthly_revenue", "total_debts")
+
+
+def _split_path(path: str):
+    """(المشروع، المسار بدون البادئة) أو (None، المسار)"""
+    if not path.startswith(PREFIX):
+        return None, path
+    project, _, rest = path[len(PREFIX):].partition("/")
+    return project, "/" + rest
+
+
+class ProjectMiddleware:
+    """ASGI middleware يعيّن current_project للطلب ويزيل بادئة المسار"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        project, path = _split_path(scope["path"])
+        if project is None:
+            project = next((value.decode("latin-1") for key, value in scope["headers"] if key == HEADER), None)
+        if project == DEFAULT_PROJECT or path.startswith("/api/projects"):
+            project = None
+
+        if project:
+            if not PROJECT_NAME.match(project):
+                await JSONResponse({"detail": "اسم المشروع غير صالح"}, status_code=400)(scope, receive, send)
+                return
+            try:
+                # الفتح الأول ينشئ المحركات ويطبق الترحيلات، فيُنفّذ خارج حلقة الأحداث
+                await run_in_threadpool(get_database, project)
+            except ProjectNotFound:
+                await JSONResponse({"detail": "المشروع غير موجود"}, status_code=404)(scope, receive, send)
+                return
+
+        if path != scope["path"]:
+            # تعديل scope نفسه (لا نسخة) ليرى MetricsMiddleware قالب المسار بعد التوجيه
+            scope["path"] = path
+            scope["raw_path"] = path.encode("utf-8")
+        if not project:
+            await self.app(scope, receive, send)
+            return
+        token = current_project.set(project)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_project.reset(token)
+
+
+def create_project(name: str) -> dict:
+    """إنشاء ملف المشروع وتهيئة جداوله (آمن للتكرار)"""
+    if name == DEFAULT_PROJECT or not PROJECT_NAME.match(name):
+        raise ValueError("اسم المشروع غير صالح")
+    get_database(name, create=True)
+    return {"name": name}
+
+
+def _project_statistics(project: Optional[str]) -> dict:
+    database = get_database(project)
+    db = database.ReadSessionLocal()
+    try:
+        return rollups.read_statistics(db)
+    finally:
+        db.close()
+
+
+async def aggregate_statistics(include_default: bool = True) -> dict:
+    """
+    إحصائيات جميع المشاريع بالتوازي (كل مشروع في خيط من threadpool على ملفه)
+    مع مجموع القيم الرقمية؛ توزيع المراحل يبقى لكل مشروع لأن أرقام المراحل تخص مشروعها
+    """
+    projects = [project for project in list_projects() if project != DEFAULT_PROJECT]
+    targets = ([None] if include_default else []) + projects
+    results = await asyncio.gather(*(run_in_threadpool(_project_statistics, project) for project in targets))
+
+    per_project = {
+        DEFAULT_PROJECT if project is None else project: statistics
+        for project, statistics in zip(targets, results)
+    }
+    totals = {name: sum(statistics.get(name) or 0 for statistics in results) for name in TOTALS}
+    return {"totals": totals, "projects": per_project}
@@ -0,0 +1,199 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Optional
+from sqlalchemy import func, case, cast, or_, Integer
+from sqlalchemy.orm import Session
+from models import House, Contract
+import archive
+import versions
+
+# ذاكرة مؤقتة للسلسلة الشهرية، مفتاحها يتضمن المشروع وإصدار جدولي العقود والمنازل.
+# تُقرأ وتُعدّل من خيوط threadpool، فالوصول تحت قفل، وحجمها محدود (LRU) لأن
+# المفتاح يتغير مع عدد الأشهر والمرحلة
+MONTHLY_CACHE_SIZE = int(os.getenv("MONTHLY_CACHE_SIZE", "256"))
+_monthly_cache: "OrderedDict[tuple, list]" = OrderedDict()
+_monthly_cache_lock = threading.Lock()
+
+
+def month_bounds(current_date: date):
+    """بداية الشهر الحالي وبداية الشهر التالي"""
+    month_start = date(current_date.year, current_date.month, 1)
+    if current_date.month == 12:
+        next_month_start = date(current_date.year + 1, 1, 1)
+    else:
+        next_month_start = date(current_date.year, current_date.month + 1, 1)
+    return month_start, next_month_start
+
+
+def shift_month(month_start: date, months: int) -> date:
+    """إزاحة بداية الشهر بعدد من الأشهر"""
+    index = month_start.year * 12 + month_start.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def compute_statistics(db: Session, current_date: Optional[date] = None):
+    """حساب الإحصائيات باستعلامات تجميعية ثابتة العدد (مع العقود المؤرشفة)"""
+    current_date = current_date or date.today()
+    month_start, next_month_start = month_bounds(current_date)
+    contracts = archive.source(Contract, True)
+    houses = archive.source(House, True)
+
+    # الإيراد لكل عقد = المقدمة + التطلوعة (إن وجدت)
+    revenue = func.coalesce(contracts.down_payment, 0) + func.coalesce(houses.outlook, 0)
+    in_month = (contracts.sale_date >= month_start) & (contracts.sale_date < next_month_start)
+    remaining = func.coalesce(contracts.total_amount, 0) - func.coalesce(contracts.amount_paid, 0)
+
+    totals = db.query(
+        func.count(contracts.id),
+        func.coalesce(func.sum(case((in_month, 1), else_=0)), 0),
+        func.coalesce(func.sum(revenue), 0),
+        func.coalesce(func.sum(case((in_month, revenue), else_=0)), 0),
+        func.coalesce(func.sum(case((remaining > 0, remaining), else_=0)), 0),
+    ).select_from(contracts).outerjoin(houses, houses.id == contracts.house_id).one()
+
+    # المبيعات حسب المرحلة
+    phase_rows = db.query(houses.phase, func.count(contracts.id)).select_from(contracts).join(
+        houses, houses.id == contracts.house_id
+    ).group_by(houses.phase).all()
+
+    return {
+        "total_sold_houses": totals[0],
+        "monthly_sold_houses": totals[1],
+        "total_revenue": totals[2],
+        "monthly_revenue": totals[3],
+        "total_debts": totals[4],
+        "phase_sales": {phase: count for phase, count in phase_rows}
+    }
+
+
+def monthly_sales(db: Session, months: int = 6, phase: Optional[int] = None,
+                  current_date: Optional[date] = None):
+    """عدد المبيعات والإيرادات لكل شهر خلال آخر عدد من الأشهر"""
+    current_date = current_date or date.today()
+    month_start, next_month_start = month_bounds(current_date)
+    window_start = shift_month(month_start, -(months - 1))
+
+    # الإصدارات قد تتساوى بين المشاريع، فالمشروع (من info الجلسة) جزء من المفتاح
+    project = db.info.get("project")
+    cache_key = (project, window_start, months, phase, versions.version_key(db, ["contracts", "houses"]))
+    with _monthly_cache_lock:
+        cached = _monthly_cache.get(cache_key)
+        if cached is not None:
+            _monthly_cache.move_to_end(cache_key)
+            return cached
+
+    # المبيعات تشمل العقود المؤرشفة (ومنازلها المؤرشفة)
+    contracts = archive.source(Contract, True)
+    houses = archive.source(House, True)
+    month = func.strftime('%Y-%m', contracts.sale_date)
+    revenue = func.coalesce(contracts.down_payment, 0) + func.coalesce(houses.outlook, 0)
+    query = db.query(month, func.count(contracts.id), func.coalesce(func.sum(revenue), 0)).select_from(
+        contracts
+    ).outerjoin(houses, houses.id == contracts.house_id).filter(
+        contracts.sale_date >= window_start,
+        contracts.sale_date < next_month_start
+    )
+    if phase:
+        query = query.filter(houses.phase == phase)
+    rows = {row[0]: row for row in query.group_by(month).all()}
+
+    # إرجاع جميع أشهر الفترة حتى الفارغة منها
+    result = []
+    for offset in range(months):
+        key = shift_month(window_start, offset).strftime("%Y-%m")
+        _, count, total = rows.get(key, (key, 0, 0))
+        result.append({"month": key, "count": count, "revenue": total})
+
+    with _monthly_cache_lock:
+        # الإصدارات القديمة لنفس المشروع لم تعد صالحة
+        stale = [key for key in _monthly_cache if key[0] == project and key[4] != cache_key[4]]
+        for key in stale:
+            del _monthly_cache[key]
+        _monthly_cache[cache_key] = result
+        while len(_monthly_cache) > MONTHLY_CACHE_SIZE:
+            _monthly_cache.popitem(last=False)
+    return result
+
+
+# فئات أعمار الديون: (الاسم، أقصى عدد أيام تأخير)، الأخيرة بلا حد
+AGING_BUCKETS = [("current", 0), ("1_30", 30), ("31_60", 60), ("61_90", 90), ("over_90", None)]
+
+
+def _outstanding():
+    return func.coalesce(Contract.total_amount, 0) - func.coalesce(Contract.amount_paid, 0)
+
+
+def _aging_bucket(as_of: date):
+    """فئة العقد حسب تاريخ الاستحقاق التالي (بدون تاريخ = غير متأخر)"""
+    due = Contract.next_payment_due_date
+    whens = [(or_(due.is_(None), due >= as_of), "current")]
+    for name, days in AGING_BUCKETS[1:-1]:
+        whens.append((due >= as_of - timedelta(days=days), name))
+    return case(*whens, else_=AGING_BUCKETS[-1][0])
+
+
+def _aging_filter(query, as_of: date, phase: Optional[int], block: Optional[int], bucket: Optional[str] = None):
+    query = query.filter(_outstanding() > 0)
+    if phase:
+        query = query.filter(House.phase == phase)
+    if block:
+        query = query.filter(Contract.block_number == block)
+    if bucket:
+        # نطاق تواريخ بدلاً من تعبير الفئة حتى يُستخدم فهرس تاريخ الاستحقاق
+        due = Contract.next_payment_due_date
+        names = [name for name, _ in AGING_BUCKETS]
+        index = names.index(bucket)
+        if index == 0:
+            query = query.filter(or_(due.is_(None), due >= as_of))
+        else:
+            query = query.filter(due < as_of - timedelta(days=AGING_BUCKETS[index - 1][1]))
+            if AGING_BUCKETS[index][1] is not None:
+                query = query.filter(due >= as_of - timedelta(days=AGING_BUCKETS[index][1]))
+    return query
+
+
+def aging_report(db: Session, phase: Optional[int] = None, block: Optional[int] = None,
+                 as_of: Optional[date] = None):
+    """المبالغ المتبقية مجمّعة حسب أيام التأخر عن تاريخ الاستحقاق التالي (استعلام واحد)"""
+    as_of = as_of or date.today()
+    bucket = _aging_bucket(as_of)
+    query = db.query(bucket, func.count(Contract.id), func.coalesce(func.sum(_outstanding()), 0)).select_from(Contract)
+    if phase:
+        query = query.join(House, House.id == Contract.house_id)
+    rows = {name: (count, amount) for name, count, amount in _aging_filter(query, as_of, phase, block).group_by(bucket)}
+
+    buckets = []
+    for name, _ in AGING_BUCKETS:
+        count, amount = rows.get(name, (0, 0))
+        buckets.append({"bucket": name, "count": count, "amount": amount})
+    return {
+        "as_of": as_of,
+        "buckets": buckets,
+        "total_count": sum(b["count"] for b in buckets),
+        "total_amount": sum(b["amount"] for b in buckets),
+    }
+
+
+def aging_contracts_query(db: Session, bucket: str, phase: Optional[int] = None, block: Optional[int] = None,
+                          as_of: Optional[date] = None):
+    """عقود فئة معينة مع المبلغ المتبقي وعدد أيام التأخر"""
+    as_of = as_of or date.today()
+    due = Contract.next_payment_due_date
+    days_overdue = func.max(0, func.coalesce(func.julianday(as_of) - func.julianday(due), 0))
+    query = db.query(
+        Contract.id,
+        Contract.contract_number,
+        Contract.buyer_name,
+        Contract.mobile_number,
+        Contract.house_number,
+        Contract.block_number,
+        House.phase,
+        Contract.total_amount,
+        Contract.amount_paid,
+        _outstanding().label("outstanding"),
+        due,
+        cast(days_overdue, Integer).label("days_overdue"),
+    ).select_from(Contract).outerjoin(House, House.id == Contract.house_id)
+    return _aging_filter(query, as_of, phase, block, bucket)
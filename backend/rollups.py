@@ -0,0 +1,156 @@
+"""
+جداول الإحصائيات المجمّعة (rollups)
+
+تُحدّث هذه الجداول داخل نفس المعاملة مع كل عملية كتابة تؤثر على العقود،
+بحيث تصبح قراءة /api/statistics عدداً ثابتاً من القراءات الصغيرة.
+
+إعادة البناء من الصفر:
+    python rollups.py
+المقارنة مع الحساب المباشر:
+    python rollups.py --check
+"""
+from datetime import date
+from typing import Iterable, Optional
+from sqlalchemy import func, case, false, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from models import House, Contract, MonthlyStatistic, PhaseStatistic
+from reports import month_bounds
+import archive
+
+
+def _grouped_contributions(db: Session, contract_ids: Optional[Iterable[int]] = None,
+                           house_id: Optional[int] = None):
+    """
+    مساهمة العقود في الإحصائيات مجمّعة حسب الشهر والمرحلة
+    العقود المؤرشفة تبقى في الإحصائيات: تُشمل عند إعادة البناء وعند تعديل منزلها،
+    أما contract_ids فتخص عقوداً في الجدول الرئيسي
+    """
+    include_archived = contract_ids is None
+    contracts = archive.source(Contract, include_archived)
+    houses = archive.source(House, include_archived and house_id is None)
+    month = func.strftime('%Y-%m', contracts.sale_date)
+    phase = func.coalesce(houses.phase, 0)
+    revenue = func.coalesce(contracts.down_payment, 0) + func.coalesce(houses.outlook, 0)
+    remaining = func.coalesce(contracts.total_amount, 0) - func.coalesce(contracts.amount_paid, 0)
+
+    query = db.query(
+        month,
+        phase,
+        func.count(contracts.id),
+        func.coalesce(func.sum(revenue), 0),
+        func.coalesce(func.sum(case((remaining > 0, remaining), else_=0)), 0),
+    ).select_from(contracts).outerjoin(houses, houses.id == contracts.house_id)
+
+    if contract_ids is not None:
+        contract_ids = [cid for cid in contract_ids if cid is not None]
+        if not contract_ids:
+            return []
+        query = query.filter(contracts.id.in_(contract_ids))
+    if house_id is not None:
+        query = query.filter(contracts.house_id == house_id)
+
+    return query.group_by(month, phase).all()
+
+
+def _apply(db: Session, rows, sign: int):
+    """إضافة (أو طرح) المساهمات إلى جداول التجميع"""
+    for month, phase, count, revenue, debt in rows:
+        values = {
+            "sold_count": sign * count,
+            "revenue": sign * revenue,
+            "debt": sign * debt,
+        }
+        for model, key in ((MonthlyStatistic, {"month": month}), (PhaseStatistic, {"phase": phase})):
+            stmt = insert(model).values(**key, **values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key),
+                set_={
+                    "sold_count": model.sold_count + stmt.excluded.sold_count,
+                    "revenue": model.revenue + stmt.excluded.revenue,
+                    "debt": model.debt + stmt.excluded.debt,
+                }
+            )
+            db.execute(stmt)
+
+
+def _lock(db: Session):
+    """
+    حجز قفل الكتابة قبل قراءة المساهمات: pysqlite لا يبدأ المعاملة قبل أول عبارة كتابة،
+    فبدونه يقرأ طلبان متزامنان نفس المساهمة القديمة ويطرحانها مرتين.
+    عبارة UPDATE لا تطابق أي صف تبدأ المعاملة وتنتظر القفل (busy_timeout) دون تعديل شيء
+    """
+    db.execute(update(PhaseStatistic).where(false()).values(sold_count=PhaseStatistic.sold_count))
+
+
+def retract(db: Session, contract_ids: Optional[Iterable[int]] = None, house_id: Optional[int] = None):
+    """طرح مساهمة العقود الحالية قبل تعديلها أو حذفها (بعد حجز قفل الكتابة)"""
+    _lock(db)
+    _apply(db, _grouped_contributions(db, contract_ids, house_id), -1)
+
+
+def record(db: Session, contract_ids: Optional[Iterable[int]] = None, house_id: Optional[int] = None):
+    """إضافة مساهمة العقود بعد إنشائها أو تعديلها (يجب استدعاء flush قبلها)"""
+    _apply(db, _grouped_contributions(db, contract_ids, house_id), 1)
+
+
+def rebuild(db: Session):
+    """إعادة حساب جداول التجميع من الصفر"""
+    db.query(MonthlyStatistic).delete()
+    db.query(PhaseStatistic).delete()
+    _apply(db, _grouped_contributions(db), 1)
+
+
+def ensure_rollups(db: Session):
+    """بناء جداول التجميع لقواعد البيانات الموجودة مسبقاً"""
+    if db.query(PhaseStatistic).first() is None and db.query(Contract.id).first() is not None:
+        rebuild(db)
+        db.commit()
+
+
+def read_statistics(db: Session, current_date: Optional[date] = None):
+    """قراءة الإحصائيات من جداول التجميع"""
+    current_date = current_date or date.today()
+    current_month = month_bounds(current_date)[0].strftime("%Y-%m")
+
+    phases = db.query(PhaseStatistic).all()
+    monthly = db.query(MonthlyStatistic).filter(MonthlyStatistic.month == current_month).first()
+
+    return {
+        "total_sold_houses": sum(p.sold_count for p in phases),
+        "monthly_sold_houses": monthly.sold_count if monthly else 0,
+        "total_revenue": sum(p.revenue for p in phases),
+        "monthly_revenue": monthly.revenue if monthly else 0,
+        "total_debts": sum(p.debt for p in phases),
+        "phase_sales": {p.phase: p.sold_count for p in phases if p.phase != 0 and p.sold_count > 0}
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal, init_db
+    from reports import compute_statistics
+
+    parser = argparse.ArgumentParser(description="إعادة بناء جداول الإحصائيات المجمّعة")
+    parser.add_argument("--check", action="store_true", help="مقارنة الجداول بالحساب المباشر دون تعديل")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.check:
+            expected = compute_statistics(db)
+            actual = read_statistics(db)
+            for key, value in expected.items():
+                if isinstance(value, dict):
+                    matches = actual[key] == value
+                else:
+                    matches = abs(actual[key] - value) < 0.01
+                status = "OK" if matches else "DRIFT"
+                print(f"{status} {key}: {actual[key]} (expected {value})")
+        else:
+            rebuild(db)
+            db.commit()
+            print("تمت إعادة بناء جداول الإحصائيات")
+    finally:
+        db.close()
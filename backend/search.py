@@ -0,0 +1,161 @@
+"""
+البحث النصي في المشترين وأرقام الهواتف والملاحظات (SQLite FTS5)
+
+فهرس واحد search_index بمحلل trigram يطابق أي جزء من الاسم أو الرقم (3 أحرف فأكثر).
+يُحدّث عبر triggers على receipts و contracts و resale، والنص يُوحّد قبل الفهرسة
+(أشكال الألف والياء والتاء المربوطة، حذف التشكيل والتطويل، الأرقام العربية)
+بالدالة normalize_ar التي تُسجّل على كل اتصال في database.py، لذا يجب أن تتم
+الكتابة على هذه الجداول عبر التطبيق أو اتصال سجّل نفس الدالة.
+
+rowid في الفهرس = id السجل * 4 + رمز النوع، ليكون الحذف والتحديث بالمفتاح مباشرة.
+العقود المنقولة إلى الأرشيف تبقى في الفهرس وتُقرأ تفاصيلها من contracts_archive.
+"""
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+import sequences
+
+# النوع -> (الرمز، الجدول، عمود العنوان، عمود الهاتف، عمود الملاحظات)
+ENTITIES = {
+    "receipt": (1, "receipts", "buyer_name", "mobile_number", "notes"),
+    "contract": (2, "contracts", "buyer_name", "mobile_number", None),
+    "resale": (3, "resale", "source", "mobile_number", None),
+}
+ENTITY_CODES = {code: name for name, (code, *_) in ENTITIES.items()}
+# جداول الأرشيف (archive.py) التي تبقى صفوفها في الفهرس
+ARCHIVES = {"contracts": "contracts_archive"}
+
+# توحيد الحروف العربية: المصدر -> البديل
+NORMALIZATION = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ی": "ي",
+    "ة": "ه",
+    "ـ": "",
+    **{chr(code): "" for code in range(0x064B, 0x0653)},  # التشكيل
+    "ٰ": "",  # الألف الخنجرية
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},  # الأرقام العربية
+}
+_TRANSLATION = str.maketrans(NORMALIZATION)
+
+MIN_TRIGRAM = 3
+
+
+def normalize(value: Optional[str]) -> str:
+    """توحيد النص للفهرسة والبحث (تُسجّل في SQLite باسم normalize_ar)"""
+    return (value or "").translate(_TRANSLATION).lower()
+
+
+def register_functions(dbapi_connection):
+    """تسجيل دالة التوحيد على اتصال SQLite"""
+    dbapi_connection.create_function("normalize_ar", 1, normalize, deterministic=True)
+
+
+def _values(prefix: str, entity: str) -> str:
+    code, _, title, phone, notes = ENTITIES[entity]
+    return ", ".join([
+        f"{prefix}.id * 4 + {code}",
+        f"normalize_ar({prefix}.{title})",
+        f"normalize_ar({prefix}.{phone})",
+        f"normalize_ar({prefix}.{notes})" if notes else "''",
+    ])
+
+
+def install(connection):
+    """إنشاء جدول FTS5 و triggers المزامنة (آمن للتكرار)"""
+    connection.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index "
+        "USING fts5(title, phone, notes, tokenize='trigram')"
+    ))
+    for entity, (code, table, title, phone, notes) in ENTITIES.items():
+        columns = ", ".join(column for column in (title, phone, notes) if column)
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_index (rowid, title, phone, notes) VALUES ({_values('new', entity)}); END"
+        ))
+        # التحديث فقط عند تغيّر الأعمدة المفهرسة (لا عند تحديث المبالغ مثلاً)
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF {columns} ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; "
+            f"INSERT INTO search_index (rowid, title, phone, notes) VALUES ({_values('new', entity)}); END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table} "
+            f"WHEN {sequences.NOT_ARCHIVING} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {code}; END"
+        ))
+
+
+def rebuild(connection):
+    """إعادة بناء الفهرس من الجداول"""
+    connection.execute(text("DELETE FROM search_index"))
+    for entity, (_, table, *_) in ENTITIES.items():
+        for source in filter(None, (table, ARCHIVES.get(table))):
+            connection.execute(text(
+                f"INSERT INTO search_index (rowid, title, phone, notes) SELECT {_values(source, entity)} FROM {source}"
+            ))
+
+
+def _match_expression(terms):
+    """كل كلمة كعبارة بين علامتي تنصيص (AND ضمني)"""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+# بيانات العرض لكل نوع
+_DETAILS = {
+    "receipt": "SELECT id, receipt_number AS number, receipt_date AS date, buyer_name AS title, "
+               "mobile_number, house_id FROM receipts WHERE id IN ({ids})",
+    "contract": "SELECT id, contract_number AS number, sale_date AS date, buyer_name AS title, "
+                "mobile_number, house_id FROM contracts WHERE id IN ({ids}) UNION ALL "
+                "SELECT id, contract_number, sale_date, buyer_name, "
+                "mobile_number, house_id FROM contracts_archive WHERE id IN ({ids})",
+    "resale": "SELECT id, NULL AS number, contact_date AS date, source AS title, "
+              "mobile_number, house_id FROM resale WHERE id IN ({ids})",
+}
+
+
+def search(db: Session, query: str, limit: int = 20, entity: Optional[str] = None):
+    """البحث وإرجاع النتائج مرتبة حسب الصلة (bm25)"""
+    terms = normalize(query).split()
+    long_terms = [term for term in terms if len(term) >= MIN_TRIGRAM]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM]
+    if not terms:
+        return []
+
+    conditions = []
+    params = {"limit": limit}
+    if long_terms:
+        conditions.append("search_index MATCH :match")
+        params["match"] = _match_expression(long_terms)
+    # الكلمات الأقصر من 3 أحرف لا يطابقها trigram، فتُفحص بـ LIKE
+    for index, term in enumerate(short_terms):
+        conditions.append(f"(title || ' ' || phone || ' ' || notes) LIKE :short{index} ESCAPE '\\'")
+        escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params[f"short{index}"] = f"%{escaped}%"
+    if entity:
+        conditions.append("rowid % 4 = :code")
+        params["code"] = ENTITIES[entity][0]
+
+    if long_terms:
+        columns, order = "rowid, bm25(search_index) AS score", "score"
+    else:
+        # بدون كلمة من 3 أحرف يُفحص الفهرس كاملاً بـ LIKE (الأحدث أولاً)
+        columns, order = "rowid, 0 AS score", "rowid DESC"
+    hits = db.execute(text(
+        f"SELECT {columns} FROM search_index WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT :limit"
+    ), params).all()
+
+    by_entity = {}
+    for rowid, _ in hits:
+        by_entity.setdefault(ENTITY_CODES[rowid % 4], []).append(rowid // 4)
+    details = {}
+    for name, ids in by_entity.items():
+        for row in db.execute(text(_DETAILS[name].format(ids=", ".join(str(int(i)) for i in ids)))):
+            details[(name, row.id)] = row._asdict()
+
+    results = []
+    for rowid, score in hits:
+        name = ENTITY_CODES[rowid % 4]
+        row = details.get((name, rowid // 4))
+        if row:
+            results.append({"entity": name, **row, "score": round(-score, 4)})
+    return results
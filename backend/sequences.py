@@ -0,0 +1,52 @@
+"""
+توليد الأرقام المتسلسلة للعقود والوصولات
+
+الحجز يتم بعبارة UPDATE ... RETURNING واحدة داخل معاملة الكتابة، فهو ثابت الزمن
+ولا يتكرر الرقم حتى مع الطلبات المتزامنة أو بعد حذف عقد.
+"""
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# اسم العدّاد -> (الجدول، العمود) لتهيئة العدّاد من أكبر رقم موجود
+SEQUENCES = {
+    "contracts": ("contracts", "contract_number"),
+    "receipts": ("receipts", "receipt_number"),
+}
+
+
+# علامة تُرفع داخل معاملة الأرشفة (archive.py) فقط: نقل الصف إلى الأرشيف ليس حذفاً،
+# فـ triggers الحذف في المزامنة والبحث لا تعمل ما دامت مرفوعة
+ARCHIVING = "archiving"
+NOT_ARCHIVING = f"(SELECT value FROM sequences WHERE name = '{ARCHIVING}') IS NOT 1"
+
+
+def install(connection):
+    """إنشاء العدّادات بقيمة أكبر رقم مستخدم (آمن للتكرار)"""
+    for name, (table, column) in SEQUENCES.items():
+        connection.execute(text(
+            f"INSERT OR IGNORE INTO sequences (name, value) "
+            f"SELECT :name, COALESCE(MAX({column}), 0) FROM {table}"
+        ), {"name": name})
+
+
+def allocate(db: Session, name: str, count: int = 1) -> int:
+    """حجز عدد من الأرقام المتتالية وإرجاع أولها"""
+    last = db.execute(
+        text("UPDATE sequences SET value = value + :count WHERE name = :name RETURNING value"),
+        {"count": count, "name": name}
+    ).scalar_one()
+    return last - count + 1
+
+
+def ensure_at_least(db: Session, name: str, value: int):
+    """رفع العدّاد عند استخدام رقم يدوي حتى لا يُحجز لاحقاً"""
+    db.execute(
+        text("UPDATE sequences SET value = MAX(value, :value) WHERE name = :name"),
+        {"value": value, "name": name}
+    )
+
+
+def peek_next(db: Session, name: str) -> int:
+    """الرقم التالي المتوقع دون حجزه"""
+    value = db.execute(text("SELECT value FROM sequences WHERE name = :name"), {"name": name}).scalar()
+    return (value or 0) + 1
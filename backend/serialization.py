@@ -0,0 +1,46 @@
+"""
+ترميز سريع لاستجابات القوائم الكبيرة
+
+نقاط القوائم تختار الأعمدة مباشرة (صفوف بدلاً من كائنات ORM) وتُرمّز النتيجة
+بـ orjson دون المرور بتحقق Pydantic لكل صف. الأعمدة تؤخذ من نموذج الاستجابة
+نفسه، فيبقى شكل JSON ومخطط OpenAPI (response_model) كما هما.
+إذا لم تكن orjson مثبتة يُستخدم json القياسي بنفس الناتج.
+"""
+import json
+from datetime import date, datetime
+from typing import Iterable, List, Type
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson اختيارية
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported value: {value!r}")
+
+
+def dumps(value) -> bytes:
+    """ترميز قيمة إلى JSON (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def columns(model, schema: Type[BaseModel]) -> List:
+    """أعمدة النموذج بترتيب حقول نموذج الاستجابة"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def rows_response(rows: Iterable, response: Response) -> Response:
+    """
+    استجابة JSON من صفوف مختارة (Row) مع الإبقاء على الترويسات التي أضيفت
+    إلى response مثل X-Next-Cursor و ETag
+    """
+    body = dumps([row._asdict() for row in rows])
+    headers = {name: value for name, value in response.headers.items() if name != "content-length"}
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,121 @@
+"""
+المزامنة التزايدية: ما تغيّر منذ آخر تحميل (GET /api/sync?since=<cursor>)
+
+كل صف في الجداول المتزامنة له updated_at و change_seq، والرقم من عدّاد واحد
+(changes في جدول sequences) يزداد مع كل إدراج أو تعديل عبر triggers في SQLite،
+فيشمل ذلك جميع مسارات الكتابة. الحذف الفعلي يترك سجلاً في tombstones بنفس العدّاد. نقل الصفوف إلى الأرشيف
+(archive.py) ليس حذفاً فلا يترك سجلاً، ويبقى الصف المؤرشف لدى العميل كما حمّله.
+الكتابة في SQLite متسلسلة، لذا ترتيب الأرقام هو ترتيب التثبيت ولا يفوت العميل تغييراً.
+
+على العميل تطبيق deleted أولاً ثم changes، وحفظ cursor للطلب التالي،
+وتكرار الطلب ما دام has_more صحيحاً. since=0 يعيد جميع البيانات.
+سجلات الحذف لا تُحذف، لذا يصلح أي cursor سابق مهما قدم.
+"""
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+from models import House, Receipt, Contract, Resale, Payment
+import sequences
+
+# الجداول المتزامنة بالترتيب الذي تُرجع به
+SYNC_MODELS = {
+    "houses": House,
+    "receipts": Receipt,
+    "contracts": Contract,
+    "resale": Resale,
+    "payments": Payment,
+}
+
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+
+
+def install(connection):
+    """إنشاء العدّاد و triggers التتبع والحذف (آمن للتكرار)"""
+    connection.execute(text("INSERT OR IGNORE INTO sequences (name, value) VALUES ('changes', 0)"))
+    next_seq = "UPDATE sequences SET value = value + 1 WHERE name = 'changes'"
+    current_seq = "(SELECT value FROM sequences WHERE name = 'changes')"
+    for table in SYNC_MODELS:
+        stamp = (
+            f"UPDATE {table} SET change_seq = {current_seq}, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id = new.id"
+        )
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON {table} BEGIN "
+            f"{next_seq}; {stamp}; END"
+        ))
+        # الشرط يستثني تحديث change_seq نفسه من trigger الإدراج
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE ON {table} "
+            f"WHEN new.change_seq IS old.change_seq BEGIN {next_seq}; {stamp}; END"
+        ))
+        connection.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_sync_delete AFTER DELETE ON {table} "
+            f"WHEN {sequences.NOT_ARCHIVING} BEGIN "
+            f"{next_seq}; "
+            f"INSERT INTO tombstones (change_seq, table_name, row_id, deleted_at) "
+            f"VALUES ({current_seq}, '{table}', old.id, CURRENT_TIMESTAMP); END"
+        ))
+
+
+def backfill(connection):
+    """ترقيم الصفوف الموجودة قبل إضافة التتبع (بترتيب id لكل جدول)"""
+    for table in SYNC_MODELS:
+        connection.execute(text(
+            f"UPDATE {table} SET "
+            f"change_seq = (SELECT value FROM sequences WHERE name = 'changes') + id, "
+            f"updated_at = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) "
+            f"WHERE change_seq IS NULL"
+        ))
+        connection.execute(text(
+            f"UPDATE sequences SET value = MAX(value, (SELECT COALESCE(MAX(change_seq), 0) FROM {table})) "
+            f"WHERE name = 'changes'"
+        ))
+
+
+def current_cursor(db: Session) -> int:
+    """آخر رقم تغيير"""
+    return db.execute(text("SELECT value FROM sequences WHERE name = 'changes'")).scalar() or 0
+
+
+def changes(db: Session, since: int = 0, limit: int = DEFAULT_LIMIT) -> dict:
+    """
+    الصفوف المعدّلة والمحذوفة بعد since، حتى limit تغيير بترتيب change_seq
+    """
+    # يُقرأ قبل التغييرات: إذا لم توجد تغييرات فكل ما قبله قد أُرسل
+    latest = current_cursor(db)
+    # أول limit تغيير من كل جدول (بالفهرس) ثم دمجها، بدلاً من ترتيب كل التغييرات
+    branches = [
+        f"SELECT * FROM (SELECT change_seq, '{table}' AS table_name, id AS row_id, 0 AS deleted "
+        f"FROM {table} WHERE change_seq > :since ORDER BY change_seq LIMIT :limit)"
+        for table in SYNC_MODELS
+    ]
+    branches.append(
+        "SELECT * FROM (SELECT change_seq, table_name, row_id, 1 AS deleted "
+        "FROM tombstones WHERE change_seq > :since ORDER BY change_seq LIMIT :limit)"
+    )
+    entries = db.execute(
+        text(" UNION ALL ".join(branches) + " ORDER BY change_seq LIMIT :limit"),
+        {"since": since, "limit": limit}
+    ).all()
+
+    changed, deleted = {}, {}
+    for _, table, row_id, is_deleted in entries:
+        (deleted if is_deleted else changed).setdefault(table, []).append(row_id)
+
+    rows = {}
+    for table, ids in changed.items():
+        model = SYNC_MODELS[table]
+        rows[table] = [
+            row._asdict() for row in db.execute(
+                select(*model.__table__.columns).where(model.id.in_(ids)).order_by(model.change_seq)
+            )
+        ]
+
+    return {
+        "cursor": entries[-1].change_seq if entries else latest,
+        "has_more": len(entries) == limit,
+        # cursor أكبر من آخر رقم يعني أن قاعدة البيانات استُبدلت: على العميل المزامنة من 0
+        "reset": since > latest,
+        "changes": rows,
+        "deleted": deleted,
+    }
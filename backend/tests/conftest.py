@@ -0,0 +1,136 @@
+"""
+إعداد الاختبارات: قاعدة بيانات مؤقتة للجلسة كلها (تُعيّن قبل استيراد database)
+
+    cd backend && python -m pytest tests
+"""
+import asyncio
+import itertools
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+_directory = tempfile.mkdtemp(prefix="real_estate_tests_")
+os.environ["DATABASE_PATH"] = os.path.join(_directory, "test.db")
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("PROJECTS_DIR", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from fastapi.testclient import TestClient
+
+# أرقام المنازل فريدة عبر جميع الاختبارات لأن القاعدة مشتركة
+_house_numbers = itertools.count(100000)
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+
+    asyncio.run(main.startup_event())
+    yield main.app
+    asyncio.run(main.shutdown_event())
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+@pytest.fixture
+def db(app):
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+def concurrent(app, calls, headers=None):
+    """تنفيذ طلبات متزامنة فعلاً [(method, url, json), ...] وإرجاع الردود بنفس الترتيب"""
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+            return await asyncio.gather(*(
+                client.request(method, url, json=body) for method, url, body in calls
+            ))
+    return asyncio.run(run())
+
+
+@contextmanager
+def count_queries():
+    """عدد عبارات SQL المنفذة على جميع المحركات داخل الكتلة"""
+    counter = {"count": 0}
+
+    def before_cursor_execute(*args):
+        counter["count"] += 1
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def house_payload(**values) -> dict:
+    house_number = next(_house_numbers)
+    return {
+        "house_number": house_number,
+        "block_number": 1,
+        "total_area": 200,
+        "building_area": 150,
+        "total_price": 100000,
+        "loan_amount": 50000,
+        "phase": 1,
+        **values,
+    }
+
+
+def receipt_payload(house: dict, **values) -> dict:
+    """وصل بيع منزل (ينشئ عقده تلقائياً)"""
+    return {
+        "receipt_date": date.today().isoformat(),
+        "buyer_name": "مشتري اختبار",
+        "mobile_number": "07700000000",
+        "unit_number": house["house_number"],
+        "block_number": house["block_number"],
+        "unit_area": house["total_area"],
+        "amount_received": 10000,
+        "remaining_amount": 90000,
+        "house_id": house["id"],
+        **values,
+    }
+
+
+@pytest.fixture
+def make_house(client):
+    def make(**values) -> dict:
+        response = client.post("/api/houses", json=house_payload(**values))
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make
+
+
+@pytest.fixture
+def sell_house(client):
+    """بيع منزل عبر وصل وإرجاع عقده"""
+    def sell(house: dict, **values) -> dict:
+        from database import SessionLocal
+        from models import Contract
+
+        response = client.post("/api/receipts", json=receipt_payload(house, **values))
+        assert response.status_code == 200, response.text
+        session = SessionLocal()
+        try:
+            contract_id = session.query(Contract.id).filter(Contract.house_id == house["id"]).scalar()
+        finally:
+            session.close()
+        return client.get(f"/api/contracts/{contract_id}").json()
+    return sell
@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+from conftest import house_payload, receipt_payload
+import sync
+
+
+def settled_sale(client, make_house, buyer_name: str):
+    """بيع منزل بعقد مسدد بالكامل قبل يومين (قابل للأرشفة مع days=1)"""
+    house = make_house(total_price=100000)
+    response = client.post("/api/receipts", json=receipt_payload(
+        house, buyer_name=buyer_name, amount_received=100000, remaining_amount=0,
+        receipt_date=(date.today() - timedelta(days=2)).isoformat(),
+    ))
+    assert response.status_code == 200, response.text
+    return house
+
+
+def archive(client):
+    response = client.post("/api/archive", params={"days": 1})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_ids_are_not_reused_after_archiving(client, make_house):
+    house = settled_sale(client, make_house, "مشتري مؤرشف")
+    contract = client.get("/api/contracts", params={"buyer": "مشتري مؤرشف"}).json()[0]
+    deleted = make_house()
+    assert client.delete(f"/api/houses/{deleted['id']}").status_code == 200
+    assert archive(client)["contracts"] >= 1
+
+    settled_sale(client, make_house, "مشتري جديد")
+    new_contract = client.get("/api/contracts", params={"buyer": "مشتري جديد"}).json()[0]
+    assert new_contract["id"] > contract["id"]
+    assert client.get(f"/api/contracts/{contract['id']}").json()["buyer_name"] == "مشتري مؤرشف"
+
+    new_house = make_house()
+    assert new_house["id"] > deleted["id"]
+    ids = [row["id"] for row in client.get("/api/houses", params={"include_archived": True, "limit": 1000}).json()]
+    assert len(ids) == len(set(ids))
+    assert house["id"] in ids
+
+
+def test_deleting_receipt_keeps_house_of_archived_contract_sold(client, make_house):
+    house = settled_sale(client, make_house, "مشتري وصل مؤرشف")
+    archive(client)
+    receipt = client.get("/api/receipts", params={"buyer": "مشتري وصل مؤرشف"}).json()[0]
+
+    assert client.delete(f"/api/receipts/{receipt['id']}").status_code == 200
+    assert client.get(f"/api/houses/{house['id']}").json()["status"] == "sold"
+
+
+def test_import_rejects_archived_house_number(client, make_house):
+    deleted = make_house()
+    assert client.delete(f"/api/houses/{deleted['id']}").status_code == 200
+    assert archive(client)["houses"] >= 1
+
+    row = house_payload(house_number=deleted["house_number"])
+    assert client.post("/api/houses", json=row).status_code == 400
+    report = client.post("/api/import/houses", json=[row]).json()
+    assert report["inserted"] == 0
+    assert report["errors"][0]["row"] == 1
+
+
+def test_archiving_is_not_a_delete(client, db, make_house):
+    settled_sale(client, make_house, "مشتري بحث مؤرشف")
+    contract = client.get("/api/contracts", params={"buyer": "مشتري بحث مؤرشف"}).json()[0]
+    cursor = sync.current_cursor(db)
+    db.rollback()
+    assert archive(client)["contracts"] >= 1
+
+    # لا tombstones للصفوف المنقولة، والعقد المؤرشف يبقى في البحث
+    assert client.get("/api/sync", params={"since": cursor}).json()["deleted"] == {}
+    results = client.get("/api/search", params={"q": "بحث مؤرشف", "entity": "contract"}).json()
+    assert [result["id"] for result in results] == [contract["id"]]
+
+    # الحذف العادي بعد الأرشفة يُسجّل كما كان
+    receipt = client.get("/api/receipts", params={"buyer": "مشتري بحث مؤرشف"}).json()[0]
+    assert client.delete(f"/api/receipts/{receipt['id']}").status_code == 200
+    assert client.get("/api/sync", params={"since": cursor}).json()["deleted"] == {"receipts": [receipt["id"]]}
+
+
+def test_sold_houses_with_archived_contracts_stay_resellable(client, make_house):
+    house = settled_sale(client, make_house, "مشتري إعادة بيع مؤرشف")
+    archive(client)
+
+    ids = [row["id"] for row in client.get("/api/contracts/sold-houses").json()]
+    assert house["id"] not in ids
+    # ما يطلبه getSoldHouses في الواجهة (قائمة إعادة البيع)
+    ids = [row["id"] for row in client.get("/api/contracts/sold-houses", params={"include_archived": True}).json()]
+    assert house["id"] in ids
@@ -0,0 +1,30 @@
+import pytest
+
+from conftest import house_payload
+from models import House
+
+
+def test_batch_commits_all_operations(client, db):
+    first, second = house_payload(), house_payload()
+    response = client.post("/api/batch", json={"operations": [
+        {"method": "POST", "path": "/api/houses", "body": first},
+        {"method": "POST", "path": "/api/houses", "body": second},
+        {"method": "GET", "path": "/api/houses?status=available&limit=1000"},
+    ]})
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    listed = {house["house_number"] for house in results[2]["body"]}
+    assert {first["house_number"], second["house_number"]} <= listed
+
+
+@pytest.mark.parametrize("path", ["/api/events", "/api/export/houses", "/api/projects"])
+def test_batch_rejects_streaming_and_project_routes(client, db, path):
+    house = house_payload()
+    response = client.post("/api/batch", json={"operations": [
+        {"method": "POST", "path": "/api/houses", "body": house},
+        {"method": "GET", "path": path},
+    ]}, timeout=10)
+    assert response.status_code == 400
+    assert response.json()["index"] == 1
+    # العملية الأولى أُلغيت مع الطلب
+    assert db.query(House).filter(House.house_number == house["house_number"]).first() is None
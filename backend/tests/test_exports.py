@@ -0,0 +1,18 @@
+from database import default_database
+import exports
+
+
+def test_slow_exports_do_not_exhaust_read_pool(client, make_house):
+    make_house()
+    pool = default_database.read_engine.pool
+    # تنزيلات أكثر من اتصالات مجمع القراءة، كل منها متوقف بعد أول دفعة
+    downloads = [exports.stream_export("houses", "csv") for _ in range(pool.size() + pool._max_overflow + 2)]
+    try:
+        for download in downloads:
+            assert next(download).startswith("\ufeff")
+        response = client.get("/api/houses", params={"limit": 10})
+        assert response.status_code == 200, response.text
+        assert client.get("/api/statistics").status_code == 200
+    finally:
+        for download in downloads:
+            download.close()
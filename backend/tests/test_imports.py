@@ -0,0 +1,73 @@
+from conftest import house_payload, receipt_payload
+from models import House, Receipt
+import sequences
+
+
+def test_import_houses_from_json(client, db):
+    rows = [house_payload() for _ in range(3)]
+    report = client.post("/api/import/houses", json=rows).json()
+    assert report == {"total": 3, "inserted": 3, "errors": []}
+    numbers = [row["house_number"] for row in rows]
+    assert db.query(House).filter(House.house_number.in_(numbers)).count() == 3
+
+
+def test_import_houses_from_csv(client, db):
+    rows = [house_payload() for _ in range(2)]
+    header = ",".join(rows[0])
+    lines = [header] + [",".join(str(value) for value in row.values()) for row in rows]
+    content = ("\ufeff" + "\n".join(lines)).encode("utf-8")
+    response = client.post("/api/import/houses", files={"file": ("houses.csv", content, "text/csv")})
+    assert response.json()["inserted"] == 2
+
+
+def test_import_reports_invalid_rows(client):
+    rows = [house_payload(), {"house_number": "x"}]
+    report = client.post("/api/import/houses", json=rows).json()
+    assert report["inserted"] == 1
+    assert [error["row"] for error in report["errors"]] == [2]
+
+
+def test_import_rejects_malformed_json(client):
+    response = client.post(
+        "/api/import/houses", content=b"[{not json", headers={"Content-Type": "application/json"}
+    )
+    assert response.status_code == 400
+
+
+def test_import_rejects_non_utf8_csv(client):
+    content = "house_number,block_number\n1,مجمع\n".encode("cp1256")
+    response = client.post("/api/import/houses", files={"file": ("houses.csv", content, "text/csv")})
+    assert response.status_code == 400
+
+
+def test_import_receipts_with_mixed_numbers(client, db, make_house):
+    house = make_house()
+    start = sequences.peek_next(db, "receipts")
+    db.rollback()
+    explicit = [start + 1, start + 3]
+    rows = [
+        dict(receipt_payload(house), house_id=None),
+        dict(receipt_payload(house), house_id=None, receipt_number=explicit[0]),
+        dict(receipt_payload(house), house_id=None),
+        dict(receipt_payload(house), house_id=None, receipt_number=explicit[1]),
+    ]
+    report = client.post("/api/import/receipts", json=rows).json()
+    assert report == {"total": 4, "inserted": 4, "errors": []}
+
+    # الأرقام المحجوزة للصفوف الفارغة تأتي بعد أكبر رقم يدوي
+    numbers = [
+        number for number, in db.query(Receipt.receipt_number).filter(Receipt.receipt_number >= start)
+    ]
+    assert len(numbers) == 4
+    assert sorted(set(numbers) - set(explicit)) == [explicit[1] + 1, explicit[1] + 2]
+    assert sequences.peek_next(db, "receipts") == explicit[1] + 3
+
+
+def test_import_receipts_rejects_duplicate_numbers(client, db, make_house):
+    house = make_house()
+    number = sequences.peek_next(db, "receipts") + 10
+    db.rollback()
+    rows = [dict(receipt_payload(house), house_id=None, receipt_number=number) for _ in range(2)]
+    response = client.post("/api/import/receipts", json=rows)
+    assert response.status_code == 400
+    assert db.query(Receipt).filter(Receipt.receipt_number == number).count() == 0
@@ -0,0 +1,50 @@
+from datetime import date
+
+import pytest
+
+from conftest import concurrent
+from models import Contract
+import ledger
+
+
+def test_parallel_payments_do_not_lose_updates(app, client, db, make_house, sell_house):
+    contract = sell_house(make_house())
+    amounts = [100 + index for index in range(30)]
+    calls = [
+        ("POST", "/api/payments", {
+            "contract_id": contract["id"], "payment_date": date.today().isoformat(), "amount": amount,
+        })
+        for amount in amounts
+    ]
+    responses = concurrent(app, calls)
+    assert [response.status_code for response in responses] == [200] * len(calls)
+
+    # حذف بعض الدفعات بالتوازي أيضاً
+    deleted = [response.json() for response in responses[:10]]
+    responses = concurrent(app, [("DELETE", f"/api/payments/{payment['id']}", None) for payment in deleted])
+    assert [response.status_code for response in responses] == [200] * len(deleted)
+
+    amount_paid = db.query(Contract.amount_paid).filter(Contract.id == contract["id"]).scalar()
+    expected = contract["amount_paid"] + sum(amounts) - sum(payment["amount"] for payment in deleted)
+    assert amount_paid == pytest.approx(expected)
+    assert ledger.reconcile(db)["drifted_count"] == 0
+
+
+def test_reconcile_fixes_drift(client, db, make_house, sell_house):
+    contract = sell_house(make_house())
+    client.post("/api/payments", json={
+        "contract_id": contract["id"], "payment_date": date.today().isoformat(), "amount": 500,
+    })
+    db.query(Contract).filter(Contract.id == contract["id"]).update({"amount_paid": 1})
+    db.commit()
+
+    report = ledger.reconcile(db)
+    assert report["drifted_count"] == 1
+    assert report["drifted"][0]["expected"] == pytest.approx(contract["amount_paid"] + 500)
+
+    assert ledger.reconcile(db, fix=True)["fixed"] == 1
+    assert ledger.reconcile(db)["drifted_count"] == 0
+    db.expire_all()
+    assert db.query(Contract.amount_paid).filter(Contract.id == contract["id"]).scalar() == pytest.approx(
+        contract["amount_paid"] + 500
+    )
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from database import engine
+import metrics
+
+
+def test_failed_statements_do_not_leak_timing_state(app):
+    stats = metrics.RequestStats({})
+    token = metrics._current.set(stats)
+    try:
+        with engine.connect() as connection:
+            for _ in range(50):
+                with pytest.raises(OperationalError):
+                    connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+            assert not connection.info.get("query_start")
+    finally:
+        metrics._current.reset(token)
+    # العبارات الفاشلة لا تُحسب، والناجحة بعدها تُحسب بزمنها
+    assert stats.statements == 1
+    assert 0 <= stats.sql_seconds < 1
@@ -0,0 +1,24 @@
+from conftest import house_payload
+import pagination
+
+
+def test_lists_are_paged_by_default(client):
+    response = client.post("/api/import/houses", json=[house_payload() for _ in range(pagination.DEFAULT_PAGE_SIZE + 5)])
+    assert response.status_code == 200, response.text
+
+    first = client.get("/api/houses")
+    assert len(first.json()) == pagination.DEFAULT_PAGE_SIZE
+    cursor = first.headers["X-Next-Cursor"]
+
+    rows = first.json()
+    while cursor:
+        page = client.get("/api/houses", params={"cursor": cursor})
+        rows += page.json()
+        cursor = page.headers.get("X-Next-Cursor")
+    numbers = [row["house_number"] for row in rows]
+    assert numbers == sorted(numbers)
+    assert len(numbers) == len(set(numbers)) > pagination.DEFAULT_PAGE_SIZE
+
+
+def test_page_size_is_capped(client):
+    assert client.get("/api/houses", params={"limit": pagination.MAX_PAGE_SIZE + 1}).status_code == 422
@@ -0,0 +1,53 @@
+from datetime import date
+
+import pytest
+
+from conftest import house_payload
+
+
+@pytest.fixture
+def two_projects(client):
+    """مشروعان بنفس عدد العمليات (إصدارات جداول متساوية) وإيرادات مختلفة"""
+    names = ("alpha", "beta")
+    for name, down_payment in zip(names, (200, 999)):
+        assert client.post("/api/projects", json={"name": name}).status_code == 200
+        headers = {"X-Project": name}
+        house = house_payload()
+        assert client.post("/api/houses", json=house, headers=headers).status_code == 200
+        response = client.post("/api/contracts", headers=headers, json={
+            "sale_date": date.today().isoformat(),
+            "house_number": house["house_number"],
+            "block_number": 1,
+            "area": 200,
+            "floors": 1,
+            "buyer_name": "مشتري",
+            "mobile_number": "07700000000",
+            "sale_type": "بيع أول مرة",
+            "total_amount": 100000,
+            "down_payment": down_payment,
+            "loan_amount": 0,
+            "amount_paid": down_payment,
+            "contract_date": date.today().isoformat(),
+        })
+        assert response.status_code == 200, response.text
+    return names
+
+
+def test_monthly_cache_is_per_project(client, two_projects):
+    revenues = [
+        client.get("/api/statistics/monthly", params={"months": 1}, headers={"X-Project": name}).json()[0]["revenue"]
+        for name in two_projects
+    ]
+    assert revenues == [200, 999]
+
+
+def test_etag_differs_between_projects(client, two_projects):
+    alpha, beta = two_projects
+    first = client.get("/api/houses", headers={"X-Project": alpha})
+    etag = first.headers["ETag"]
+    assert client.get("/api/houses", headers={"X-Project": alpha, "If-None-Match": etag}).status_code == 304
+
+    response = client.get("/api/houses", headers={"X-Project": beta, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [house["house_number"] for house in response.json()] != [house["house_number"] for house in first.json()]
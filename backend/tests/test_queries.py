@@ -0,0 +1,63 @@
+from datetime import date
+
+import pytest
+
+from conftest import count_queries
+from database import Database
+import migrations
+
+LIST_ENDPOINTS = [
+    "/api/resale",
+    "/api/contracts/sold-houses",
+    "/api/receipts",
+    "/api/contracts",
+]
+
+
+def add_rows(client, make_house, sell_house, count: int):
+    """منازل مباعة مع إعادة بيع، ونصفها محذوف (مسار الرجوع إلى العقد)"""
+    for index in range(count):
+        house = make_house(phase=1 + index % 3)
+        sell_house(house)
+        response = client.post("/api/resale", json={
+            "house_id": house["id"],
+            "source": "مكتب",
+            "mobile_number": "07800000000",
+            "contact_date": date.today().isoformat(),
+        })
+        assert response.status_code == 200, response.text
+        if index % 2:
+            assert client.delete(f"/api/houses/{house['id']}").status_code == 200
+
+
+def statements(client, url: str) -> int:
+    with count_queries() as counter:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    return counter["count"]
+
+
+@pytest.mark.parametrize("url", LIST_ENDPOINTS)
+def test_list_query_count_does_not_grow_with_rows(client, make_house, sell_house, url):
+    add_rows(client, make_house, sell_house, 2)
+    before = statements(client, url)
+    add_rows(client, make_house, sell_house, 6)
+    assert statements(client, url) == before
+
+
+@pytest.fixture(scope="module")
+def explain_plans(tmp_path_factory):
+    """خطط الاستعلامات على مخطط جديد يبنيه Database.init() (الجداول والترحيلات معاً)"""
+    database = Database(f"sqlite:///{tmp_path_factory.mktemp('explain') / 'explain.db'}")
+    try:
+        database.init()
+        with database.engine.connect() as connection:
+            yield {name: (details, uses_index) for name, details, uses_index in migrations.explain(connection)}
+    finally:
+        database.dispose()
+
+
+@pytest.mark.parametrize("name", list(migrations.EXPLAIN_QUERIES))
+def test_query_uses_index(explain_plans, name):
+    details, uses_index = explain_plans[name]
+    assert uses_index, details
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+from sqlalchemy import text
+
+from conftest import house_payload
+from database import default_database, ReadSessionLocal
+from models import House
+
+# استعلام طويل: كل صف يعيد عدّ المنازل، فيظهر إن تغيّرت لقطة القارئ أثناء القراءة
+LONG_READ = text(
+    "WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n LIMIT 100000) "
+    "SELECT x, (SELECT count(*) FROM houses) FROM n"
+)
+
+
+@pytest.mark.skipif(not default_database.read_isolated, reason="DB_READ_ENGINE=0")
+def test_long_read_does_not_block_writes(client, db):
+    session = ReadSessionLocal()
+    try:
+        result = session.execute(LONG_READ)
+        _, houses_before = result.fetchone()
+
+        # القراءة ما زالت مفتوحة: الكتابة تُثبَّت دون انتظار busy_timeout
+        started = time.perf_counter()
+        payload = house_payload()
+        response = client.post("/api/houses", json=payload)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200, response.text
+        assert elapsed < 1
+
+        assert db.query(House).filter(House.house_number == payload["house_number"]).count() == 1
+        # والقارئ يكمل على لقطته الأولى
+        rows = result.fetchmany(1000)
+        assert {count for _, count in rows} == {houses_before}
+        result.close()
+    finally:
+        session.close()
@@ -0,0 +1,33 @@
+from conftest import concurrent, receipt_payload
+from models import Contract, Receipt
+
+
+def test_parallel_receipts_get_unique_numbers(app, db, make_house):
+    houses = [make_house() for _ in range(20)]
+    calls = [("POST", "/api/receipts", receipt_payload(house)) for house in houses]
+    # وصولات بدون منزل أيضاً (لا تنشئ عقداً)
+    calls += [("POST", "/api/receipts", dict(receipt_payload(houses[0]), house_id=None)) for _ in range(20)]
+
+    responses = concurrent(app, calls)
+    assert [response.status_code for response in responses] == [200] * len(calls)
+
+    receipt_numbers = [response.json()["receipt_number"] for response in responses]
+    assert len(set(receipt_numbers)) == len(calls)
+
+    contract_numbers = [
+        number for number, in db.query(Contract.contract_number).filter(
+            Contract.house_id.in_([house["id"] for house in houses])
+        )
+    ]
+    assert len(contract_numbers) == len(houses)
+    assert len(set(contract_numbers)) == len(houses)
+    assert db.query(Receipt).filter(Receipt.receipt_number.in_(receipt_numbers)).count() == len(calls)
+
+
+def test_numbers_are_not_reused_after_delete(client, make_house, sell_house):
+    contract = sell_house(make_house())
+    receipt = client.get("/api/receipts", params={"limit": 1}).json()[0]
+    assert client.delete(f"/api/receipts/{receipt['id']}").status_code == 200
+
+    next_contract = sell_house(make_house())
+    assert next_contract["contract_number"] > contract["contract_number"]
@@ -0,0 +1,129 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from conftest import concurrent, house_payload
+from database import ReadSessionLocal
+from models import House, Contract, HouseArchive, ContractArchive
+from reports import compute_statistics
+import reports
+import rollups
+
+
+def reference_statistics(db, current_date: date) -> dict:
+    """الحساب القديم صفاً بصف (استعلام منزل لكل عقد) للمقارنة، مع الجداول المؤرشفة"""
+    contracts = db.query(Contract).all() + db.query(ContractArchive).all()
+    current_month = current_date.strftime("%Y-%m")
+    result = {
+        "total_sold_houses": len(contracts),
+        "monthly_sold_houses": 0,
+        "total_revenue": 0,
+        "monthly_revenue": 0,
+        "total_debts": 0,
+        "phase_sales": {},
+    }
+    for contract in contracts:
+        house = None
+        if contract.house_id:
+            house = db.query(House).filter(House.id == contract.house_id).first() or db.query(
+                HouseArchive
+            ).filter(HouseArchive.id == contract.house_id).first()
+        revenue = (contract.down_payment or 0) + (house.outlook if house and house.outlook else 0)
+        result["total_revenue"] += revenue
+        if contract.sale_date.strftime("%Y-%m") == current_month:
+            result["monthly_sold_houses"] += 1
+            result["monthly_revenue"] += revenue
+        if house:
+            result["phase_sales"][house.phase] = result["phase_sales"].get(house.phase, 0) + 1
+        result["total_debts"] += max(0, (contract.total_amount or 0) - (contract.amount_paid or 0))
+    return result
+
+
+def contract_payload(house_number: int, sale_date: date, **values) -> dict:
+    return {
+        "sale_date": sale_date.isoformat(),
+        "house_number": house_number,
+        "block_number": 1,
+        "area": 200,
+        "floors": 1,
+        "buyer_name": "مشتري",
+        "mobile_number": "07700000000",
+        "sale_type": "بيع أول مرة",
+        "total_amount": 100000,
+        "down_payment": 20000,
+        "loan_amount": 50000,
+        "amount_paid": 30000,
+        "contract_date": sale_date.isoformat(),
+        **values,
+    }
+
+
+def assert_statistics_equal(actual: dict, expected: dict):
+    assert actual["phase_sales"] == expected["phase_sales"]
+    for key, value in expected.items():
+        if key != "phase_sales":
+            assert actual[key] == pytest.approx(value), key
+
+
+def test_compute_statistics_matches_per_row_reference(client, db, make_house):
+    today = date.today()
+    last_year = date(today.year - 1, today.month, 1)
+    houses = [
+        make_house(phase=1, outlook=5000),
+        make_house(phase=2),
+        make_house(phase=3, outlook=2500),
+        make_house(phase=2, outlook=0),
+    ]
+    cases = [
+        (houses[0], today, {}),
+        (houses[1], last_year, {"amount_paid": 100000}),
+        (houses[2], today, {"amount_paid": 120000}),  # مدفوع أكثر من المبلغ: لا دين سالب
+        (houses[3], last_year, {"down_payment": 0}),
+        (None, today, {"down_payment": 15000}),  # عقد بلا منزل
+    ]
+    for house, sale_date, values in cases:
+        house_number = house["house_number"] if house else 999999
+        response = client.post("/api/contracts", json=contract_payload(house_number, sale_date, **values))
+        assert response.status_code == 200, response.text
+    # منزل محذوف يبقى في حساب عقده
+    assert client.delete(f"/api/houses/{houses[3]['id']}").status_code == 200
+
+    assert_statistics_equal(compute_statistics(db, today), reference_statistics(db, today))
+    assert_statistics_equal(compute_statistics(db, last_year), reference_statistics(db, last_year))
+
+
+def test_rollups_survive_concurrent_writes(app, client, db, make_house, sell_house):
+    house = make_house(phase=2, outlook=1000)
+    contract = sell_house(house)
+    update = {key: value for key, value in house_payload().items() if key != "house_number"}
+    calls = []
+    for index in range(10):
+        calls.append(("PUT", f"/api/houses/{house['id']}", dict(
+            update, house_number=house["house_number"], phase=2 + index % 2, outlook=1000 * index
+        )))
+        calls.append(("POST", "/api/payments", {
+            "contract_id": contract["id"], "payment_date": date.today().isoformat(), "amount": 100,
+        }))
+    responses = concurrent(app, calls)
+    assert [response.status_code for response in responses] == [200] * len(calls)
+
+    actual = rollups.read_statistics(db)
+    rollups.rebuild(db)
+    assert_statistics_equal(actual, rollups.read_statistics(db))
+
+
+def test_monthly_cache_is_bounded_and_thread_safe(app, monkeypatch):
+    monkeypatch.setattr(reports, "MONTHLY_CACHE_SIZE", 5)
+
+    def load(months):
+        session = ReadSessionLocal()
+        try:
+            return reports.monthly_sales(session, months=months)
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(load, [1 + index % 24 for index in range(200)]))
+    assert [len(result) for result in results] == [1 + index % 24 for index in range(200)]
+    assert len(reports._monthly_cache) <= 5
@@ -0,0 +1,38 @@
+from datetime import date
+
+import pytest
+
+import main
+
+
+class NextMonth(date):
+    """date.today() في الشهر التالي"""
+
+    @classmethod
+    def today(cls):
+        real = date.today()
+        return cls(real.year + real.month // 12, real.month % 12 + 1, 1)
+
+
+@pytest.mark.parametrize("url", ["/api/statistics", "/api/statistics/monthly"])
+def test_statistics_etag_changes_with_month(client, monkeypatch, url):
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # لا كتابة بين الطلبين، لكن الشهر تغيّر
+    monkeypatch.setattr(main, "date", NextMonth)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    if url.endswith("monthly"):
+        assert response.json()[-1]["month"] == NextMonth.today().strftime("%Y-%m")
+    else:
+        assert response.json()["monthly_sold_houses"] == 0
+
+
+def test_etag_matches_table_versions(client, make_house):
+    etag = client.get("/api/houses").headers["ETag"]
+    assert client.get("/api/houses", headers={"If-None-Match": etag}).status_code == 304
+    make_house()
+    assert client.get("/api/houses", headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,60 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from conftest import concurrent, house_payload
+from database import default_database
+from models import House
+import writer
+
+
+@pytest.fixture
+def groups(app, monkeypatch):
+    """تفعيل الكاتب الموحّد وعدّ المعاملات التي يفتحها (معاملة واحدة لكل مجموعة)"""
+    monkeypatch.setattr(writer, "WRITER_ENABLED", True)
+    counter = {"count": 0}
+    begin_immediate = default_database.begin_immediate
+
+    def counting_begin_immediate():
+        counter["count"] += 1
+        return begin_immediate()
+
+    monkeypatch.setattr(default_database, "begin_immediate", counting_begin_immediate)
+    yield counter
+    default_database.writer = None
+
+
+def test_concurrent_writes_share_one_commit(app, db, groups):
+    payloads = [house_payload() for _ in range(20)]
+    responses = concurrent(app, [("POST", "/api/houses", payload) for payload in payloads])
+    assert [response.status_code for response in responses] == [200] * len(payloads)
+    assert [response.json()["house_number"] for response in responses] == [
+        payload["house_number"] for payload in payloads
+    ]
+    assert 1 <= groups["count"] < len(payloads) / 2
+
+    numbers = [payload["house_number"] for payload in payloads]
+    assert db.query(House).filter(House.house_number.in_(numbers)).count() == len(payloads)
+
+
+def test_failed_write_rolls_back_only_its_savepoint(app, db, groups, monkeypatch):
+    payloads = [house_payload() for _ in range(10)]
+    failing = payloads[4]["house_number"]
+    refresh = Session.refresh
+
+    def failing_refresh(session, instance, *args, **kwargs):
+        # يفشل الطلب بعد commit المعالج، فلا يلغيه إلا SAVEPOINT الكاتب الخاص به
+        if isinstance(instance, House) and instance.house_number == failing:
+            raise HTTPException(status_code=400, detail="فشل متعمد")
+        return refresh(session, instance, *args, **kwargs)
+
+    monkeypatch.setattr(Session, "refresh", failing_refresh)
+    responses = concurrent(app, [("POST", "/api/houses", payload) for payload in payloads])
+    statuses = [response.status_code for response in responses]
+    assert statuses == [400 if index == 4 else 200 for index in range(len(payloads))]
+    assert 1 <= groups["count"] < len(payloads) / 2
+
+    numbers = [payload["house_number"] for payload in payloads]
+    stored = {number for number, in db.query(House.house_number).filter(House.house_number.in_(numbers))}
+    assert stored == set(numbers) - {failing}
+
@@ -0,0 +1,91 @@
+"""
+إصدارات الجداول والطلبات الشرطية (ETag / Last-Modified)
+
+كل جدول له رقم إصدار في table_versions تزيده triggers في SQLite مع أي
+INSERT أو UPDATE أو DELETE، فيشمل ذلك جميع مسارات الكتابة حتى الإدراج الجماعي.
+نقاط القراءة تقارن الإصدار بترويسة If-None-Match وترد بـ 304 دون تنفيذ الاستعلام.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import TableVersion
+
+VERSIONED_TABLES = ("houses", "receipts", "contracts", "resale", "payments")
+
+
+def install_triggers(connection):
+    """إنشاء صفوف الإصدارات و triggers التحديث (آمن للتكرار)"""
+    for table in VERSIONED_TABLES:
+        connection.execute(text(
+            "INSERT OR IGNORE INTO table_versions (table_name, version, updated_at) "
+            "VALUES (:table, 0, CURRENT_TIMESTAMP)"
+        ), {"table": table})
+        for operation in ("INSERT", "UPDATE", "DELETE"):
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_version_{operation.lower()} "
+                f"AFTER {operation} ON {table} BEGIN "
+                f"UPDATE table_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP "
+                f"WHERE table_name = '{table}'; END"
+            ))
+
+
+def current_versions(db: Session, tables: Iterable[str]):
+    """قراءة إصدارات الجداول المطلوبة"""
+    return db.query(TableVersion.table_name, TableVersion.version, TableVersion.updated_at).filter(
+        TableVersion.table_name.in_(list(tables))
+    ).order_by(TableVersion.table_name).all()
+
+
+def version_key(db: Session, tables: Iterable[str]) -> tuple:
+    """مفتاح يتغير مع أي تعديل على الجداول (للذاكرة المؤقتة)"""
+    return tuple((name, version) for name, version, _ in current_versions(db, tables))
+
+
+def not_modified(db: Session, request: Request, response: Response, tables: Iterable[str],
+                 extra: Optional[str] = None, extra_since: Optional[datetime] = None) -> Optional[Response]:
+    """
+    إضافة ETag و Last-Modified للرد، وإرجاع رد 304 إذا كانت نسخة العميل حديثة.
+    extra لما يتغير به الرد دون تعديل الجداول (مثل الشهر الحالي في الإحصائيات)،
+    و extra_since بداية صلاحيته (حد أدنى لـ Last-Modified)
+    """
+    rows = current_versions(db, tables)
+    if not rows:
+        return None
+
+    # الإصدارات تتكرر بين قواعد المشاريع، فيدخل اسم المشروع (من info الجلسة) في ETag
+    project = db.info.get("project")
+    etag = 'W/"' + (f"{project}:" if project else "") + "-".join(
+        f"{name}.{version}" for name, version, _ in rows
+    ) + (f":{extra}" if extra else "") + '"'
+    last_modified = max(updated_at for _, _, updated_at in rows)
+    if extra_since is not None:
+        last_modified = max(last_modified, extra_since)
+    last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "no-cache",
+        # نفس الرابط يخص مشروعاً آخر مع ترويسة X-Project مختلفة
+        "Vary": "X-Project",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                since = None
+            # دقة Last-Modified ثانية واحدة، لذا لا نعتبر الثانية نفسها غير معدلة
+            if since is not None and since.tzinfo is not None and last_modified < since:
+                return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,203 @@
+"""
+الكاتب الموحّد: تجميع طلبات الكتابة المتزامنة في معاملة واحدة (group commit)
+
+SQLite يسمح بكاتب واحد، وكل معالج كتابة يثبّت معاملته بنفسه، فتتسلسل طلبات
+الوصولات والدفعات المتزامنة على fsync وقد يفشل بعضها بـ "database is locked".
+مع DB_WRITER=1 تمر طلبات الكتابة (POST/PUT/PATCH/DELETE على /api/) عبر طابور
+لكل قاعدة بيانات، ومهمة واحدة تنفّذها بالترتيب:
+
+- تفتح معاملة (BEGIN IMMEDIATE) وتنفّذ كل الطلبات المنتظرة (حتى DB_WRITER_MAX_GROUP)
+  عبر نفس المعالجات، كل طلب داخل SAVEPOINT خاص به
+- الطلب الذي يفشل (رمز 400 فأكثر أو استثناء) يُلغى وحده دون باقي المجموعة
+- ثم commit واحد للمجموعة، وبعده فقط تُرسل استجابة كل طلب وتُنشر إشعاراته
+
+الطلبات التي تصل أثناء تنفيذ مجموعة تنتظر وتُجمع في المجموعة التالية، فيزداد
+حجم المجموعة مع الضغط دون تأخير مضاف عند الطلبات المنفردة.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from database import current_database, write_slot
+import events
+
+logger = logging.getLogger("writer")
+
+WRITER_ENABLED = os.getenv("DB_WRITER", "0") == "1"
+
+# الحد الأعلى لعدد الطلبات في معاملة واحدة (قفل الكتابة محجوز طوال المجموعة)
+MAX_GROUP = int(os.getenv("DB_WRITER_MAX_GROUP", "64"))
+
+METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# مسارات تدير معاملاتها بنفسها أو لا تكتب في قاعدة المشروع
+EXCLUDED_PREFIXES = ("/api/batch", "/api/import", "/api/projects", "/api/payments/reconcile", "/api/archive")
+
+
+class Slot:
+    """طلب كتابة واحد في الطابور"""
+
+    def __init__(self, scope, body: bytes, context: contextvars.Context):
+        self.scope = scope
+        self.body = body
+        self.context = context
+        self.connection = None
+        self.notifications: List[dict] = []
+        self.messages: List[dict] = []
+        self.status = 500
+        self.error: Optional[BaseException] = None
+        self.done = asyncio.get_running_loop().create_future()
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None and self.status < 400
+
+
+class CommitFailed(Exception):
+    """فشل تثبيت المجموعة، فلم يُحفظ أي طلب فيها"""
+
+
+class Writer:
+    """طابور ومهمة الكتابة لقاعدة بيانات واحدة"""
+
+    def __init__(self, database, app):
+        self.database = database
+        self.app = app
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closing = False
+        self.task = self.loop.create_task(self._run())
+
+    async def submit(self, slot: Slot):
+        if self.task.done():
+            self.task = self.loop.create_task(self._run())
+        self.queue.put_nowait(slot)
+        return await slot.done
+
+    def close(self):
+        """إيقاف المهمة بعد تنفيذ ما في الطابور (من أي خيط)"""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def _run(self):
+        while True:
+            slot = await self.queue.get()
+            if slot is None:
+                return
+            group = [slot]
+            try:
+                await self._run_group(group)
+            except Exception as error:
+                logger.exception("write group failed")
+                for slot in group:
+                    if not slot.done.done():
+                        slot.done.set_exception(CommitFailed(str(error)))
+            if self.closing:
+                return
+
+    async def _run_group(self, group: List[Slot]):
+        connection = await run_in_threadpool(self.database.begin_immediate)
+        try:
+            index = 0
+            while index < len(group):
+                await self._execute(connection, group[index])
+                index += 1
+                # ما وصل أثناء التنفيذ يدخل نفس المعاملة
+                while len(group) < MAX_GROUP and not self.queue.empty() and not self.closing:
+                    slot = self.queue.get_nowait()
+                    if slot is None:
+                        self.closing = True
+                    else:
+                        group.append(slot)
+            await run_in_threadpool(connection.commit)
+        except BaseException:
+            await run_in_threadpool(connection.rollback)
+            raise
+        finally:
+            await run_in_threadpool(connection.close)
+
+        for slot in group:
+            if slot.succeeded:
+                events.broker.publish(slot.notifications, self.database.project)
+                slot.done.set_result(slot.messages)
+            elif slot.error is not None:
+                slot.done.set_exception(slot.error)
+            else:
+                slot.done.set_result(slot.messages)
+
+    async def _execute(self, connection, slot: Slot):
+        """تنفيذ طلب واحد داخل SAVEPOINT، بسياق الطلب الأصلي (المشروع والقياسات)"""
+        savepoint = await run_in_threadpool(connection.begin_nested)
+        slot.connection = connection
+        try:
+            # المهمة تنسخ السياق الحالي عند إنشائها (بديل create_task(context=) قبل Python 3.11)
+            await slot.context.run(self.loop.create_task, self._call(slot))
+        except Exception as error:
+            slot.error = error
+        await run_in_threadpool(savepoint.commit if slot.succeeded else savepoint.rollback)
+
+    async def _call(self, slot: Slot):
+        write_slot.set(slot)
+        received = False
+
+        async def receive():
+            nonlocal received
+            if received:
+                # لا ينتظر المعالج انقطاع الاتصال، والاستجابة تُرسل بعد التثبيت
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": slot.body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                slot.status = message["status"]
+            slot.messages.append(message)
+
+        await self.app(slot.scope, receive, send)
+
+
+def _writer_for(database, app) -> Writer:
+    writer = database.writer
+    if writer is None or writer.loop is not asyncio.get_running_loop():
+        writer = database.writer = Writer(database, app)
+    return writer
+
+
+class WriterMiddleware:
+    """ASGI middleware يمرر طلبات الكتابة عبر الكاتب الموحّد (عند DB_WRITER=1)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not WRITER_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] not in METHODS
+            or not scope["path"].startswith("/api/")
+            or scope["path"].startswith(EXCLUDED_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # قراءة الجسم هنا لأن المعالج يعمل في مهمة الكاتب
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+
+        slot = Slot(scope, b"".join(chunks), contextvars.copy_context())
+        try:
+            messages = await _writer_for(current_database(), self.app).submit(slot)
+        except CommitFailed:
+            await JSONResponse({"detail": "تعذر حفظ البيانات، حاول مرة أخرى"}, status_code=503)(scope, receive, send)
+            return
+        for message in messages:
+            await send(message)
@@ -4,6 +4,48 @@
 
 const API_BASE_URL = 'http://72.62.53.138:8001/api'
 
+// المشروع الحالي (قاعدة بيانات مستقلة لكل تطوير سكني)، فارغ للقاعدة الافتراضية
+function getCurrentProject() {
+    return localStorage.getItem('project') || '';
+}
+
+function setCurrentProject(project) {
+    if (project) {
+        localStorage.setItem('project', project);
+    } else {
+        localStorage.removeItem('project');
+    }
+}
+
+// رابط API للمشروع الحالي (بادئة المسار تصلح أيضاً لـ EventSource الذي لا يرسل ترويسات)
+function projectApiBase() {
+    const project = getCurrentProject();
+    return project ? API_BASE_URL.replace(/\/api$/, `/projects/${encodeURIComponent(project)}/api`) : API_BASE_URL;
+}
+
+// حجم الصفحة عند جلب قائمة كاملة (الحد الأعلى في الخادم)
+const PAGE_SIZE = 1000;
+
+// جلب جميع صفحات قائمة بمتابعة ترويسة X-Next-Cursor
+async function apiRequestAll(endpoint) {
+    const separator = endpoint.includes('?') ? '&' : '?';
+    const rows = [];
+    let cursor = null;
+    do {
+        let url = `${projectApiBase()}${endpoint}${separator}limit=${PAGE_SIZE}`;
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        rows.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return rows;
+}
+
 // دالة مساعدة للطلبات
 async function apiRequest(method, endpoint, data = null) {
     const options = {
@@ -18,7 +60,7 @@ async function apiRequest(method, endpoint, data = null) {
     }
     
     try {
-        const response = await fetch(`${API_BASE_URL}${endpoint}`, options);
+        const response = await fetch(`${projectApiBase()}${endpoint}`, options);
         
         if (!response.ok) {
             let errorMessage = 'حدث خطأ في الطلب';
@@ -55,7 +97,7 @@ async function getAllHouses(filterPhase = 'all', includeSold = true) {
         if (filterPhase !== 'all') {
             url += `&phase=${filterPhase}`;
         }
-        return await apiRequest('GET', url);
+        return await apiRequestAll(url);
     } catch (error) {
         console.error('Error getting houses:', error);
         return [];
@@ -145,11 +187,21 @@ async function addMultipleHouses(count = 100) {
     };
 }
 
+// استيراد جماعي (مصفوفة من الصفوف بنفس حقول الـ API)
+async function importRows(table, rows) {
+    try {
+        return await apiRequest('POST', `/import/${table}`, rows);
+    } catch (error) {
+        console.error('Error importing rows:', error);
+        return { total: rows.length, inserted: 0, errors: [{ row: 0, errors: [error.message] }] };
+    }
+}
+
 // ==================== Receipts ====================
 
 async function getAllReceipts() {
     try {
-        return await apiRequest('GET', '/receipts');
+        return await apiRequestAll('/receipts');
     } catch (error) {
         console.error('Error getting receipts:', error);
         return [];
@@ -190,6 +242,17 @@ async function addReceipt(receiptData) {
     }
 }
 
+// الرقم التالي المقترح للوصل أو العقد (receipts / contracts)
+async function getNextNumber(name) {
+    try {
+        const result = await apiRequest('GET', `/sequences/${name}/next`);
+        return result.next_number;
+    } catch (error) {
+        console.error('Error getting next number:', error);
+        return null;
+    }
+}
+
 async function deleteReceipt(receiptId) {
     try {
         await apiRequest('DELETE', `/receipts/${receiptId}`);
@@ -203,7 +266,7 @@ async function deleteReceipt(receiptId) {
 
 async function getAllContracts() {
     try {
-        return await apiRequest('GET', '/contracts');
+        return await apiRequestAll('/contracts');
     } catch (error) {
         console.error('Error getting contracts:', error);
         return [];
@@ -291,7 +354,8 @@ async function getRemainingAmount(contractId) {
 
 async function getSoldHouses() {
     try {
-        return await apiRequest('GET', '/contracts/sold-houses');
+        // يشمل المنازل التي أُرشفت عقودها المسددة، فهي قابلة لإعادة البيع أيضاً
+        return await apiRequest('GET', '/contracts/sold-houses?include_archived=true');
     } catch (error) {
         console.error('Error getting sold houses:', error);
         return [];
@@ -302,7 +366,7 @@ async function getSoldHouses() {
 
 async function getAllResale() {
     try {
-        return await apiRequest('GET', '/resale');
+        return await apiRequestAll('/resale');
     } catch (error) {
         console.error('Error getting resale:', error);
         return [];
@@ -344,7 +408,7 @@ async function deleteResale(id) {
 
 async function getPaymentsByContractId(contractId) {
     try {
-        return await apiRequest('GET', `/payments/contract/${contractId}`);
+        return await apiRequestAll(`/payments/contract/${contractId}`);
     } catch (error) {
         console.error('Error getting payments:', error);
         return [];
@@ -396,6 +460,110 @@ async function getStatistics() {
     }
 }
 
+async function getMonthlySalesData(months = 6, phase = null) {
+    try {
+        let url = `/statistics/monthly?months=${months}`;
+        if (phase) {
+            url += `&phase=${phase}`;
+        }
+        return await apiRequest('GET', url);
+    } catch (error) {
+        console.error('Error getting monthly sales:', error);
+        return [];
+    }
+}
+
+// أعمار الديون حسب أيام التأخر، أو عقود فئة معينة عند تحديد bucket
+async function getAgingReport(phase = null, block = null, bucket = null) {
+    try {
+        const params = new URLSearchParams();
+        if (phase) params.append('phase', phase);
+        if (block) params.append('block', block);
+        if (bucket) params.append('bucket', bucket);
+        const path = bucket ? '/reports/aging/contracts' : '/reports/aging';
+        const query = params.toString();
+        const endpoint = query ? `${path}?${query}` : path;
+        return await (bucket ? apiRequestAll(endpoint) : apiRequest('GET', endpoint));
+    } catch (error) {
+        console.error('Error getting aging report:', error);
+        return null;
+    }
+}
+
+// ==================== Search Functions ====================
+
+// البحث في أسماء المشترين وأرقام الهواتف (entity: receipt / contract / resale)
+async function searchRecords(query, entity = null, limit = 20) {
+    try {
+        let url = `/search?q=${encodeURIComponent(query)}&limit=${limit}`;
+        if (entity) {
+            url += `&entity=${entity}`;
+        }
+        return await apiRequest('GET', url);
+    } catch (error) {
+        console.error('Error searching:', error);
+        return [];
+    }
+}
+
+// ==================== Change Events ====================
+
+// الاشتراك في إشعارات التغيير (Server-Sent Events) بدلاً من إعادة التحميل الدوري
+// onChange يُستدعى بـ { entity, id, op, ... } أو { entity: '*', op: 'resync' } عند فقدان إشعارات
+function subscribeChanges(onChange) {
+    if (typeof EventSource === 'undefined') {
+        return null;
+    }
+    const source = new EventSource(`${projectApiBase()}/events`);
+    source.addEventListener('change', event => onChange(JSON.parse(event.data)));
+    source.addEventListener('resync', () => onChange({ entity: '*', op: 'resync' }));
+    return source;
+}
+
+// ==================== Sync ====================
+
+// جلب التغييرات منذ آخر مزامنة فقط (يُحفظ cursor في localStorage لكل مشروع)
+// يُرجع { changes: { houses: [...], ... }, deleted: { payments: [ids], ... }, reset }
+// على المستدعي حذف deleted أولاً ثم إضافة أو تحديث changes حسب id، ومسح نسخته عند reset
+async function syncChanges() {
+    const merged = { changes: {}, deleted: {}, reset: false };
+    const cursorKey = `syncCursor:${getCurrentProject()}`;
+    let since = parseInt(localStorage.getItem(cursorKey) || '0');
+    while (true) {
+        const page = await apiRequest('GET', `/sync?since=${since}`);
+        if (page.reset) {
+            localStorage.removeItem(cursorKey);
+            return { ...(await syncChanges()), reset: true };
+        }
+        for (const [table, ids] of Object.entries(page.deleted)) {
+            merged.deleted[table] = (merged.deleted[table] || []).concat(ids);
+            // صف حُذف بعد تعديله في صفحة سابقة
+            if (merged.changes[table]) {
+                merged.changes[table] = merged.changes[table].filter(row => !ids.includes(row.id));
+            }
+        }
+        for (const [table, rows] of Object.entries(page.changes)) {
+            const ids = new Set(rows.map(row => row.id));
+            merged.changes[table] = (merged.changes[table] || []).filter(row => !ids.has(row.id)).concat(rows);
+        }
+        since = page.cursor;
+        localStorage.setItem(cursorKey, String(since));
+        if (!page.has_more) {
+            return merged;
+        }
+    }
+}
+
+// ==================== Batch ====================
+
+// تنفيذ عدة عمليات في طلب واحد ومعاملة واحدة
+// operations: [{ method: 'POST', path: '/api/receipts', body: {...} }, { method: 'GET', path: '/api/statistics' }]
+// يُرجع نتائج العمليات بالترتيب [{ status, body }]، وعند فشل أي عملية لا يُحفظ شيء
+async function runBatch(operations) {
+    const result = await apiRequest('POST', '/batch', { operations });
+    return result.results;
+}
+
 // ==================== Helper Functions ====================
 
 // الحصول على العقود المتأخرة عن الدفع
@@ -530,3 +698,35 @@ async function initDatabase() {
     return true;
 }
 
+// ==================== Archive ====================
+
+// نقل العقود المسددة (بدون دفعة منذ days يوماً) ودفعاتها والمنازل المحذوفة إلى الأرشيف
+// يُرجع { cutoff, contracts, payments, houses }
+async function runArchive(days = 365) {
+    return await apiRequest('POST', `/archive?days=${days}`);
+}
+
+// ==================== Projects ====================
+
+async function getProjects() {
+    try {
+        return (await apiRequest('GET', '/projects')).projects;
+    } catch (error) {
+        console.error('Error getting projects:', error);
+        return [];
+    }
+}
+
+async function createProject(name) {
+    return await apiRequest('POST', '/projects', { name });
+}
+
+// إحصائيات جميع المشاريع مع مجموعها { totals, projects: { name: statistics } }
+async function getProjectsStatistics() {
+    try {
+        return await apiRequest('GET', '/projects/statistics');
+    } catch (error) {
+        console.error('Error getting projects statistics:', error);
+        return null;
+    }
+}
@@ -160,6 +160,17 @@ async function resetReceiptForm() {
 
 // اقتراح رقم الوصل التالي
 async function suggestNextReceiptNumber() {
+    const receiptNumberInput = document.getElementById('receiptNumber');
+    if (typeof getNextNumber === 'function') {
+        const nextNumber = await getNextNumber('receipts');
+        if (nextNumber) {
+            if (receiptNumberInput) {
+                receiptNumberInput.value = nextNumber;
+            }
+            return;
+        }
+    }
+    
     const receipts = await getAllReceipts();
     let maxNumber = 0;
     
@@ -173,7 +184,6 @@ async function suggestNextReceiptNumber() {
             maxNumber = receipt.receipt_number;
         }
     });
-    const receiptNumberInput = document.getElementById('receiptNumber');
     if (receiptNumberInput) {
         receiptNumberInput.value = maxNumber + 1;
     }